@@ -0,0 +1,424 @@
+"""Synthetic dataset generator for scale testing.
+
+Writes a seeded dataset for every model in ``server.py`` straight to MongoDB
+(MONGO_URL / DB_NAME, as for the server): a complete category tree of the
+given depth and fan-out, category models with hundreds of fields and
+matching custom_data, visibility windows, visibility and display types,
+pricing models, social handles, business field templates and their
+instances. The same seed and sizes always produce the same documents, ids
+included, whatever the number of workers.
+
+    python datagen.py --depth 5 --fan-out 10 --instances 10000000 --workers 8 --drop
+
+Documents are generated and inserted in chunks of GENERATION_CHUNK by a pool
+of worker processes, each with its own client, using unordered insert_many.
+Tree paths and the usage counters are computed while generating, so the data
+is consistent without a reconciliation pass. Indexes are created once
+everything is loaded; category_views are materialized on first read, or up
+front with --build-views.
+"""
+import asyncio
+import bisect
+import hashlib
+import multiprocessing
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import typer
+from pymongo import MongoClient
+
+import server
+from server import FieldType, VisibilityStatus
+
+GENERATION_CHUNK = 10_000  # Also the unit of seeding, so it must not depend on the worker count
+EPOCH = datetime(2024, 1, 1)
+
+WORDS = [
+    "amber", "atlas", "birch", "cobalt", "coral", "delta", "ember", "fable", "garnet", "harbor",
+    "indigo", "juniper", "kestrel", "lumen", "maple", "nimbus", "onyx", "pioneer", "quartz", "raven",
+    "sable", "tundra", "umber", "vertex", "willow", "xenon", "yarrow", "zephyr", "summit", "meadow",
+]
+FEATURES = [f"{word}_{suffix}" for word in WORDS for suffix in ("sync", "export", "sso", "api")]
+FIELD_GROUPS = ["general", "basic_info", "legal_info", "financial_info", "contact_info", "shipping", "billing", "compliance"]
+DISPLAY_CATEGORIES = ["grid", "list", "carousel", "card", "table"]
+VISIBILITY_TYPE_NAMES = ["Public", "Members only", "Staff only", "Scheduled", "Archived", "Draft"]
+FIELD_TYPES = list(FieldType)
+INTERVALS = list(server.MONTHS_PER_INTERVAL) + [None]
+
+cli = typer.Typer(add_completion=False)
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    seed: int
+    depth: int
+    fan_out: int
+    category_models: int
+    model_fields: int
+    visibility_ratio: float
+    display_types: int
+    pricing_models: int
+    social_handles: int
+    business_fields: int
+    instances: int
+
+    @property
+    def level_sizes(self) -> List[int]:
+        return [self.fan_out ** (level + 1) for level in range(self.depth)]
+
+    @property
+    def categories(self) -> int:
+        return sum(self.level_sizes)
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "visibility_types": len(VISIBILITY_TYPE_NAMES),
+            "display_types": self.display_types,
+            "social_handles": self.social_handles,
+            "pricing_models": self.pricing_models,
+            "category_models": self.category_models,
+            "categories": self.categories,
+            "business_fields": self.business_fields,
+            "business_field_instances": self.instances,
+        }
+
+def stable_id(spec: DatasetSpec, kind: str, index: int) -> str:
+    digest = hashlib.blake2b(f"{spec.seed}:{kind}:{index}".encode(), digest_size=16).digest()
+    return str(uuid.UUID(bytes=digest, version=4))
+
+def chunk_random(spec: DatasetSpec, kind: str, start: int) -> random.Random:
+    return random.Random(f"{spec.seed}:{kind}:{start}")
+
+def timestamps(rng: random.Random) -> Tuple[datetime, datetime]:
+    created_at = EPOCH + timedelta(seconds=rng.randrange(365 * 24 * 3600))
+    return created_at, created_at + timedelta(seconds=rng.randrange(30 * 24 * 3600))
+
+def round_robin_count(total: int, buckets: int, bucket: int) -> int:
+    """How many of ``range(total)`` map to ``bucket`` under ``index % buckets``."""
+    return total // buckets + (1 if bucket < total % buckets else 0)
+
+def phrase(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def field_value(rng: random.Random, field_type: FieldType, rules: Dict[str, Any], options: Optional[List[str]]) -> Any:
+    """A value that passes the type's coercer and ``rules``, already in its coerced form."""
+    if options:
+        return rng.choice(options)
+    if field_type == FieldType.NUMBER:
+        return rng.randint(rules.get("min", 0), rules.get("max", 100_000))
+    if field_type == FieldType.BOOLEAN:
+        return rng.random() < 0.5
+    if field_type == FieldType.DATE:
+        return (EPOCH.date() + timedelta(days=rng.randrange(3650))).isoformat()
+    if field_type == FieldType.EMAIL:
+        return f"{rng.choice(WORDS)}.{rng.randrange(1_000_000)}@example.com"
+    if field_type == FieldType.URL:
+        return f"https://{rng.choice(WORDS)}.example.com/{rng.choice(WORDS)}/{rng.randrange(1_000_000)}"
+    text = phrase(rng, rng.randint(2, 12 if field_type == FieldType.TEXTAREA else 4))
+    return text[:rules.get("max_length", len(text))]
+
+@lru_cache(maxsize=None)
+def category_model_fields(spec: DatasetSpec, model_index: int) -> Tuple[Dict[str, Any], ...]:
+    rng = chunk_random(spec, "category_model_fields", model_index)
+    fields = []
+    for position in range(spec.model_fields):
+        field_type = rng.choice(FIELD_TYPES)
+        required = rng.random() < 0.05
+        default = field_value(rng, field_type, {}, None) if required and rng.random() < 0.3 else None
+        fields.append({
+            "name": f"{rng.choice(WORDS)}_{position}",
+            "type": field_type.value,
+            "required": required,
+            "default_value": None if default is None else str(default).lower() if isinstance(default, bool) else str(default),
+        })
+    return tuple(fields)
+
+@lru_cache(maxsize=None)
+def business_field_template(spec: DatasetSpec, index: int) -> Dict[str, Any]:
+    rng = chunk_random(spec, "business_field_template", index)
+    field_type = rng.choice(FIELD_TYPES)
+    validation: Dict[str, Any] = {}
+    options = None
+    if field_type in (FieldType.TEXT, FieldType.TEXTAREA):
+        validation = {"min_length": 1, "max_length": 64 if field_type == FieldType.TEXT else 500}
+        if rng.random() < 0.2:
+            options = sorted({phrase(rng, 1) for _ in range(rng.randint(3, 8))})
+    elif field_type == FieldType.NUMBER:
+        validation = {"min": 0, "max": rng.choice([100, 10_000, 1_000_000])}
+    elif field_type == FieldType.DATE:
+        validation = {"format": "%Y-%m-%d"}
+    return {"type": field_type, "required": rng.random() < 0.3, "validation": validation, "options": options}
+
+def generate_visibility_types(spec: DatasetSpec, start: int, stop: int, rng: random.Random) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    for index in range(start, stop):
+        created_at, updated_at = timestamps(rng)
+        yield "visibility_types", {
+            "id": stable_id(spec, "visibility_type", index), "name": VISIBILITY_TYPE_NAMES[index],
+            "description": phrase(rng, 6), "active": True, "created_at": created_at, "updated_at": updated_at,
+        }
+
+def generate_display_types(spec: DatasetSpec, start: int, stop: int, rng: random.Random) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    for index in range(start, stop):
+        created_at, updated_at = timestamps(rng)
+        yield "display_types", {
+            "id": stable_id(spec, "display_type", index),
+            "name": f"{phrase(rng, 2).title()} {index}",
+            "description": phrase(rng, 8),
+            "type_category": rng.choice(DISPLAY_CATEGORIES),
+            "properties": {
+                "columns": rng.randint(1, 6),
+                "page_size": rng.choice([12, 24, 48]),
+                "card": {"image": rng.random() < 0.8, "price": rng.random() < 0.6, "rating": rng.random() < 0.4},
+            },
+            "responsive": rng.random() < 0.9,
+            "active": rng.random() < 0.95,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+def generate_social_handles(spec: DatasetSpec, start: int, stop: int, rng: random.Random) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    for index in range(start, stop):
+        created_at, updated_at = timestamps(rng)
+        handle = f"{rng.choice(WORDS)}{index}"
+        yield "social_handles", {
+            "id": stable_id(spec, "social_handle", index),
+            "name": f"{rng.choice(WORDS).title()} {index}",
+            "icon_image": None,
+            "icon_id": None,
+            "url": f"https://social.example.com/{handle}",
+            "handle": f"@{handle}",
+            "followers": int(rng.paretovariate(1.2) * 100),
+            "active": rng.random() < 0.9,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+def generate_pricing_models(spec: DatasetSpec, start: int, stop: int, rng: random.Random) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    currencies = sorted(server.EXCHANGE_RATES)
+    for index in range(start, stop):
+        created_at, updated_at = timestamps(rng)
+        yield "pricing_models", {
+            "id": stable_id(spec, "pricing_model", index),
+            "name": f"{rng.choice(WORDS).title()} plan {index}",
+            "description": phrase(rng, 8),
+            "price": round(rng.uniform(0, 500), 2) if rng.random() < 0.95 else None,
+            "currency": rng.choice(currencies),
+            "interval": rng.choice(INTERVALS),
+            "features": rng.sample(FEATURES, rng.randint(0, 12)),
+            "active": rng.random() < 0.9,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+def generate_category_models(spec: DatasetSpec, start: int, stop: int, rng: random.Random) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    for index in range(start, stop):
+        created_at, updated_at = timestamps(rng)
+        yield "category_models", {
+            "id": stable_id(spec, "category_model", index),
+            "name": f"{rng.choice(WORDS).title()} model {index}",
+            "description": phrase(rng, 8),
+            "fields": list(category_model_fields(spec, index)),
+            "version": 1,
+            # Categories are assigned models round-robin
+            "usage_count": round_robin_count(spec.categories, spec.category_models, index),
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+def custom_data_for(spec: DatasetSpec, model_index: int, rng: random.Random) -> Dict[str, Any]:
+    custom_data = {}
+    for field in category_model_fields(spec, model_index):
+        if field["required"] or rng.random() < 0.2:
+            custom_data[field["name"]] = field_value(rng, FieldType(field["type"]), {}, None)
+    return custom_data
+
+def generate_categories(spec: DatasetSpec, start: int, stop: int, rng: random.Random) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    sizes = spec.level_sizes
+    offsets = [sum(sizes[:level]) for level in range(spec.depth)]
+    ranks = server.spread_ranks(spec.fan_out, EPOCH)
+    statuses = list(VisibilityStatus)
+    for index in range(start, stop):
+        level = bisect.bisect_right(offsets, index) - 1
+        local = index - offsets[level]
+        ancestor_ids = []
+        for ancestor_level in range(level - 1, -1, -1):
+            ancestor_ids.insert(0, stable_id(spec, "category", offsets[ancestor_level] + local // spec.fan_out ** (level - ancestor_level)))
+        below = spec.depth - 1 - level
+        created_at, updated_at = timestamps(rng)
+        model_index = index % spec.category_models if spec.category_models else None
+        category_id = stable_id(spec, "category", index)
+        display_type_id = None
+        if spec.display_types and (level == 0 or rng.random() < 0.1):
+            display_type_id = stable_id(spec, "display_type", rng.randrange(spec.display_types))
+        yield "categories", {
+            "id": category_id,
+            "name": f"{phrase(rng, 2).title()} {index}",
+            "description": phrase(rng, 10),
+            "model_id": stable_id(spec, "category_model", model_index) if model_index is not None else None,
+            "custom_data": custom_data_for(spec, model_index, rng) if model_index is not None else {},
+            "visibility_status": rng.choices(statuses, weights=[80, 10, 5, 5])[0].value,
+            "parent_id": ancestor_ids[-1] if ancestor_ids else None,
+            "sort_order": 0,
+            "display_type_id": display_type_id,
+            "display_overrides": {"columns": rng.randint(1, 6)} if rng.random() < 0.05 else {},
+            "rank": ranks[local % spec.fan_out],
+            "ancestor_ids": ancestor_ids,
+            "child_count": spec.fan_out if below else 0,
+            "descendant_count": sum(spec.fan_out ** depth for depth in range(1, below + 1)),
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+        if rng.random() < spec.visibility_ratio:
+            start_date = created_at + timedelta(days=rng.randrange(-30, 180))
+            yield "category_visibility", {
+                "id": stable_id(spec, "category_visibility", index),
+                "category_id": category_id,
+                "visibility_status": rng.choice(statuses).value,
+                "start_date": start_date,
+                "end_date": start_date + timedelta(days=rng.randint(1, 90)) if rng.random() < 0.7 else None,
+                "rules": {"audience": rng.choice(VISIBILITY_TYPE_NAMES)},
+                "created_at": created_at,
+                "updated_at": updated_at,
+            }
+
+def generate_business_fields(spec: DatasetSpec, start: int, stop: int, rng: random.Random) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    ranks = server.spread_ranks(-(-spec.business_fields // len(FIELD_GROUPS)), EPOCH)
+    for index in range(start, stop):
+        template = business_field_template(spec, index)
+        created_at, updated_at = timestamps(rng)
+        order = index // len(FIELD_GROUPS)
+        yield "business_fields", {
+            "id": stable_id(spec, "business_field", index),
+            "name": f"{rng.choice(WORDS).title()} field {index}",
+            "type": template["type"].value,
+            "required": template["required"],
+            "category": FIELD_GROUPS[index % len(FIELD_GROUPS)],
+            "order": order,
+            "rank": ranks[order],
+            "validation": template["validation"],
+            "options": template["options"],
+            "active": rng.random() < 0.95,
+            # Instances are assigned templates round-robin
+            "instance_count": round_robin_count(spec.instances, spec.business_fields, index),
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+def generate_business_field_instances(spec: DatasetSpec, start: int, stop: int, rng: random.Random) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    for index in range(start, stop):
+        template_index = index % spec.business_fields
+        template = business_field_template(spec, template_index)
+        value = field_value(rng, template["type"], template["validation"], template["options"])
+        created_at, updated_at = timestamps(rng)
+        yield "business_field_instances", {
+            "id": stable_id(spec, "business_field_instance", index),
+            "name": f"{rng.choice(WORDS).title()} {index}",
+            "template_field_id": stable_id(spec, "business_field", template_index),
+            "value": str(value).lower() if isinstance(value, bool) else str(value),
+            "custom_properties": {"source": "datagen"} if rng.random() < 0.1 else {},
+            "active": rng.random() < 0.95,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+GENERATORS = {
+    "visibility_types": generate_visibility_types,
+    "display_types": generate_display_types,
+    "social_handles": generate_social_handles,
+    "pricing_models": generate_pricing_models,
+    "category_models": generate_category_models,
+    "categories": generate_categories,
+    "business_fields": generate_business_fields,
+    "business_field_instances": generate_business_field_instances,
+}
+# Written by the generators, plus the derived collections that must not outlive them
+COLLECTIONS = list(GENERATORS) + ["category_visibility", "category_views", "tombstones", "audit_log", "jobs"]
+
+_worker_db = None
+
+def init_worker(mongo_url: str, db_name: str):
+    global _worker_db
+    _worker_db = MongoClient(mongo_url)[db_name]
+
+def write_chunk(task: Tuple[DatasetSpec, str, int, int]) -> Dict[str, int]:
+    spec, kind, start, stop = task
+    batches: Dict[str, List[Dict[str, Any]]] = {}
+    for collection, doc in GENERATORS[kind](spec, start, stop, chunk_random(spec, kind, start)):
+        batches.setdefault(collection, []).append(doc)
+    for collection, docs in batches.items():
+        _worker_db[collection].insert_many(docs, ordered=False)
+    return {collection: len(docs) for collection, docs in batches.items()}
+
+async def finish_database(settings: server.Settings, build_views: bool):
+    await server.connect_db(settings)
+    try:
+        await server.ensure_indexes()
+        if build_views:
+            typer.echo(f"Built {await server.rebuild_category_views()} category views")
+    finally:
+        server.client.close()
+
+@cli.command()
+def generate(
+    seed: int = 42,
+    depth: int = typer.Option(4, help="Levels in the category tree"),
+    fan_out: int = typer.Option(8, help="Children per category; the tree has fan_out + ... + fan_out^depth categories"),
+    category_models: int = 20,
+    model_fields: int = typer.Option(200, help="Fields per category model"),
+    visibility_ratio: float = typer.Option(0.2, help="Share of categories with a visibility window"),
+    display_types: int = 20,
+    pricing_models: int = 500,
+    social_handles: int = 100,
+    business_fields: int = 500,
+    instances: int = typer.Option(1_000_000, help="Business field instances"),
+    workers: Optional[int] = typer.Option(None, help="Writer processes; defaults to the number of cores"),
+    drop: bool = typer.Option(False, help="Drop the generated and derived collections first"),
+    build_views: bool = typer.Option(False, help="Materialize category_views after loading"),
+):
+    spec = DatasetSpec(
+        seed, depth, fan_out, category_models, model_fields, visibility_ratio,
+        display_types, pricing_models, social_handles, business_fields, instances,
+    )
+    if instances and not business_fields:
+        raise typer.BadParameter("instances need at least one business field", param_hint="--business-fields")
+    settings = server.Settings.from_env()
+    if drop:
+        database = MongoClient(settings.mongo_url)[settings.db_name]
+        for collection in COLLECTIONS:
+            database.drop_collection(collection)
+        database.client.close()
+
+    counts = spec.counts()
+    tasks = [
+        (spec, kind, start, min(start + GENERATION_CHUNK, count))
+        for kind, count in counts.items()
+        for start in range(0, count, GENERATION_CHUNK)
+    ]
+    typer.echo(f"Generating {sum(counts.values()):,} documents (plus visibility windows) in {len(tasks)} chunks")
+
+    written: Dict[str, int] = {}
+    started = time.monotonic()
+    # Spawned workers each open their own client; none is inherited across a fork
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers or os.cpu_count() or 1, initializer=init_worker, initargs=(settings.mongo_url, settings.db_name)) as pool:
+        for done, result in enumerate(pool.imap_unordered(write_chunk, tasks), 1):
+            for collection, count in result.items():
+                written[collection] = written.get(collection, 0) + count
+            if done % 50 == 0 or done == len(tasks):
+                total = sum(written.values())
+                elapsed = time.monotonic() - started
+                typer.echo(f"{done}/{len(tasks)} chunks, {total:,} documents, {total / elapsed:,.0f} docs/s")
+
+    for collection, count in sorted(written.items()):
+        typer.echo(f"  {collection}: {count:,}")
+    typer.echo("Creating indexes")
+    asyncio.run(finish_database(settings, build_views))
+    typer.echo(f"Done in {time.monotonic() - started:,.1f}s")
+
+if __name__ == "__main__":
+    cli()
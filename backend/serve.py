@@ -0,0 +1,55 @@
+"""Production launcher for the backend.
+
+Runs ``server:create_app`` under uvicorn with uvloop and httptools in
+``--workers`` processes (one per core by default). Indexes are created once
+here before the workers start; each worker then opens its own MongoDB client
+on startup and only accepts traffic once the database answers.
+
+    python serve.py --workers 8 --port 8001
+
+/api/events streams the writes of every worker (they share the capped
+change_events collection). Caches such as the dashboard summary, the pricing
+catalog and the display resolutions are kept per worker; each revalidates or
+expires on a short TTL, so another worker's write shows up within it.
+"""
+import asyncio
+import os
+from typing import Optional
+
+import typer
+import uvicorn
+
+import server
+
+cli = typer.Typer(add_completion=False)
+
+@cli.command()
+def serve(
+    host: str = "0.0.0.0",
+    port: int = 8001,
+    workers: Optional[int] = typer.Option(None, help="Worker processes; defaults to the number of cores"),
+    graceful_shutdown: int = typer.Option(30, help="Seconds to let in-flight requests finish on shutdown"),
+    backlog: int = 2048,
+):
+    settings = server.Settings.from_env()
+    if settings.ensure_indexes:
+        asyncio.run(server.prepare_database(settings))
+    # The workers inherit this environment and skip the index check
+    os.environ["ENSURE_INDEXES"] = "false"
+
+    uvicorn.run(
+        "server:create_app",
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers or os.cpu_count() or 1,
+        loop="uvloop",
+        http="httptools",
+        backlog=backlog,
+        timeout_graceful_shutdown=graceful_shutdown,
+        proxy_headers=True,
+        access_log=False,
+    )
+
+if __name__ == "__main__":
+    cli()
@@ -1,26 +1,71 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from bson import Binary
+from pymongo import CursorType, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError, OperationFailure, PyMongoError, WriteError
+import numpy as np
+import asyncio
+import base64
+import contextvars
+import hashlib
+import hmac
+import json
+import multiprocessing
 import os
+import random
+import re
+import socket
+import string
+import sys
+import threading
+import time
 import logging
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import Awaitable, Callable, Iterable, List, Optional, Dict, Any, Literal, Set, Tuple
 import uuid
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
 from enum import Enum
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+@dataclass
+class Settings:
+    """Connection and startup settings for create_app().
+
+    Only these vary per app. Every other knob (cache TTLs, batch sizes,
+    limits) is a module-level constant read from the environment when this
+    module is imported, so it is the same for every app in the process and
+    for every worker started from the same environment.
+    """
+    mongo_url: str
+    db_name: str
+    ensure_indexes: bool = True
+    startup_timeout: float = 30
 
-# Create the main app without a prefix
-app = FastAPI()
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            mongo_url=os.environ['MONGO_URL'],
+            db_name=os.environ['DB_NAME'],
+            ensure_indexes=os.environ.get('ENSURE_INDEXES', 'true').lower() in ('1', 'true', 'yes'),
+            startup_timeout=float(os.environ.get('STARTUP_TIMEOUT_SECONDS', '30')),
+        )
+
+# MongoDB connection
+#
+# Opened by connect_db() when the app starts rather than on import, so every
+# worker process gets its own client (sockets and monitor threads are not
+# safe to share across a fork). One app per process.
+client: Optional[AsyncIOMotorClient] = None
+db = None
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -41,6 +86,13 @@ class FieldType(str, Enum):
     URL = "url"
     TEXTAREA = "textarea"
 
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
 # Models
 class CategoryField(BaseModel):
     name: str
@@ -53,6 +105,8 @@ class CategoryModel(BaseModel):
     name: str
     description: Optional[str] = None
     fields: List[CategoryField] = []
+    version: int = 1  # Bumped on every update; keys the compiled custom_data validators
+    usage_count: int = 0  # Categories referencing this model, maintained on write
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -65,6 +119,7 @@ class CategoryModelUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
     fields: Optional[List[CategoryField]] = None
+    renames: Optional[Dict[str, str]] = None  # Old field name -> new name, carried over in custom_data
 
 class Category(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -75,6 +130,12 @@ class Category(BaseModel):
     visibility_status: VisibilityStatus = VisibilityStatus.VISIBLE
     parent_id: Optional[str] = None
     sort_order: int = 0
+    display_type_id: Optional[str] = None  # Inherited by descendants that set none
+    display_overrides: Dict[str, Any] = {}  # Merged over the display type's properties, down the tree
+    rank: Optional[str] = None  # Orders siblings that share a sort_order
+    ancestor_ids: List[str] = []  # Root first, ending with parent_id
+    child_count: int = 0
+    descendant_count: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -86,6 +147,8 @@ class CategoryCreate(BaseModel):
     visibility_status: VisibilityStatus = VisibilityStatus.VISIBLE
     parent_id: Optional[str] = None
     sort_order: int = 0
+    display_type_id: Optional[str] = None
+    display_overrides: Dict[str, Any] = {}
 
 class CategoryUpdate(BaseModel):
     name: Optional[str] = None
@@ -95,6 +158,16 @@ class CategoryUpdate(BaseModel):
     visibility_status: Optional[VisibilityStatus] = None
     parent_id: Optional[str] = None
     sort_order: Optional[int] = None
+    display_type_id: Optional[str] = None
+    display_overrides: Optional[Dict[str, Any]] = None
+
+class CategoryBulkCreate(BaseModel):
+    categories: List[CategoryCreate]
+
+class CategoryMove(BaseModel):
+    parent_id: Optional[str] = None
+    before: Optional[str] = None  # Sibling id to place the category in front of
+    after: Optional[str] = None  # Sibling id to place the category behind
 
 class CategoryVisibility(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -104,6 +177,7 @@ class CategoryVisibility(BaseModel):
     end_date: Optional[datetime] = None
     rules: Dict[str, Any] = {}
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class CategoryVisibilityCreate(BaseModel):
     category_id: str
@@ -118,6 +192,46 @@ class CategoryVisibilityUpdate(BaseModel):
     end_date: Optional[datetime] = None
     rules: Optional[Dict[str, Any]] = None
 
+class CategoryModelSummary(BaseModel):
+    id: str
+    name: str
+    version: int = 1
+    field_count: int = 0
+
+class BreadcrumbEntry(BaseModel):
+    id: str
+    name: str
+
+class VisibilityWindow(BaseModel):
+    id: str
+    visibility_status: VisibilityStatus
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    rules: Dict[str, Any] = {}
+
+class CategoryView(BaseModel):
+    id: str
+    name: str
+    description: Optional[str] = None
+    parent_id: Optional[str] = None
+    ancestor_ids: List[str] = []
+    sort_order: int = 0
+    rank: Optional[str] = None
+    model_id: Optional[str] = None
+    model: Optional[CategoryModelSummary] = None
+    custom_data: Dict[str, Any] = {}
+    visibility_status: VisibilityStatus = VisibilityStatus.VISIBLE
+    visibility_windows: List[VisibilityWindow] = []
+    effective_status: VisibilityStatus = VisibilityStatus.VISIBLE
+    breadcrumb: List[BreadcrumbEntry] = []
+    child_count: int = 0
+    descendant_count: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class CategoryViewPage(BaseModel):
+    items: List[CategoryView]
+    next_after: Optional[str] = None
+
 class VisibilityType(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -196,7 +310,8 @@ class DisplayTypeUpdate(BaseModel):
 class SocialHandle(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
-    icon_image: Optional[str] = None  # Base64 encoded image
+    icon_image: Optional[str] = None  # /api/icons/{icon_id}, or a base64 data URL on unmigrated documents
+    icon_id: Optional[str] = None
     url: Optional[str] = None
     handle: Optional[str] = None
     followers: int = 0
@@ -227,9 +342,11 @@ class BusinessField(BaseModel):
     required: bool = False
     category: str = "general"
     order: int = 0
+    rank: Optional[str] = None  # Orders fields that share an order value
     validation: Dict[str, Any] = {}
     options: Optional[List[str]] = None
     active: bool = True
+    instance_count: int = 0  # Instances created from this template, maintained on write
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -253,6 +370,11 @@ class BusinessFieldUpdate(BaseModel):
     options: Optional[List[str]] = None
     active: Optional[bool] = None
 
+class BusinessFieldMove(BaseModel):
+    category: Optional[str] = None
+    before: Optional[str] = None
+    after: Optional[str] = None
+
 class BusinessFieldInstance(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -277,12 +399,2145 @@ class BusinessFieldInstanceUpdate(BaseModel):
     custom_properties: Optional[Dict[str, Any]] = None
     active: Optional[bool] = None
 
+class Job(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    type: str
+    params: Dict[str, Any] = {}
+    status: JobStatus = JobStatus.QUEUED
+    attempts: int = 0
+    max_attempts: int = 5
+    run_after: datetime = Field(default_factory=datetime.utcnow)  # Pushed back between retries
+    worker: Optional[str] = None  # Holder of the lease while running
+    lease_expires_at: Optional[datetime] = None
+    cancel_requested: bool = False
+    progress: Dict[str, Any] = {}
+    failures: List[Dict[str, Any]] = []  # Items the job could not process, capped at JOB_MAX_FAILURES
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class JobCreate(BaseModel):
+    type: str
+    params: Dict[str, Any] = {}
+    max_attempts: Optional[int] = None
+
+# Change notifications
+#
+# Write handlers report every change through ``emit_changes``; derived state
+# (read models, caches, feeds) subscribes per collection with ``@on_change``.
+# Listeners run inline so a client reading after its own write sees the result.
+@dataclass
+class ChangeEvent:
+    collection: str
+    op: str  # create, update or delete
+    id: str
+    before: Optional[Dict[str, Any]] = None
+    after: Optional[Dict[str, Any]] = None
+
+    def changed_fields(self) -> Dict[str, Any]:
+        """Fields whose value differs between ``before`` and ``after``."""
+        if not self.after:
+            return {}
+        if not self.before:
+            return {k: v for k, v in self.after.items() if k != "_id"}
+        return {
+            k: v for k, v in self.after.items()
+            if k != "_id" and self.before.get(k) != v
+        }
+
+ChangeListener = Callable[[List[ChangeEvent]], Awaitable[None]]
+_change_listeners: Dict[str, List[ChangeListener]] = {}
+
+def on_change(*collections: str):
+    """Register a listener for changes to ``collections`` ("*" for all of them)."""
+    def register(listener: ChangeListener) -> ChangeListener:
+        for collection in collections:
+            _change_listeners.setdefault(collection, []).append(listener)
+        return listener
+    return register
+
+async def emit_changes(events: List[ChangeEvent]):
+    by_collection: Dict[str, List[ChangeEvent]] = {}
+    for event in events:
+        by_collection.setdefault(event.collection, []).append(event)
+    for collection, batch in by_collection.items():
+        for listener in _change_listeners.get(collection, []) + _change_listeners.get("*", []):
+            try:
+                await listener(batch)
+            except Exception:
+                logger.exception("Change listener %s failed", listener.__name__)
+
+async def emit_change(
+    collection: str,
+    op: str,
+    doc_id: str,
+    before: Optional[Dict[str, Any]] = None,
+    after: Optional[Dict[str, Any]] = None,
+):
+    await emit_changes([ChangeEvent(collection, op, doc_id, before, after)])
+
+# Background jobs
+#
+# Work that does not fit in a request is queued in the jobs collection and
+# run by whichever worker claims it first: claiming is a find_one_and_update
+# that sets a lease, and the lease is renewed while the job runs, so a job
+# whose worker died is picked up again once its lease expires. Handlers are
+# registered per type with ``@job_handler`` and get a JobContext to report
+# progress and to run CPU-bound steps in a process pool. A handler may run
+# more than once (retries, lost leases) and must be safe to repeat; errors
+# are retried with exponential backoff up to max_attempts, except client
+# errors (HTTPException below 500), which fail the job at once. Running
+# jobs are cancelled through their lease heartbeat. The per-type concurrency
+# limit is checked against the running jobs of all workers before claiming,
+# so two workers claiming at the same moment can briefly exceed it; ordered
+# types run strictly one at a time in creation order.
+JOB_POLL_INTERVAL_SECONDS = float(os.environ.get('JOB_POLL_INTERVAL_SECONDS', '1'))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '60'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '5'))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get('JOB_RETRY_BASE_SECONDS', '5'))
+JOB_RETRY_MAX_SECONDS = float(os.environ.get('JOB_RETRY_MAX_SECONDS', '600'))
+JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', '7'))
+JOB_PROCESS_POOL_SIZE = int(os.environ.get('JOB_PROCESS_POOL_SIZE', str(os.cpu_count() or 1)))
+# Per-type overrides of the concurrency limit, e.g. {"cascade_delete": 2}
+JOB_CONCURRENCY: Dict[str, int] = json.loads(os.environ.get('JOB_CONCURRENCY', '{}'))
+JOB_MAX_FAILURES = 100
+
+class JobInterrupted(Exception):
+    """The job was cancelled or its lease passed to another worker."""
+
+@dataclass
+class JobType:
+    name: str
+    handler: Callable[["JobContext"], Awaitable[Any]]
+    concurrency: int
+    max_attempts: int
+    ordered: bool
+
+JOB_TYPES: Dict[str, JobType] = {}
+
+def job_handler(name: str, concurrency: int = 2, max_attempts: int = JOB_MAX_ATTEMPTS, ordered: bool = False):
+    def register(handler: Callable[["JobContext"], Awaitable[Any]]):
+        limit = 1 if ordered else JOB_CONCURRENCY.get(name, concurrency)
+        JOB_TYPES[name] = JobType(name, handler, limit, max_attempts, ordered)
+        return handler
+    return register
+
+def lease_holder() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # Spawned rather than forked: the parent holds a MongoDB client and its threads
+        _process_pool = ProcessPoolExecutor(JOB_PROCESS_POOL_SIZE, mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+
+class JobContext:
+    def __init__(self, job: Dict[str, Any]):
+        self.id = job["id"]
+        self.params = job.get("params") or {}
+        self.attempt = job["attempts"]
+        # What earlier attempts reported; handlers that checkpoint resume from it
+        self.progress = dict(job.get("progress") or {})
+
+    async def report(
+        self,
+        progress: Optional[Dict[str, Any]] = None,
+        increment: Optional[Dict[str, Any]] = None,
+        failures: Optional[List[Dict[str, Any]]] = None,
+        clear_failures: bool = False,
+    ):
+        update: Dict[str, Any] = {"$set": {"updated_at": datetime.utcnow()}}
+        for key, value in (progress or {}).items():
+            update["$set"][f"progress.{key}"] = value
+            self.progress[key] = value
+        if increment:
+            update["$inc"] = {f"progress.{key}": value for key, value in increment.items()}
+            for key, value in increment.items():
+                self.progress[key] = self.progress.get(key, 0) + value
+        if clear_failures:
+            update["$set"]["failures"] = []
+        elif failures:
+            update["$push"] = {"failures": {"$each": failures, "$slice": JOB_MAX_FAILURES}}
+        result = await db.jobs.update_one(
+            {"id": self.id, "worker": lease_holder(), "status": JobStatus.RUNNING.value, "cancel_requested": {"$ne": True}},
+            update,
+        )
+        if not result.matched_count:
+            raise JobInterrupted(self.id)
+
+    async def run_in_process(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Run a module-level function in the process pool; arguments and result must pickle."""
+        return await asyncio.get_running_loop().run_in_executor(get_process_pool(), function, *args)
+
+jobs_wakeup = asyncio.Event()
+running_jobs: Dict[str, int] = {}
+job_tasks: Set[asyncio.Task] = set()
+
+async def enqueue_job(job_type: str, params: Dict[str, Any], max_attempts: Optional[int] = None) -> Job:
+    if job_type not in JOB_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown job type: {job_type}")
+    job = Job(type=job_type, params=params, max_attempts=max_attempts or JOB_TYPES[job_type].max_attempts)
+    await db.jobs.insert_one(job.dict())
+    jobs_wakeup.set()
+    return job
+
+def retry_delay(attempts: int) -> float:
+    delay = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+async def claim_job(job_type: JobType) -> Optional[Dict[str, Any]]:
+    now = datetime.utcnow()
+    claimable = {"$or": [
+        {"status": JobStatus.QUEUED.value, "run_after": {"$lte": now}},
+        {"status": JobStatus.RUNNING.value, "lease_expires_at": {"$lt": now}},
+    ]}
+    if job_type.ordered:
+        head = await db.jobs.find_one(
+            {"type": job_type.name, "status": {"$in": [JobStatus.QUEUED.value, JobStatus.RUNNING.value]}},
+            {"_id": 0, "id": 1}, sort=[("created_at", 1)],
+        )
+        if not head:
+            return None
+        query = {"id": head["id"], **claimable}
+    else:
+        running = await db.jobs.count_documents(
+            {"type": job_type.name, "status": JobStatus.RUNNING.value, "lease_expires_at": {"$gte": now}}
+        )
+        if running >= job_type.concurrency:
+            return None
+        query = {"type": job_type.name, **claimable}
+    return await db.jobs.find_one_and_update(
+        query,
+        {
+            "$set": {
+                "status": JobStatus.RUNNING.value, "worker": lease_holder(),
+                "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                "started_at": now, "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        {"_id": 0},
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+async def finish_job(job_id: str, changes: Dict[str, Any]):
+    now = datetime.utcnow()
+    await db.jobs.update_one(
+        {"id": job_id, "worker": lease_holder(), "status": JobStatus.RUNNING.value},
+        {"$set": {**changes, "lease_expires_at": None, "updated_at": now}},
+    )
+
+async def execute_job(job_type: JobType, job: Dict[str, Any]):
+    job_id = job["id"]
+    if job["attempts"] > job["max_attempts"]:
+        # Its last attempt ended with the worker running it
+        await finish_job(job_id, {
+            "status": JobStatus.FAILED.value, "error": "Worker lost", "finished_at": datetime.utcnow(),
+        })
+        return
+    handler = asyncio.create_task(job_type.handler(JobContext(job)))
+    try:
+        while not handler.done():
+            await asyncio.wait({handler}, timeout=JOB_LEASE_SECONDS / 3)
+            if handler.done():
+                break
+            state = await db.jobs.find_one_and_update(
+                {"id": job_id, "worker": lease_holder(), "status": JobStatus.RUNNING.value},
+                {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)}},
+                {"_id": 0, "cancel_requested": 1},
+            )
+            if not state or state.get("cancel_requested"):
+                handler.cancel()
+                await asyncio.wait({handler})
+    except asyncio.CancelledError:
+        # Shutting down: hand the job back without counting the attempt
+        handler.cancel()
+        await asyncio.wait({handler})
+        await db.jobs.update_one(
+            {"id": job_id, "worker": lease_holder(), "status": JobStatus.RUNNING.value},
+            {"$set": {"status": JobStatus.QUEUED.value, "lease_expires_at": None, "run_after": datetime.utcnow()},
+             "$inc": {"attempts": -1}},
+        )
+        raise
+
+    now = datetime.utcnow()
+    if handler.cancelled() or isinstance(handler.exception(), JobInterrupted):
+        # A cancel request; if the lease went to another worker this matches nothing
+        await finish_job(job_id, {"status": JobStatus.CANCELLED.value, "finished_at": now})
+        return
+    error = handler.exception()
+    if error is None:
+        await finish_job(job_id, {
+            "status": JobStatus.COMPLETED.value, "result": jsonable_encoder(handler.result()),
+            "error": None, "finished_at": now,
+        })
+        return
+    permanent = isinstance(error, HTTPException) and error.status_code < 500
+    message = error.detail if isinstance(error, HTTPException) else f"{type(error).__name__}: {error}"
+    if permanent or job["attempts"] >= job["max_attempts"]:
+        logger.error("Job %s (%s) failed: %s", job_id, job_type.name, message)
+        await finish_job(job_id, {"status": JobStatus.FAILED.value, "error": message, "finished_at": now})
+    else:
+        logger.warning("Job %s (%s) failed, retrying: %s", job_id, job_type.name, message)
+        await finish_job(job_id, {
+            "status": JobStatus.QUEUED.value, "error": message,
+            "run_after": now + timedelta(seconds=retry_delay(job["attempts"])),
+        })
+
+def start_job(job_type: JobType, job: Dict[str, Any]):
+    running_jobs[job_type.name] = running_jobs.get(job_type.name, 0) + 1
+    task = asyncio.create_task(execute_job(job_type, job))
+    job_tasks.add(task)
+
+    def done(task: asyncio.Task):
+        job_tasks.discard(task)
+        running_jobs[job_type.name] -= 1
+        if not task.cancelled() and task.exception():
+            logger.error("Job %s could not be finished", job["id"], exc_info=task.exception())
+        jobs_wakeup.set()
+
+    task.add_done_callback(done)
+
+async def run_job_worker():
+    while True:
+        jobs_wakeup.clear()
+        try:
+            for job_type in JOB_TYPES.values():
+                while running_jobs.get(job_type.name, 0) < job_type.concurrency:
+                    job = await claim_job(job_type)
+                    if not job:
+                        break
+                    start_job(job_type, job)
+        except PyMongoError:
+            logger.exception("Could not claim jobs")
+        try:
+            await asyncio.wait_for(jobs_wakeup.wait(), JOB_POLL_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+# Category tree and usage counters
+#
+# Every category stores its ``ancestor_ids`` (root first) together with
+# ``child_count`` and ``descendant_count``; category models and business field
+# templates store how many documents reference them. The write paths below keep
+# them current with ``$inc`` so reads never have to count, and
+# ``reconcile_counters`` repairs any drift in the background, starting with a
+# pass at startup. Until migration 1 has backfilled them, documents written
+# before ``ancestor_ids`` existed are resolved by following ``parent_id``
+# links; subtree deletes check the migration's state until it has completed.
+COUNTER_RECONCILE_INTERVAL = int(os.environ.get('COUNTER_RECONCILE_INTERVAL', '3600'))
+COUNTER_RECONCILE_BATCH_SIZE = 1000
+
+async def resolve_ancestor_ids(parent_id: Optional[str], category_id: Optional[str] = None) -> List[str]:
+    """Return the ancestor path for a category placed under ``parent_id``."""
+    if not parent_id:
+        return []
+    parent = await db.categories.find_one({"id": parent_id}, {"_id": 0, "ancestor_ids": 1})
+    if not parent:
+        raise HTTPException(status_code=404, detail="Parent category not found")
+    if "ancestor_ids" in parent:
+        ancestor_ids = parent["ancestor_ids"] + [parent_id]
+    else:
+        ancestor_ids = await walk_parent_links(parent_id) + [parent_id]
+    if category_id and category_id in ancestor_ids:
+        raise HTTPException(status_code=400, detail="Category cannot be moved into its own subtree")
+    return ancestor_ids
+
+async def walk_parent_links(category_id: str) -> List[str]:
+    """Ancestor path of a category that has no ``ancestor_ids`` yet, from its ``parent_id`` chain."""
+    path: List[str] = []
+    doc = await db.categories.find_one({"id": category_id}, {"_id": 0, "parent_id": 1})
+    parent_id = doc.get("parent_id") if doc else None
+    # A dangling or cyclic parent link ends the path, as in reconcile_counters
+    while parent_id and parent_id != category_id and parent_id not in path:
+        parent = await db.categories.find_one({"id": parent_id}, {"_id": 0, "parent_id": 1, "ancestor_ids": 1})
+        if not parent:
+            break
+        path.insert(0, parent_id)
+        if "ancestor_ids" in parent:
+            return parent["ancestor_ids"] + path
+        parent_id = parent.get("parent_id")
+    return path
+
+# Set once migration 1 (category_ancestor_ids) is known to have completed;
+# every category written since has its path, so this never goes back
+_ancestor_paths_backfilled = False
+
+async def ancestor_paths_backfilled() -> bool:
+    global _ancestor_paths_backfilled
+    if not _ancestor_paths_backfilled:
+        state = await db.migrations.find_one({"id": 1, "status": "completed"}, {"_id": 1})
+        _ancestor_paths_backfilled = state is not None
+    return _ancestor_paths_backfilled
+
+async def shift_tree_counters(ancestor_ids: List[str], subtree_size: int, sign: int):
+    """Attach (sign=1) or detach (sign=-1) a subtree of ``subtree_size`` nodes below ``ancestor_ids[-1]``."""
+    if not ancestor_ids:
+        return
+    now = datetime.utcnow()
+    await db.categories.bulk_write([
+        UpdateOne({"id": ancestor_ids[-1]}, {"$inc": {"child_count": sign}}),
+        UpdateMany(
+            {"id": {"$in": ancestor_ids}},
+            {"$inc": {"descendant_count": sign * subtree_size}, "$set": {"updated_at": now}}
+        ),
+    ], ordered=False)
+
+async def move_subtree(category: Dict[str, Any], new_ancestor_ids: List[str]):
+    """Rewrite the ancestor paths and counters after ``category`` was re-parented."""
+    old_ancestor_ids = category.get("ancestor_ids", [])
+    subtree_size = 1 + category.get("descendant_count", 0)
+    if category.get("descendant_count"):
+        # Swap the old path prefix for the new one on every descendant in one pass
+        await db.categories.update_many(
+            {"ancestor_ids": category["id"]},
+            [{"$set": {
+                "ancestor_ids": {"$concatArrays": [
+                    new_ancestor_ids,
+                    {"$slice": ["$ancestor_ids", len(old_ancestor_ids), {"$size": "$ancestor_ids"}]},
+                ]},
+                "updated_at": datetime.utcnow(),
+            }}]
+        )
+    await shift_tree_counters(old_ancestor_ids, subtree_size, -1)
+    await shift_tree_counters(new_ancestor_ids, subtree_size, 1)
+
+async def adjust_usage_count(collection, field: str, doc_id: Optional[str], delta: int):
+    # Counters are derived data: leave updated_at alone, since no change event
+    # tells delta sync or the event feed about the counted document
+    if doc_id:
+        await collection.update_one({"id": doc_id}, {"$inc": {field: delta}})
+
+async def _repair_counts(collection, field: str, actual: Dict[str, int]) -> int:
+    """Bring ``field`` on every document of ``collection`` in line with ``actual``."""
+    repairs = []
+    async for doc in collection.find({}, {"_id": 0, "id": 1, field: 1}):
+        expected = actual.get(doc["id"], 0)
+        if doc.get(field, 0) != expected:
+            repairs.append(UpdateOne({"id": doc["id"]}, {"$set": {field: expected, "updated_at": datetime.utcnow()}}))
+    for start in range(0, len(repairs), COUNTER_RECONCILE_BATCH_SIZE):
+        await collection.bulk_write(repairs[start:start + COUNTER_RECONCILE_BATCH_SIZE], ordered=False)
+    return len(repairs)
+
+async def reconcile_counters() -> Dict[str, int]:
+    """Recompute tree paths and usage counters from scratch and fix the documents that drifted."""
+    nodes = {
+        doc["id"]: doc
+        async for doc in db.categories.find(
+            {}, {"_id": 0, "id": 1, "parent_id": 1, "ancestor_ids": 1, "child_count": 1, "descendant_count": 1}
+        )
+    }
+
+    paths: Dict[str, List[str]] = {}
+
+    def path_of(category_id: str) -> List[str]:
+        # Walk up iteratively; a dangling or cyclic parent link ends the path
+        chain, seen = [], {category_id}
+        parent_id = nodes[category_id].get("parent_id")
+        while parent_id in nodes and parent_id not in seen and parent_id not in paths:
+            chain.append(parent_id)
+            seen.add(parent_id)
+            parent_id = nodes[parent_id].get("parent_id")
+        prefix = paths[parent_id] + [parent_id] if parent_id in paths and parent_id not in seen else []
+        for node_id in reversed(chain):
+            paths[node_id] = prefix
+            prefix = prefix + [node_id]
+        return prefix
+
+    for category_id in nodes:
+        if category_id not in paths:
+            paths[category_id] = path_of(category_id)
+
+    child_counts: Dict[str, int] = {}
+    descendant_counts: Dict[str, int] = {}
+    for ancestor_ids in paths.values():
+        if ancestor_ids:
+            child_counts[ancestor_ids[-1]] = child_counts.get(ancestor_ids[-1], 0) + 1
+        for ancestor_id in ancestor_ids:
+            descendant_counts[ancestor_id] = descendant_counts.get(ancestor_id, 0) + 1
+
+    repairs = []
+    for category_id, doc in nodes.items():
+        expected = {
+            "ancestor_ids": paths[category_id],
+            "child_count": child_counts.get(category_id, 0),
+            "descendant_count": descendant_counts.get(category_id, 0),
+        }
+        drifted = {k: v for k, v in expected.items() if doc.get(k, [] if k == "ancestor_ids" else 0) != v}
+        if drifted:
+            repairs.append(UpdateOne({"id": category_id}, {"$set": {**drifted, "updated_at": datetime.utcnow()}}))
+    for start in range(0, len(repairs), COUNTER_RECONCILE_BATCH_SIZE):
+        await db.categories.bulk_write(repairs[start:start + COUNTER_RECONCILE_BATCH_SIZE], ordered=False)
+
+    model_usage = {
+        row["_id"]: row["count"]
+        async for row in db.categories.aggregate([
+            {"$match": {"model_id": {"$ne": None}}},
+            {"$group": {"_id": "$model_id", "count": {"$sum": 1}}},
+        ])
+    }
+    template_usage = {
+        row["_id"]: row["count"]
+        async for row in db.business_field_instances.aggregate([
+            {"$group": {"_id": "$template_field_id", "count": {"$sum": 1}}},
+        ])
+    }
+
+    return {
+        "categories": len(repairs),
+        "category_models": await _repair_counts(db.category_models, "usage_count", model_usage),
+        "business_fields": await _repair_counts(db.business_fields, "instance_count", template_usage),
+    }
+
+async def reconcile_counters_periodically():
+    # The first pass runs at startup so documents from before the tree fields are backfilled promptly
+    while True:
+        try:
+            # Every worker runs this loop; the lease lets one of them do the work
+            if await acquire_lease("reconcile-counters", COUNTER_RECONCILE_INTERVAL / 2):
+                repaired = await reconcile_counters()
+                logger.info("Counter reconciliation repaired %s", repaired)
+        except Exception:
+            logger.exception("Counter reconciliation failed")
+        await asyncio.sleep(COUNTER_RECONCILE_INTERVAL)
+
+# Transactions are only available on replica sets and sharded clusters; a
+# standalone mongod answers with IllegalOperation and we run without one.
+TRANSACTION_UNSUPPORTED_CODES = {20}
+CASCADE_DELETE_BATCH_SIZE = 1000
+
+async def run_in_transaction(operation):
+    """Run ``operation(session)`` in a transaction when the deployment supports it."""
+    async with await client.start_session() as session:
+        try:
+            async with session.start_transaction():
+                return await operation(session)
+        except OperationFailure as exc:
+            if exc.code not in TRANSACTION_UNSUPPORTED_CODES:
+                raise
+            logger.debug("Transactions unsupported, running without one")
+    return await operation(None)
+
+async def delete_category_subtree(category_id: str, dry_run: bool = False) -> Dict[str, Any]:
+    """Delete a category, all of its descendants and their visibility settings."""
+    # One aggregation resolves the subtree through the ancestor_ids index and
+    # joins the dependent visibility settings
+    with_visibility = [
+        {"$lookup": {
+            "from": "category_visibility",
+            "localField": "id",
+            "foreignField": "category_id",
+            "as": "visibility",
+        }},
+        {"$project": {
+            "_id": 0, "id": 1, "model_id": 1, "ancestor_ids": 1,
+            "visibility_ids": "$visibility.id",
+        }},
+    ]
+    subtree = await db.categories.aggregate(
+        [{"$match": {"$or": [{"id": category_id}, {"ancestor_ids": category_id}]}}] + with_visibility
+    ).to_list(None)
+
+    root = next((doc for doc in subtree if doc["id"] == category_id), None)
+    if not root:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    # Categories stored before ancestor_ids existed are only linked by parent_id
+    # until their paths are backfilled; pick those up level by level
+    if not await ancestor_paths_backfilled():
+        found = {doc["id"] for doc in subtree}
+        frontier = list(found)
+        while frontier:
+            level = await db.categories.aggregate(
+                [{"$match": {"parent_id": {"$in": frontier}, "id": {"$nin": list(found)}}}] + with_visibility
+            ).to_list(None)
+            subtree.extend(level)
+            frontier = [doc["id"] for doc in level]
+            found.update(frontier)
+        if "ancestor_ids" not in root:
+            root["ancestor_ids"] = await walk_parent_links(category_id)
+
+    category_ids = [doc["id"] for doc in subtree]
+    visibility_ids = [vid for doc in subtree for vid in doc.get("visibility_ids", [])]
+    summary = {
+        "dry_run": dry_run,
+        "categories": len(category_ids),
+        "category_visibility": len(visibility_ids),
+    }
+    if dry_run:
+        summary["category_ids"] = category_ids
+        summary["category_visibility_ids"] = visibility_ids
+        return summary
+
+    model_usage: Dict[str, int] = {}
+    for doc in subtree:
+        if doc.get("model_id"):
+            model_usage[doc["model_id"]] = model_usage.get(doc["model_id"], 0) + 1
+
+    async def delete_all(session):
+        for start in range(0, len(visibility_ids), CASCADE_DELETE_BATCH_SIZE):
+            await db.category_visibility.delete_many(
+                {"id": {"$in": visibility_ids[start:start + CASCADE_DELETE_BATCH_SIZE]}}, session=session
+            )
+        for start in range(0, len(category_ids), CASCADE_DELETE_BATCH_SIZE):
+            await db.categories.delete_many(
+                {"id": {"$in": category_ids[start:start + CASCADE_DELETE_BATCH_SIZE]}}, session=session
+            )
+        ancestor_ids = root.get("ancestor_ids", [])
+        now = datetime.utcnow()
+        if ancestor_ids:
+            await db.categories.bulk_write([
+                UpdateOne({"id": ancestor_ids[-1]}, {"$inc": {"child_count": -1}}),
+                UpdateMany(
+                    {"id": {"$in": ancestor_ids}},
+                    {"$inc": {"descendant_count": -len(category_ids)}, "$set": {"updated_at": now}}
+                ),
+            ], ordered=False, session=session)
+        if model_usage:
+            await db.category_models.bulk_write([
+                UpdateOne({"id": model_id}, {"$inc": {"usage_count": -count}, "$set": {"updated_at": now}})
+                for model_id, count in model_usage.items()
+            ], ordered=False, session=session)
+
+    await run_in_transaction(delete_all)
+    await emit_changes(
+        [ChangeEvent("category_visibility", "delete", visibility_id) for visibility_id in visibility_ids]
+        + [ChangeEvent("categories", "delete", doc["id"], before=doc) for doc in subtree]
+    )
+    return summary
+
+@job_handler("cascade_delete", concurrency=1)
+async def cascade_delete_job(ctx: JobContext):
+    return await delete_category_subtree(ctx.params["category_id"])
+
+# Sibling ranking
+#
+# Siblings are ordered by their integer order field and then by a lexicographic
+# ``rank`` key. All keys live in one space: a 10-digit timestamp plus a
+# suffix, so a new document (or one moved to the end) ranks after every
+# existing sibling, and a respread hands out evenly spaced keys below the
+# current time. A move computes a key between its new neighbours, so it only
+# rewrites the moved document. Keys only grow when items are repeatedly
+# squeezed into the same gap; once one gets longer than RANK_MAX_LENGTH the
+# sibling list is respread by a background job. Neighbours with no key or
+# tied keys leave no gap at all, so that (rare, legacy) case respreads the
+# siblings inline before the move.
+RANK_ALPHABET = string.digits + string.ascii_uppercase + string.ascii_lowercase
+RANK_BASE = len(RANK_ALPHABET)
+RANK_MAX_LENGTH = int(os.environ.get('RANK_MAX_LENGTH', '24'))
+
+def encode_rank(value: int, width: int) -> str:
+    digits = []
+    for _ in range(width):
+        value, digit = divmod(value, RANK_BASE)
+        digits.append(RANK_ALPHABET[digit])
+    return "".join(reversed(digits))
+
+def rank_between(lo: Optional[str], hi: Optional[str]) -> str:
+    """Return a key strictly between ``lo`` and ``hi`` (``None`` meaning unbounded)."""
+    lo = lo or ""
+    digits = []
+    position = 0
+    while True:
+        lo_digit = RANK_ALPHABET.index(lo[position]) if position < len(lo) else 0
+        hi_digit = RANK_ALPHABET.index(hi[position]) if hi is not None and position < len(hi) else RANK_BASE
+        if hi_digit - lo_digit > 1:
+            # The midpoint is never the zero digit, so keys never end in "0"
+            # and there is always room below them
+            digits.append(RANK_ALPHABET[(lo_digit + hi_digit) // 2])
+            return "".join(digits)
+        digits.append(RANK_ALPHABET[lo_digit])
+        if hi_digit - lo_digit == 1:
+            hi = None
+        position += 1
+
+def spread_ranks(count: int, before: Optional[datetime] = None) -> List[str]:
+    """Evenly spaced keys for ``count`` siblings, all below the append_rank keys from ``before`` (default now) on."""
+    ceiling = (before - datetime(1970, 1, 1)) // timedelta(microseconds=1) if before else time.time_ns() // 1000
+    step = ceiling // (count + 1)
+    return [encode_rank((i + 1) * step, 10) + RANK_ALPHABET[RANK_BASE // 2] for i in range(count)]
+
+def append_rank(offset: int = 0, created_at: Optional[datetime] = None) -> str:
+    """Rank for a newly created document, sorting after earlier creations.
+
+    ``offset`` keeps documents created in the same bulk request in order, and
+    ``created_at`` ranks an existing document by its creation time instead of now.
+    """
+    micros = (created_at - datetime(1970, 1, 1)) // timedelta(microseconds=1) if created_at else time.time_ns() // 1000
+    return encode_rank(micros + offset, 10) + RANK_ALPHABET[RANK_BASE // 2]
+
+def rank_after(lo: Optional[str]) -> str:
+    """Key for the end of a sibling list whose last key is ``lo``."""
+    rank = append_rank()
+    return rank if lo is None or rank > lo else rank_between(lo, None)
+
+async def rebalance_ranks(collection, group: Dict[str, Any], order_field: str):
+    siblings = await collection.find(group, {"_id": 0, "id": 1}).sort(
+        [(order_field, 1), ("rank", 1), ("created_at", 1)]
+    ).to_list(None)
+    if siblings:
+        ranks = spread_ranks(len(siblings))
+        now = datetime.utcnow()
+        await collection.bulk_write([
+            UpdateOne({"id": doc["id"]}, {"$set": {"rank": rank, "updated_at": now}})
+            for doc, rank in zip(siblings, ranks)
+        ], ordered=False)
+        await emit_changes([
+            ChangeEvent(collection.name, "update", doc["id"], after={"rank": rank})
+            for doc, rank in zip(siblings, ranks)
+        ])
+
+@job_handler("rebalance_ranks", concurrency=1)
+async def rebalance_ranks_job(ctx: JobContext):
+    await rebalance_ranks(db[ctx.params["collection"]], ctx.params["group"], ctx.params["order_field"])
+
+async def schedule_rebalance(collection, group: Dict[str, Any], order_field: str):
+    params = {"collection": collection.name, "group": group, "order_field": order_field}
+    if not await db.jobs.find_one({"type": "rebalance_ranks", "params": params, "status": JobStatus.QUEUED.value}, {"_id": 1}):
+        await enqueue_job("rebalance_ranks", params)
+
+async def place_between(
+    collection,
+    group: Dict[str, Any],
+    order_field: str,
+    moving_id: str,
+    after_id: Optional[str],
+    before_id: Optional[str],
+    default_order: int,
+    not_found_detail: str,
+) -> Dict[str, Any]:
+    """Compute the order value and rank that put ``moving_id`` between two siblings.
+
+    When only one neighbour is given the other one is looked up, and with
+    neither the document goes to the end of the sibling list.
+    """
+    projection = {"_id": 0, "id": 1, order_field: 1, "rank": 1}
+    others = {**group, "id": {"$ne": moving_id}}
+
+    after_doc = before_doc = None
+    if after_id:
+        after_doc = await collection.find_one({**group, "id": after_id}, projection)
+        if not after_doc:
+            raise HTTPException(status_code=404, detail=not_found_detail)
+    if before_id:
+        before_doc = await collection.find_one({**group, "id": before_id}, projection)
+        if not before_doc:
+            raise HTTPException(status_code=404, detail=not_found_detail)
+
+    async def successor(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await collection.find_one({**others, "$or": [
+            {order_field: doc[order_field], "rank": {"$gt": doc.get("rank")}},
+            {order_field: {"$gt": doc[order_field]}},
+        ]}, projection, sort=[(order_field, 1), ("rank", 1)])
+
+    async def predecessor(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await collection.find_one({**others, "$or": [
+            {order_field: doc[order_field], "rank": {"$lt": doc.get("rank")}},
+            {order_field: {"$lt": doc[order_field]}},
+        ]}, projection, sort=[(order_field, -1), ("rank", -1)])
+
+    if after_doc and not before_doc and not before_id:
+        before_doc = await successor(after_doc)
+    elif before_doc and not after_doc:
+        after_doc = await predecessor(before_doc)
+    elif not after_doc and not before_doc:
+        after_doc = await collection.find_one(others, projection, sort=[(order_field, -1), ("rank", -1)])
+
+    if after_doc and before_doc and after_doc[order_field] == before_doc[order_field]:
+        gapless = after_doc.get("rank") is None or before_doc.get("rank") is None or after_doc["rank"] >= before_doc["rank"]
+    elif before_doc and not after_doc:
+        gapless = before_doc.get("rank") is None
+    else:
+        # An unranked anchor may still have unranked siblings after it
+        gapless = bool(after_id and after_doc and not before_doc and after_doc.get("rank") is None)
+    if gapless:
+        # Legacy or tied keys leave no room next to the anchor; respread the
+        # siblings first so the key computed below lands on the requested side
+        await rebalance_ranks(collection, group, order_field)
+        anchor_ids = [doc["id"] for doc in (after_doc, before_doc) if doc]
+        refreshed = {doc["id"]: doc async for doc in collection.find({"id": {"$in": anchor_ids}}, projection)}
+        after_doc = refreshed.get(after_doc["id"]) if after_doc else None
+        before_doc = refreshed.get(before_doc["id"]) if before_doc else None
+        if before_doc and not after_doc:
+            after_doc = await predecessor(before_doc)
+        elif after_doc and not before_doc and not before_id:
+            before_doc = await successor(after_doc)
+
+    if after_doc and before_doc and after_doc[order_field] == before_doc[order_field]:
+        lo, hi = after_doc.get("rank"), before_doc.get("rank")
+        if lo and hi and lo > hi:
+            # The respread broke the anchors' tie the other way round
+            lo, hi = hi, lo
+        placement = {order_field: after_doc[order_field], "rank": rank_between(lo, hi)}
+    elif after_doc:
+        placement = {order_field: after_doc[order_field], "rank": rank_after(after_doc.get("rank"))}
+    elif before_doc:
+        placement = {order_field: before_doc[order_field], "rank": rank_between(None, before_doc.get("rank") or append_rank())}
+    else:
+        placement = {order_field: default_order, "rank": append_rank()}
+
+    if len(placement["rank"]) > RANK_MAX_LENGTH:
+        await schedule_rebalance(collection, group, order_field)
+    return placement
+
+# Custom data validation
+#
+# Each CategoryModel is compiled once into a validator that checks and coerces
+# a category's custom_data. Validators are cached per model id together with
+# the model version they were built from. Every use checks that version
+# against the stored model (a projected lookup, or a single batched one for
+# bulk imports), so a model updated through another worker is recompiled here
+# too and bulk imports still pay for one compile per model instead of
+# interpreting the field list for every row.
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+URL_PATTERN = re.compile(r"^https?://[^\s/$.?#][^\s]*$", re.IGNORECASE)
+TRUE_STRINGS = {"true", "1", "yes", "on"}
+FALSE_STRINGS = {"false", "0", "no", "off"}
+CATEGORY_BULK_MAX_SIZE = int(os.environ.get('CATEGORY_BULK_MAX_SIZE', '10000'))
+
+class CustomDataError(ValueError):
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+def coerce_text(value: Any) -> str:
+    if isinstance(value, (dict, list)):
+        raise ValueError("expected text")
+    return str(value)
+
+def coerce_number(value: Any):
+    if isinstance(value, bool):
+        raise ValueError("expected a number")
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    raise ValueError("expected a number")
+
+def coerce_boolean(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in TRUE_STRINGS:
+            return True
+        if lowered in FALSE_STRINGS:
+            return False
+    raise ValueError("expected a boolean")
+
+def coerce_date(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value).isoformat()
+        except ValueError:
+            try:
+                return datetime.fromisoformat(value).isoformat()
+            except ValueError:
+                pass
+    raise ValueError("expected an ISO 8601 date")
+
+def coerce_email(value: Any) -> str:
+    if isinstance(value, str) and EMAIL_PATTERN.match(value.strip()):
+        return value.strip()
+    raise ValueError("expected an email address")
+
+def coerce_url(value: Any) -> str:
+    if isinstance(value, str) and URL_PATTERN.match(value.strip()):
+        return value.strip()
+    raise ValueError("expected an http(s) URL")
+
+FIELD_COERCERS: Dict[FieldType, Callable[[Any], Any]] = {
+    FieldType.TEXT: coerce_text,
+    FieldType.TEXTAREA: coerce_text,
+    FieldType.NUMBER: coerce_number,
+    FieldType.BOOLEAN: coerce_boolean,
+    FieldType.DATE: coerce_date,
+    FieldType.EMAIL: coerce_email,
+    FieldType.URL: coerce_url,
+}
+
+CustomDataValidator = Callable[[Dict[str, Any]], Dict[str, Any]]
+_custom_data_validators: Dict[str, tuple] = {}
+
+def compile_custom_data_validator(model: Dict[str, Any]) -> CustomDataValidator:
+    """Build a validator for categories using ``model``; defaults are coerced up front."""
+    compiled = []
+    for field in model.get("fields", []):
+        field = CategoryField(**field)
+        coerce = FIELD_COERCERS[field.type]
+        default = None
+        if field.default_value is not None:
+            try:
+                default = coerce(field.default_value)
+            except ValueError:
+                logger.warning("Ignoring invalid default for %s.%s", model.get("id"), field.name)
+        compiled.append((field.name, coerce, field.required, default))
+
+    def validate(custom_data: Dict[str, Any]) -> Dict[str, Any]:
+        # Keys the model does not declare are passed through untouched
+        result = dict(custom_data)
+        errors = []
+        for name, coerce, required, default in compiled:
+            value = result.get(name)
+            if value is None or value == "":
+                if default is not None:
+                    result[name] = default
+                elif required:
+                    errors.append(f"{name} is required")
+                continue
+            try:
+                result[name] = coerce(value)
+            except ValueError as exc:
+                errors.append(f"{name}: {exc}")
+        if errors:
+            raise CustomDataError(errors)
+        return result
+
+    return validate
+
+async def get_custom_data_validator(model_id: str, version: Optional[int] = None) -> CustomDataValidator:
+    """Return the compiled validator for a model, recompiling it when the stored
+    version moved on. Pass ``version`` when the caller already looked it up."""
+    cached = _custom_data_validators.get(model_id)
+    if cached:
+        if version is None:
+            current = await db.category_models.find_one({"id": model_id}, {"_id": 0, "version": 1})
+            if not current:
+                invalidate_custom_data_validator(model_id)
+                raise HTTPException(status_code=404, detail="Category model not found")
+            version = current.get("version", 1)
+        if cached[0] == version:
+            return cached[1]
+    model = await db.category_models.find_one({"id": model_id}, {"_id": 0, "id": 1, "fields": 1, "version": 1})
+    if not model:
+        raise HTTPException(status_code=404, detail="Category model not found")
+    validator = compile_custom_data_validator(model)
+    _custom_data_validators[model_id] = (model.get("version", 1), validator)
+    return validator
+
+def invalidate_custom_data_validator(model_id: str):
+    _custom_data_validators.pop(model_id, None)
+
+async def validate_custom_data(model_id: Optional[str], custom_data: Dict[str, Any], version: Optional[int] = None) -> Dict[str, Any]:
+    if not model_id:
+        return custom_data
+    validator = await get_custom_data_validator(model_id, version)
+    try:
+        return validator(custom_data)
+    except CustomDataError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid custom_data: {exc}")
+
+# Schema propagation
+#
+# Updating a category model's fields queues a propagate_model_schema job
+# with the schema diff (renamed fields, new or changed defaults, changed
+# types), which applies it to the categories using the model in batches keyed
+# by (model_id, id), checkpointing the last id so a retry resumes there. A
+# category's custom_data is only rewritten if it is still what was read, so
+# concurrent API writes win. Values that do not coerce to a field's new type
+# are left as they are and reported as failures. The jobs run one at a time
+# in the order the model updates were made.
+SCHEMA_PROPAGATION_BATCH_SIZE = int(os.environ.get('SCHEMA_PROPAGATION_BATCH_SIZE', '500'))
+
+def schema_diff(before_fields: List[Dict[str, Any]], after_fields: List[Dict[str, Any]], renames: Dict[str, str]) -> Dict[str, Any]:
+    """Changes to carry over to existing custom_data; renames are applied first, then coercions, then defaults."""
+    previous = {renames.get(field["name"], field["name"]): CategoryField(**field) for field in before_fields}
+    coercions, defaults = {}, {}
+    for field in after_fields:
+        field = CategoryField(**field)
+        old = previous.get(field.name)
+        if old and old.type != field.type:
+            coercions[field.name] = field.type.value
+        if field.default_value is not None and (not old or old.default_value != field.default_value):
+            try:
+                defaults[field.name] = FIELD_COERCERS[field.type](field.default_value)
+            except ValueError:
+                logger.warning("Not propagating the invalid default for %s", field.name)
+    return {"renames": dict(renames), "coercions": coercions, "defaults": defaults}
+
+def apply_schema_diff(diff: Dict[str, Any], custom_data: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    result = dict(custom_data)
+    errors = []
+    for old, new in diff["renames"].items():
+        if old in result:
+            value = result.pop(old)
+            if result.get(new) is None or result.get(new) == "":
+                result[new] = value
+    for name, field_type in diff["coercions"].items():
+        value = result.get(name)
+        if value is None or value == "":
+            continue
+        try:
+            result[name] = FIELD_COERCERS[FieldType(field_type)](value)
+        except ValueError as exc:
+            errors.append(f"{name}: {exc}")
+    for name, default in diff["defaults"].items():
+        if result.get(name) is None or result.get(name) == "":
+            result[name] = default
+    return result, errors
+
+@job_handler("propagate_model_schema", ordered=True)
+async def propagate_schema(ctx: JobContext):
+    model_id, diff = ctx.params["model_id"], ctx.params["diff"]
+    last_id = ctx.progress.get("last_id")
+    if last_id is None:
+        await ctx.report(progress={
+            "total": await db.categories.count_documents({"model_id": model_id}),
+            "processed": 0, "modified": 0, "skipped": 0, "failed": 0,
+        })
+
+    while True:
+        query = {"model_id": model_id, "id": {"$gt": last_id}} if last_id else {"model_id": model_id}
+        batch = await db.categories.find(query, {"_id": 0}).sort("id", 1).limit(
+            SCHEMA_PROPAGATION_BATCH_SIZE
+        ).to_list(SCHEMA_PROPAGATION_BATCH_SIZE)
+        if not batch:
+            break
+        last_id = batch[-1]["id"]
+
+        now = datetime.utcnow()
+        updates, events, failures = [], [], []
+        for doc in batch:
+            custom_data = doc.get("custom_data") or {}
+            result, errors = apply_schema_diff(diff, custom_data)
+            failures.extend({"category_id": doc["id"], "error": error} for error in errors)
+            if result != custom_data:
+                updates.append(UpdateOne(
+                    {"id": doc["id"], "model_id": model_id, "custom_data": custom_data},
+                    {"$set": {"custom_data": result, "updated_at": now}},
+                ))
+                events.append(ChangeEvent("categories", "update", doc["id"], before=doc, after={**doc, "custom_data": result, "updated_at": now}))
+        modified = (await db.categories.bulk_write(updates, ordered=False)).modified_count if updates else 0
+        if modified < len(updates):
+            # Some were rewritten by the API since they were read; only report what this batch changed
+            changed = {doc["id"] async for doc in db.categories.find(
+                {"id": {"$in": [event.id for event in events]}, "updated_at": now}, {"_id": 0, "id": 1}
+            )}
+            events = [event for event in events if event.id in changed]
+        await emit_changes(events)
+        await ctx.report(
+            progress={"last_id": last_id},
+            increment={
+                "processed": len(batch), "modified": modified,
+                "skipped": len(updates) - modified, "failed": len(failures),
+            },
+            failures=failures,
+        )
+    return {key: ctx.progress.get(key, 0) for key in ("processed", "modified", "skipped", "failed")}
+
+# Business field validation
+#
+# Instance values are checked against their template: the field type's
+# coercer, then the template's validation rules (min_length, max_length,
+# pattern, min/max, and a strptime ``format`` for dates) and its option set.
+# Templates are compiled once into a list of checks and cached keyed by the
+# rules they were compiled from, so a changed template, even one changed by
+# another worker, is recompiled on its next use.
+BUSINESS_FIELD_SCAN_BATCH_SIZE = 10000
+
+FieldValueValidator = Callable[[Optional[str]], List[str]]
+_field_validators: Dict[str, tuple] = {}
+
+def field_rules(template: Dict[str, Any]) -> tuple:
+    return (template.get("type", FieldType.TEXT), template.get("required", False), template.get("validation") or {}, template.get("options"))
+
+def compile_field_validator(template: Dict[str, Any]) -> FieldValueValidator:
+    field_type, required, rules, options = field_rules(template)
+    coerce = FIELD_COERCERS[FieldType(field_type)]
+    checks: List[Callable[[Any], Optional[str]]] = []
+
+    min_length, max_length = rules.get("min_length"), rules.get("max_length")
+    if min_length is not None:
+        checks.append(lambda value: f"must be at least {min_length} characters" if len(str(value)) < min_length else None)
+    if max_length is not None:
+        checks.append(lambda value: f"must be at most {max_length} characters" if len(str(value)) > max_length else None)
+    if rules.get("pattern"):
+        try:
+            pattern = re.compile(rules["pattern"])
+            checks.append(lambda value: "does not match the required pattern" if not pattern.search(str(value)) else None)
+        except re.error:
+            logger.warning("Ignoring invalid pattern on business field %s", template.get("id"))
+    minimum = rules.get("min", rules.get("min_value"))
+    maximum = rules.get("max", rules.get("max_value"))
+    if minimum is not None:
+        checks.append(lambda value: f"must be at least {minimum}" if isinstance(value, (int, float)) and value < minimum else None)
+    if maximum is not None:
+        checks.append(lambda value: f"must be at most {maximum}" if isinstance(value, (int, float)) and value > maximum else None)
+    if rules.get("format") and field_type == FieldType.DATE:
+        date_format = rules["format"]
+
+        def coerce(value: Any) -> str:
+            try:
+                return datetime.strptime(str(value), date_format).date().isoformat()
+            except ValueError:
+                raise ValueError(f"expected a date formatted as {date_format}")
+    if options:
+        allowed = frozenset(options)
+        checks.append(lambda value: "is not one of the allowed options" if str(value) not in allowed else None)
+
+    def validate(value: Optional[str]) -> List[str]:
+        if value is None or value == "":
+            return ["is required"] if required else []
+        try:
+            coerced = coerce(value)
+        except ValueError as exc:
+            return [str(exc)]
+        return [error for error in (check(coerced) for check in checks) if error]
+
+    return validate
+
+def get_field_validator(template: Dict[str, Any]) -> FieldValueValidator:
+    rules = field_rules(template)
+    cached = _field_validators.get(template["id"])
+    if cached and cached[0] == rules:
+        return cached[1]
+    validator = compile_field_validator(template)
+    _field_validators[template["id"]] = (rules, validator)
+    return validator
+
+@on_change("business_fields")
+async def drop_field_validators(events: List[ChangeEvent]):
+    for event in events:
+        if event.op == "delete":
+            _field_validators.pop(event.id, None)
+
+def check_field_value(template: Dict[str, Any], value: Optional[str]):
+    errors = get_field_validator(template)(value)
+    if errors:
+        raise HTTPException(status_code=400, detail=f"Invalid value for {template['name']}: {'; '.join(errors)}")
+
+async def scan_field_values(template_field_id: Optional[str]):
+    """Yield NDJSON lines for every instance whose value violates its template, then a summary."""
+    started = time.perf_counter()
+    templates = {
+        template["id"]: get_field_validator(template)
+        async for template in db.business_fields.find({}, {"_id": 0})
+    }
+    query = {"template_field_id": template_field_id} if template_field_id else {}
+    scanned = violations = 0
+    cursor = db.business_field_instances.find(
+        query, {"_id": 0, "id": 1, "template_field_id": 1, "value": 1}
+    ).batch_size(BUSINESS_FIELD_SCAN_BATCH_SIZE)
+    lines = []
+    async for instance in cursor:
+        scanned += 1
+        validator = templates.get(instance["template_field_id"])
+        errors = validator(instance.get("value")) if validator else ["template field not found"]
+        if errors:
+            violations += 1
+            lines.append(json.dumps({
+                "id": instance["id"], "template_field_id": instance["template_field_id"], "errors": errors,
+            }))
+        if len(lines) >= 1000:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+    elapsed = time.perf_counter() - started
+    yield json.dumps({"summary": {
+        "scanned": scanned,
+        "violations": violations,
+        "seconds": round(elapsed, 3),
+        "per_second": round(scanned / elapsed) if elapsed else None,
+    }}) + "\n"
+
+BUSINESS_FIELD_JOB_BATCH_SIZE = 5000
+
+def find_field_violations(templates: List[Dict[str, Any]], instances: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Check one batch of instances; runs in the job process pool."""
+    validators = {template["id"]: get_field_validator(template) for template in templates}
+    violations = []
+    for instance in instances:
+        validator = validators.get(instance["template_field_id"])
+        errors = validator(instance.get("value")) if validator else ["template field not found"]
+        if errors:
+            violations.append({"id": instance["id"], "template_field_id": instance["template_field_id"], "errors": errors})
+    return violations
+
+@job_handler("validate_business_field_instances")
+async def validate_business_field_instances_job(ctx: JobContext):
+    template_field_id = ctx.params.get("template_field_id")
+    query = {"template_field_id": template_field_id} if template_field_id else {}
+    templates = await db.business_fields.find({}, {"_id": 0}).to_list(None)
+    await ctx.report(progress={
+        "total": await db.business_field_instances.count_documents(query), "scanned": 0, "violations": 0,
+    }, clear_failures=True)
+
+    cursor = db.business_field_instances.find(
+        query, {"_id": 0, "id": 1, "template_field_id": 1, "value": 1}
+    ).batch_size(BUSINESS_FIELD_SCAN_BATCH_SIZE)
+    while True:
+        batch = await cursor.to_list(BUSINESS_FIELD_JOB_BATCH_SIZE)
+        if not batch:
+            break
+        violations = await ctx.run_in_process(find_field_violations, templates, batch)
+        await ctx.report(increment={"scanned": len(batch), "violations": len(violations)}, failures=violations)
+    return {"scanned": ctx.progress["scanned"], "violations": ctx.progress["violations"]}
+
+# Category read model
+#
+# ``category_views`` holds one document per category joined with its model
+# summary, the visibility windows that have not ended yet and its breadcrumb,
+# so a category page is a single indexed read. The change listeners below
+# only note which views a write affects; a background task refreshes them a
+# moment later, so views trail writes by about CATEGORY_VIEW_REFRESH_DELAY and
+# the joins stay off the request path. Categories written before the read
+# model existed are backfilled by a rebuild_category_views job queued at
+# startup. effective_status depends on the clock and is re-evaluated from the
+# embedded windows whenever a view is served.
+CATEGORY_VIEW_REFRESH_BATCH_SIZE = 500
+CATEGORY_VIEW_REFRESH_DELAY = float(os.environ.get('CATEGORY_VIEW_REFRESH_DELAY', '0.05'))
+
+def effective_visibility(visibility_status: VisibilityStatus, windows: List[VisibilityWindow], now: datetime) -> VisibilityStatus:
+    """The status of the most recently started window open at ``now``, else the category's own."""
+    active = [
+        window for window in windows
+        if (window.start_date is None or window.start_date <= now)
+        and (window.end_date is None or window.end_date > now)
+    ]
+    if not active:
+        return visibility_status
+    return max(active, key=lambda window: window.start_date or datetime.min).visibility_status
+
+def build_category_view(doc: Dict[str, Any], now: datetime) -> CategoryView:
+    names = {ancestor["id"]: ancestor["name"] for ancestor in doc.get("ancestors", [])}
+    model = doc["model"][0] if doc.get("model") else None
+    windows = [
+        VisibilityWindow(**window) for window in doc.get("visibility_windows", [])
+        if window.get("end_date") is None or window["end_date"] > now
+    ]
+    view = CategoryView(
+        **{key: value for key, value in doc.items() if key in CategoryView.model_fields and key != "model"},
+        model=CategoryModelSummary(
+            id=model["id"],
+            name=model["name"],
+            version=model.get("version", 1),
+            field_count=len(model.get("fields", [])),
+        ) if model else None,
+        breadcrumb=[
+            BreadcrumbEntry(id=ancestor_id, name=names[ancestor_id])
+            for ancestor_id in doc.get("ancestor_ids", []) if ancestor_id in names
+        ],
+    )
+    view.visibility_windows = windows
+    view.effective_status = effective_visibility(view.visibility_status, windows, now)
+    return view
+
+async def refresh_category_views(category_ids: Iterable[str]):
+    """Rebuild the views of ``category_ids`` and drop the ones whose category is gone."""
+    category_ids = list(set(category_ids))
+    for start in range(0, len(category_ids), CATEGORY_VIEW_REFRESH_BATCH_SIZE):
+        chunk = category_ids[start:start + CATEGORY_VIEW_REFRESH_BATCH_SIZE]
+        now = datetime.utcnow()
+        docs = await db.categories.aggregate([
+            {"$match": {"id": {"$in": chunk}}},
+            {"$lookup": {"from": "category_models", "localField": "model_id", "foreignField": "id", "as": "model"}},
+            {"$lookup": {"from": "category_visibility", "localField": "id", "foreignField": "category_id", "as": "visibility_windows"}},
+            {"$lookup": {"from": "categories", "localField": "ancestor_ids", "foreignField": "id", "as": "ancestors"}},
+        ]).to_list(None)
+        writes = [
+            UpdateOne({"id": doc["id"]}, {"$set": build_category_view(doc, now).dict()}, upsert=True)
+            for doc in docs
+        ]
+        if writes:
+            await db.category_views.bulk_write(writes, ordered=False)
+        missing = set(chunk) - {doc["id"] for doc in docs}
+        if missing:
+            await db.category_views.delete_many({"id": {"$in": list(missing)}})
+
+async def rebuild_category_views() -> int:
+    category_ids = [doc["id"] async for doc in db.categories.find({}, {"_id": 0, "id": 1})]
+    await refresh_category_views(category_ids)
+    await db.category_views.delete_many({"id": {"$nin": category_ids}})
+    return len(category_ids)
+
+async def category_view_ids(query: Dict[str, Any]) -> List[str]:
+    return [view["id"] async for view in db.category_views.find(query, {"_id": 0, "id": 1})]
+
+def serve_category_view(doc: Dict[str, Any]) -> CategoryView:
+    view = CategoryView(**doc)
+    view.effective_status = effective_visibility(view.visibility_status, view.visibility_windows, datetime.utcnow())
+    return view
+
+# What the listeners found affected: category ids, plus the subtrees, models
+# and visibility windows whose categories are looked up when refreshing
+pending_view_refresh: Dict[str, Set[str]] = {"categories": set(), "subtrees": set(), "models": set(), "windows": set()}
+view_refresh_wakeup = asyncio.Event()
+
+def queue_view_refresh(kind: str, ids: Iterable[str]):
+    ids = set(ids)
+    if ids:
+        pending_view_refresh[kind].update(ids)
+        view_refresh_wakeup.set()
+
+async def flush_view_refresh():
+    pending = {kind: set(ids) for kind, ids in pending_view_refresh.items()}
+    for ids in pending_view_refresh.values():
+        ids.clear()
+    category_ids = pending["categories"]
+    try:
+        if pending["subtrees"]:
+            category_ids.update(await category_view_ids({"ancestor_ids": {"$in": list(pending["subtrees"])}}))
+        if pending["models"]:
+            category_ids.update(await category_view_ids({"model_id": {"$in": list(pending["models"])}}))
+        if pending["windows"]:
+            category_ids.update(await category_view_ids({"visibility_windows.id": {"$in": list(pending["windows"])}}))
+        await refresh_category_views(category_ids)
+    except Exception:
+        logger.exception("Could not refresh %s category views", len(category_ids))
+        # Retried with the next flush
+        for kind, ids in pending.items():
+            pending_view_refresh[kind].update(ids)
+        raise
+
+async def refresh_views_in_background():
+    while True:
+        await view_refresh_wakeup.wait()
+        # Give concurrent writes a moment to join this refresh
+        await asyncio.sleep(CATEGORY_VIEW_REFRESH_DELAY)
+        view_refresh_wakeup.clear()
+        try:
+            await flush_view_refresh()
+        except Exception:
+            view_refresh_wakeup.set()
+            await asyncio.sleep(1)
+
+@on_change("categories")
+async def refresh_views_for_categories(events: List[ChangeEvent]):
+    affected, restructured = set(), set()
+    for event in events:
+        affected.add(event.id)
+        for doc in (event.before, event.after):
+            if doc:
+                # Ancestors carry child and descendant counts
+                affected.update(doc.get("ancestor_ids", []))
+        if event.op == "delete" or (
+            event.before and event.after and (
+                event.before.get("name") != event.after.get("name")
+                or event.before.get("ancestor_ids") != event.after.get("ancestor_ids")
+            )
+        ):
+            # Descendant breadcrumbs embed this category's name and path
+            restructured.add(event.id)
+    queue_view_refresh("categories", affected)
+    queue_view_refresh("subtrees", restructured)
+
+@on_change("category_models")
+async def refresh_views_for_models(events: List[ChangeEvent]):
+    queue_view_refresh("models", [event.id for event in events if event.op != "create"])
+
+@on_change("category_visibility")
+async def refresh_views_for_visibility(events: List[ChangeEvent]):
+    queue_view_refresh("categories", {
+        doc["category_id"] for event in events for doc in (event.before, event.after) if doc and doc.get("category_id")
+    })
+    queue_view_refresh("windows", [event.id for event in events if event.op == "delete" and not event.before])
+
+@job_handler("rebuild_category_views", concurrency=1)
+async def rebuild_category_views_job(ctx: JobContext):
+    last_id = ctx.progress.get("last_id")
+    while True:
+        query = {"id": {"$gt": last_id}} if last_id else {}
+        category_ids = [
+            doc["id"] async for doc in db.categories.find(query, {"_id": 0, "id": 1})
+            .sort("id", 1).limit(CATEGORY_VIEW_REFRESH_BATCH_SIZE)
+        ]
+        if not category_ids:
+            return {"refreshed": ctx.progress.get("refreshed", 0)}
+        await refresh_category_views(category_ids)
+        last_id = category_ids[-1]
+        await ctx.report(progress={"last_id": last_id}, increment={"refreshed": len(category_ids)})
+
+async def backfill_category_views():
+    """Queue a view rebuild when some categories have no view yet, e.g. after upgrading."""
+    try:
+        if await db.category_views.estimated_document_count() >= await db.categories.estimated_document_count():
+            return
+        # Every worker checks at startup; the lease lets one of them queue the rebuild
+        if not await acquire_lease("category-views-backfill", 60):
+            return
+        pending = {"$in": [JobStatus.QUEUED.value, JobStatus.RUNNING.value]}
+        if not await db.jobs.find_one({"type": "rebuild_category_views", "status": pending}, {"_id": 1}):
+            await enqueue_job("rebuild_category_views", {})
+    except PyMongoError:
+        logger.exception("Could not check the category views for a backfill")
+
+# Category display resolution
+#
+# A category's display configuration is its nearest display_type_id (its own
+# or an ancestor's) with the display_overrides of every category on its path
+# merged over the type's properties, root first; a null override removes the
+# inherited key. Resolutions are memoized per category and built from the
+# deepest memoized ancestor, so resolving siblings loads their shared path
+# once. Every entry is indexed by the ancestors and the display type it was
+# built from: a change to a category forgets only the entries below it, a
+# change to a display type only the entries using it.
+# CATEGORY_DISPLAY_CACHE_TTL bounds staleness from other workers' writes.
+CATEGORY_DISPLAY_CACHE_TTL = float(os.environ.get('CATEGORY_DISPLAY_CACHE_TTL', '60'))
+CATEGORY_DISPLAY_CACHE_SIZE = int(os.environ.get('CATEGORY_DISPLAY_CACHE_SIZE', '10000'))
+DISPLAY_FIELDS = ("display_type_id", "display_overrides", "parent_id", "ancestor_ids")
+
+@dataclass
+class DisplayResolution:
+    expires: float
+    path: List[str]  # Ancestor ids, root first, ending with the category itself
+    display_type: Optional[Dict[str, Any]]
+    inherited_from: Optional[str]  # Category that set the display type
+    overrides: Dict[str, Any]
+    properties: Dict[str, Any]
+
+display_resolutions: Dict[str, DisplayResolution] = {}
+# Category or display type id -> memoized categories resolved through it
+display_dependents: Dict[str, Set[str]] = {}
+# Bumped on every invalidation so a resolution built across a write is not cached
+display_generation = 0
+
+def merge_display_properties(base: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(base)
+    for key, value in overrides.items():
+        if value is None:
+            merged.pop(key, None)
+        elif isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_display_properties(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+def remember_display(category_id: str, resolution: DisplayResolution):
+    if len(display_resolutions) >= CATEGORY_DISPLAY_CACHE_SIZE:
+        display_resolutions.clear()
+        display_dependents.clear()
+    display_resolutions[category_id] = resolution
+    keys = list(resolution.path)
+    if resolution.display_type:
+        keys.append(resolution.display_type["id"])
+    for key in keys:
+        display_dependents.setdefault(key, set()).add(category_id)
+
+def forget_display(ids: Iterable[str]):
+    global display_generation
+    display_generation += 1
+    for key in ids:
+        for category_id in display_dependents.pop(key, ()):
+            display_resolutions.pop(category_id, None)
+
+async def resolve_category_display(category_id: str) -> DisplayResolution:
+    now = time.monotonic()
+    cached = display_resolutions.get(category_id)
+    if cached and cached.expires > now:
+        return cached
+
+    category = await db.categories.find_one({"id": category_id}, {"_id": 0, "ancestor_ids": 1})
+    if not category:
+        raise HTTPException(status_code=404, detail="Category not found")
+    path = category.get("ancestor_ids", []) + [category_id]
+
+    generation = display_generation
+    start, parent = 0, None
+    for depth in range(len(path) - 2, -1, -1):
+        entry = display_resolutions.get(path[depth])
+        if entry and entry.expires > now and entry.path == path[:depth + 1]:
+            start, parent = depth + 1, entry
+            break
+
+    docs = {
+        doc["id"]: doc
+        async for doc in db.categories.find(
+            {"id": {"$in": path[start:]}},
+            {"_id": 0, "id": 1, "display_type_id": 1, "display_overrides": 1},
+        )
+    }
+    type_ids = list({doc["display_type_id"] for doc in docs.values() if doc.get("display_type_id")})
+    display_types = {
+        doc["id"]: DisplayType(**doc).dict()
+        async for doc in db.display_types.find({"id": {"$in": type_ids}}, {"_id": 0})
+    } if type_ids else {}
+
+    expires = now + CATEGORY_DISPLAY_CACHE_TTL
+    for depth in range(start, len(path)):
+        doc = docs.get(path[depth], {})
+        display_type = parent.display_type if parent else None
+        inherited_from = parent.inherited_from if parent else None
+        if doc.get("display_type_id"):
+            display_type = display_types.get(doc["display_type_id"])
+            inherited_from = path[depth] if display_type else None
+        overrides = merge_display_properties(parent.overrides if parent else {}, doc.get("display_overrides") or {})
+        properties = merge_display_properties(display_type["properties"] if display_type else {}, overrides)
+        parent = DisplayResolution(expires, path[:depth + 1], display_type, inherited_from, overrides, properties)
+        if generation == display_generation:
+            remember_display(path[depth], parent)
+    return parent
+
+async def check_display_type(type_id: Optional[str]):
+    if type_id and not await db.display_types.find_one({"id": type_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Display type not found")
+
+@on_change("categories", "display_types")
+async def invalidate_category_displays(events: List[ChangeEvent]):
+    changed = set()
+    for event in events:
+        if event.collection == "display_types" or event.op != "update" or any(
+            (event.before or {}).get(field) != (event.after or {}).get(field) for field in DISPLAY_FIELDS
+        ):
+            changed.add(event.id)
+    if changed:
+        forget_display(changed)
+
+# Icons
+#
+# Icon images are stored once per distinct content in the icons collection,
+# keyed by their SHA-256, and referenced as /api/icons/{icon_id} instead of
+# being inlined as base64 data URLs in every document that shows them.
+DATA_URL_PATTERN = re.compile(r"^data:(?P<content_type>[\w.+-]+/[\w.+-]+)?(;[\w-]+=[^;,]*)*;base64,(?P<data>.*)$", re.DOTALL)
+ICON_URL_PREFIX = "/api/icons/"
+
+async def store_icon(data_url: str) -> Optional[str]:
+    """Move a base64 data URL into the icons collection; None if it is not one."""
+    match = DATA_URL_PATTERN.match(data_url)
+    if not match:
+        return None
+    try:
+        data = base64.b64decode(match.group("data"), validate=True)
+    except ValueError:
+        return None
+    icon_id = hashlib.sha256(data).hexdigest()
+    await db.icons.update_one(
+        {"id": icon_id},
+        {"$setOnInsert": {
+            "id": icon_id,
+            "content_type": match.group("content_type") or "application/octet-stream",
+            "data": Binary(data),
+            "size": len(data),
+            "created_at": datetime.utcnow(),
+        }},
+        upsert=True
+    )
+    return icon_id
+
+async def icon_fields(icon_image: str) -> Dict[str, Any]:
+    if icon_image.startswith("data:"):
+        icon_id = await store_icon(icon_image)
+        if not icon_id:
+            raise HTTPException(status_code=400, detail="Invalid icon_image data URL")
+        return {"icon_image": ICON_URL_PREFIX + icon_id, "icon_id": icon_id}
+    if icon_image.startswith(ICON_URL_PREFIX):
+        return {"icon_image": icon_image, "icon_id": icon_image[len(ICON_URL_PREFIX):]}
+    return {"icon_image": icon_image, "icon_id": None}
+
+# Schema migrations
+#
+# A migration names a collection, a filter matching the documents still in
+# the old shape and a transform returning the fields to $set on one of them
+# (None skips it). Migrations run in version order in the background, in
+# batches ordered by id; the last id of every batch is checkpointed in the
+# migrations collection so an interrupted run resumes where it stopped, and
+# MIGRATION_OPS_PER_SECOND caps the write rate against the live database.
+# Each update re-checks the filter, so a document the API rewrote in the
+# meantime is left alone. Readers must accept both shapes until a migration
+# has completed.
+MIGRATIONS_AUTO_RUN = os.environ.get('MIGRATIONS_AUTO_RUN', 'true').lower() in ('1', 'true', 'yes')
+MIGRATION_BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', '200'))
+MIGRATION_OPS_PER_SECOND = float(os.environ.get('MIGRATION_OPS_PER_SECOND', '500'))
+MIGRATION_LEASE_SECONDS = 60
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    transform: Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+
+MIGRATIONS: Dict[int, Migration] = {}
+
+def migration(version: int, name: str, collection: str, filter: Dict[str, Any]):
+    def register(transform):
+        if version in MIGRATIONS:
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS[version] = Migration(version, name, collection, filter, transform)
+        return transform
+    return register
+
+@migration(1, "category_ancestor_ids", "categories", {"ancestor_ids": {"$exists": False}})
+async def backfill_category_ancestor_ids(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    ancestor_ids: List[str] = []
+    parent_id = doc.get("parent_id")
+    while parent_id and parent_id not in ancestor_ids and parent_id != doc["id"]:
+        ancestor_ids.insert(0, parent_id)
+        parent = await db.categories.find_one({"id": parent_id}, {"_id": 0, "parent_id": 1})
+        parent_id = parent.get("parent_id") if parent else None
+    return {"ancestor_ids": ancestor_ids}
+
+@migration(2, "social_handle_icon_refs", "social_handles", {"icon_image": {"$regex": "^data:"}})
+async def move_social_handle_icons(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    icon_id = await store_icon(doc["icon_image"])
+    if not icon_id:
+        return None
+    return {"icon_image": ICON_URL_PREFIX + icon_id, "icon_id": icon_id}
+
+@migration(3, "category_rank_keys", "categories", {"rank": None})
+async def backfill_category_ranks(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return {"rank": append_rank(created_at=doc.get("created_at"))}
+
+@migration(4, "business_field_rank_keys", "business_fields", {"rank": None})
+async def backfill_business_field_ranks(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return {"rank": append_rank(created_at=doc.get("created_at"))}
+
+@migration(5, "category_visibility_updated_at", "category_visibility", {"updated_at": {"$exists": False}})
+async def backfill_visibility_updated_at(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return {"updated_at": doc.get("created_at") or datetime.utcnow()}
+
+async def apply_migration(step: Migration):
+    state = await db.migrations.find_one_and_update(
+        {"id": step.version},
+        {
+            "$set": {"status": "running", "updated_at": datetime.utcnow(), "error": None},
+            "$setOnInsert": {
+                "id": step.version, "name": step.name, "collection": step.collection,
+                "last_id": None, "processed": 0, "modified": 0, "skipped": 0,
+                "started_at": datetime.utcnow(),
+            },
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    collection = db[step.collection]
+    remaining = await collection.count_documents({**step.filter, "id": {"$gt": state["last_id"] or ""}})
+    await db.migrations.update_one({"id": step.version}, {"$set": {"total": state["processed"] + remaining}})
+
+    last_id = state["last_id"]
+    while True:
+        if not await acquire_lease("migrations", MIGRATION_LEASE_SECONDS):
+            logger.warning("Lost the migrations lease during %s; it resumes on the next run", step.name)
+            return False
+        started = time.monotonic()
+        query = {**step.filter, "id": {"$gt": last_id}} if last_id else step.filter
+        batch = await collection.find(query, {"_id": 0}).sort("id", 1).limit(MIGRATION_BATCH_SIZE).to_list(MIGRATION_BATCH_SIZE)
+        if not batch:
+            break
+
+        updates, events = [], []
+        for doc in batch:
+            changes = await step.transform(doc)
+            if changes:
+                # Bumped so delta-sync clients pick up the rewritten documents
+                changes.setdefault("updated_at", datetime.utcnow())
+                updates.append(UpdateOne({**step.filter, "id": doc["id"]}, {"$set": changes}))
+                events.append(ChangeEvent(step.collection, "update", doc["id"], before=doc, after={**doc, **changes}))
+        modified = (await collection.bulk_write(updates, ordered=False)).modified_count if updates else 0
+        # Views, pricing, the event feed and the audit log follow migrated rows like any other write
+        await emit_changes(events)
+        last_id = batch[-1]["id"]
+        await db.migrations.update_one({"id": step.version}, {
+            "$set": {"last_id": last_id, "updated_at": datetime.utcnow()},
+            "$inc": {"processed": len(batch), "modified": modified, "skipped": len(batch) - len(updates)},
+        })
+
+        # Stay within the write budget before reading the next batch
+        budget_seconds = len(batch) / MIGRATION_OPS_PER_SECOND if MIGRATION_OPS_PER_SECOND > 0 else 0
+        await asyncio.sleep(max(0.0, budget_seconds - (time.monotonic() - started)))
+
+    await db.migrations.update_one({"id": step.version}, {
+        "$set": {"status": "completed", "completed_at": datetime.utcnow(), "updated_at": datetime.utcnow()}
+    })
+    logger.info("Migration %s completed", step.name)
+    return True
+
+migration_lock = asyncio.Lock()
+
+async def run_migrations():
+    """Apply pending migrations in version order; one process at a time runs them."""
+    if migration_lock.locked():
+        return
+    async with migration_lock:
+        if not await acquire_lease("migrations", MIGRATION_LEASE_SECONDS):
+            return
+        completed = {
+            state["id"] async for state in db.migrations.find({"status": "completed"}, {"_id": 0, "id": 1})
+        }
+        applied = set()
+        for version in sorted(MIGRATIONS):
+            if version in completed:
+                continue
+            step = MIGRATIONS[version]
+            try:
+                if not await apply_migration(step):
+                    return
+                applied.add(version)
+            except Exception as exc:
+                logger.exception("Migration %s failed", step.name)
+                await db.migrations.update_one({"id": version}, {
+                    "$set": {"status": "failed", "error": str(exc), "updated_at": datetime.utcnow()}
+                })
+                return
+        if applied & NATURAL_KEY_MIGRATIONS:
+            # The duplicates that kept these indexes from being built are gone now
+            await ensure_natural_key_indexes()
+
+async def migration_status() -> List[Dict[str, Any]]:
+    states = {state["id"]: state async for state in db.migrations.find({}, {"_id": 0})}
+    report = []
+    for version in sorted(MIGRATIONS):
+        step = MIGRATIONS[version]
+        state = states.get(version, {"status": "pending", "processed": 0})
+        total = state.get("total")
+        report.append({
+            "version": version,
+            "name": step.name,
+            "collection": step.collection,
+            **state,
+            "progress": state["processed"] / total if total else (1.0 if state["status"] == "completed" else 0.0),
+        })
+    return report
+
+# Write coalescing
+#
+# With WRITE_COALESCING_ENABLED, single-document creates on the hot insert
+# paths are queued per collection and flushed together with one unordered
+# insert_many once WRITE_COALESCING_WINDOW_MS has passed or
+# WRITE_COALESCING_MAX_BATCH documents are waiting. Each caller still gets its
+# own outcome: a document rejected by the batch raises the same error
+# insert_one would have.
+WRITE_COALESCING_ENABLED = os.environ.get('WRITE_COALESCING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+WRITE_COALESCING_WINDOW_MS = float(os.environ.get('WRITE_COALESCING_WINDOW_MS', '2'))
+WRITE_COALESCING_MAX_BATCH = int(os.environ.get('WRITE_COALESCING_MAX_BATCH', '500'))
+
+class WriteCoalescer:
+    def __init__(self, collection: str, window: float, max_batch: int):
+        self.collection = collection
+        self.window = window
+        self.max_batch = max_batch
+        self.pending: List[Tuple[Dict[str, Any], asyncio.Future, float]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.flushes: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.documents = 0
+        self.max_batch_size = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def insert(self, document: Dict[str, Any]):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((document, future, time.perf_counter()))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self.flush)
+        await future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.create_task(self._write(batch))
+            self.flushes.add(task)
+            task.add_done_callback(self.flushes.discard)
+
+    async def drain(self):
+        self.flush()
+        if self.flushes:
+            await asyncio.gather(*self.flushes, return_exceptions=True)
+
+    async def _write(self, batch: List[Tuple[Dict[str, Any], asyncio.Future, float]]):
+        started = time.perf_counter()
+        waits = [started - queued_at for _, _, queued_at in batch]
+        self.batches += 1
+        self.documents += len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        self.total_wait += sum(waits)
+        self.max_wait = max(self.max_wait, max(waits))
+
+        failures: Dict[int, Exception] = {}
+        try:
+            await db[self.collection].insert_many([document for document, _, _ in batch], ordered=False)
+        except BulkWriteError as exc:
+            for error in exc.details.get("writeErrors", []):
+                error_type = DuplicateKeyError if error.get("code") == 11000 else WriteError
+                failures[error["index"]] = error_type(error.get("errmsg"), error.get("code"), error)
+        except Exception as exc:
+            failures = {index: exc for index in range(len(batch))}
+
+        for index, (_, future, _) in enumerate(batch):
+            if future.done():
+                continue
+            if index in failures:
+                future.set_exception(failures[index])
+            else:
+                future.set_result(None)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "documents": self.documents,
+            "mean_batch_size": self.documents / self.batches if self.batches else 0,
+            "max_batch_size": self.max_batch_size,
+            "mean_added_latency_ms": 1000 * self.total_wait / self.documents if self.documents else 0,
+            "max_added_latency_ms": 1000 * self.max_wait,
+            "pending": len(self.pending),
+        }
+
+write_coalescers: Dict[str, WriteCoalescer] = {
+    collection: WriteCoalescer(collection, WRITE_COALESCING_WINDOW_MS / 1000, WRITE_COALESCING_MAX_BATCH)
+    for collection in ("categories", "business_field_instances")
+}
+
+async def insert_document(collection: str, document: Dict[str, Any]):
+    """insert_one, routed through the collection's coalescer when write coalescing is on."""
+    coalescer = write_coalescers.get(collection)
+    if WRITE_COALESCING_ENABLED and coalescer:
+        await coalescer.insert(document)
+    else:
+        await db[collection].insert_one(document)
+
+# Write-behind logs
+#
+# Append-only side records of a write (the change feed entries, delete
+# tombstones) are handed to a per-log queue and inserted in batches by a
+# background task, so they add no round trip to the request that caused them.
+# Unlike the audit queue nothing is dropped: a full queue makes writers wait.
+WRITE_BEHIND_QUEUE_SIZE = int(os.environ.get('WRITE_BEHIND_QUEUE_SIZE', '10000'))
+WRITE_BEHIND_BATCH_SIZE = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', '500'))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.environ.get('WRITE_BEHIND_FLUSH_INTERVAL', '0.05'))
+
+class WriteBehindLog:
+    def __init__(self, name: str, write: Callable[[List[Dict[str, Any]]], Awaitable[None]]):
+        self.name = name
+        self.write = write
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WRITE_BEHIND_QUEUE_SIZE)
+        self.stats = {"enqueued": 0, "written": 0, "failed": 0}
+        write_behind_logs[name] = self
+
+    async def append(self, records: List[Dict[str, Any]]):
+        for record in records:
+            await self.queue.put(record)
+        self.stats["enqueued"] += len(records)
+
+    async def flush(self, records: List[Dict[str, Any]]):
+        try:
+            await self.write(records)
+            self.stats["written"] += len(records)
+        except Exception:
+            self.stats["failed"] += len(records)
+            logger.exception("Could not write %s %s records", len(records), self.name)
+
+    async def run(self):
+        while True:
+            records = [await self.queue.get()]
+            # Give concurrent writes a moment to join this batch
+            await asyncio.sleep(WRITE_BEHIND_FLUSH_INTERVAL)
+            while len(records) < WRITE_BEHIND_BATCH_SIZE and not self.queue.empty():
+                records.append(self.queue.get_nowait())
+            await self.flush(records)
+
+    async def drain(self):
+        while not self.queue.empty():
+            records = []
+            while len(records) < WRITE_BEHIND_BATCH_SIZE and not self.queue.empty():
+                records.append(self.queue.get_nowait())
+            await self.flush(records)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "queue_depth": self.queue.qsize()}
+
+write_behind_logs: Dict[str, WriteBehindLog] = {}
+
+# Resource registry
+#
+# The nine CRUD resources by URL segment, for the routes that work across all
+# of them. These generic routes are registered ahead of the per-resource ones
+# so their literal path segments win over ``/{resource}/{id}``.
+@dataclass
+class ResourceSpec:
+    collection: str
+    model: type
+    label: str
+
+RESOURCES: Dict[str, ResourceSpec] = {
+    "category-models": ResourceSpec("category_models", CategoryModel, "Category model"),
+    "categories": ResourceSpec("categories", Category, "Category"),
+    "category-visibility": ResourceSpec("category_visibility", CategoryVisibility, "Category visibility setting"),
+    "visibility-types": ResourceSpec("visibility_types", VisibilityType, "Visibility type"),
+    "pricing-models": ResourceSpec("pricing_models", PricingModel, "Pricing model"),
+    "display-types": ResourceSpec("display_types", DisplayType, "Display type"),
+    "social-handles": ResourceSpec("social_handles", SocialHandle, "Social handle"),
+    "business-fields": ResourceSpec("business_fields", BusinessField, "Business field"),
+    "business-field-instances": ResourceSpec("business_field_instances", BusinessFieldInstance, "Business field instance"),
+}
+BATCH_GET_MAX_IDS = int(os.environ.get('BATCH_GET_MAX_IDS', '500'))
+
+# Natural keys are enforced by unique indexes rather than a find_one before
+# each write; a DuplicateKeyError from the write becomes the 400 below.
+# NATURAL_KEYS_CASE_INSENSITIVE opts into comparing names with a strength-2
+# collation; the default keeps the exact-match semantics of the old pre-check.
+# The old pre-check was not atomic, so existing data may hold duplicates that
+# keep an index from being built. Startup then logs the conflicting keys and
+# serves on; the unique-name migrations rename every duplicate but the first
+# created (appending part of its id) and build the missing indexes once done.
+NATURAL_KEYS_CASE_INSENSITIVE = os.environ.get('NATURAL_KEYS_CASE_INSENSITIVE', 'false').lower() in ('1', 'true', 'yes')
+
+@dataclass
+class NaturalKey:
+    fields: Tuple[str, ...]
+    detail: str
+
+NATURAL_KEYS: Dict[str, NaturalKey] = {
+    "social_handles": NaturalKey(("name",), "Social handle with this name already exists"),
+    "visibility_types": NaturalKey(("name",), "Visibility type with this name already exists"),
+    "categories": NaturalKey(("parent_id", "name"), "Category with this name already exists under this parent"),
+    "business_fields": NaturalKey(("category", "name"), "Business field with this name already exists in this category"),
+}
+
+def duplicate_name_error(collection: str) -> HTTPException:
+    return HTTPException(status_code=400, detail=NATURAL_KEYS[collection].detail)
+
+def natural_key_collation() -> Optional[Dict[str, Any]]:
+    return {"locale": "en", "strength": 2} if NATURAL_KEYS_CASE_INSENSITIVE else None
+
+def rename_duplicate_names(collection: str):
+    key = NATURAL_KEYS[collection]
+
+    async def transform(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # The document created first keeps its name
+        created_at = doc.get("created_at")
+        earlier = await db[collection].find_one({
+            **{field: doc.get(field) for field in key.fields},
+            "$or": [{"created_at": {"$lt": created_at}}, {"created_at": created_at, "id": {"$lt": doc["id"]}}],
+        }, {"_id": 1}, collation=natural_key_collation())
+        if not earlier:
+            return None
+        name = f"{doc['name']} ({doc['id'][:8]})"
+        logger.warning("Renaming duplicate %s %s from %r to %r", collection, doc["id"], doc["name"], name)
+        return {"name": name}
+    return transform
+
+NATURAL_KEY_MIGRATIONS = {6, 7, 8, 9}
+migration(6, "social_handle_unique_names", "social_handles", {})(rename_duplicate_names("social_handles"))
+migration(7, "visibility_type_unique_names", "visibility_types", {})(rename_duplicate_names("visibility_types"))
+migration(8, "category_unique_names", "categories", {})(rename_duplicate_names("categories"))
+migration(9, "business_field_unique_names", "business_fields", {})(rename_duplicate_names("business_fields"))
+
+class BatchGetRequest(BaseModel):
+    ids: List[str]
+
+# Delta sync
+#
+# GET /api/{resource}/changes pages through documents in (updated_at, id)
+# order, plus the tombstones deletes leave behind, so a mirror only pays for
+# what changed. The opaque token carries the position of both cursors.
+# Tombstones expire after TOMBSTONE_TTL_SECONDS; a mirror that has been away
+# longer than that must resync from an empty token. They are written through
+# a write-behind log, well within SYNC_SETTLE_SECONDS of their deleted_at.
+TOMBSTONE_TTL_SECONDS = int(os.environ.get('TOMBSTONE_TTL_SECONDS', str(30 * 24 * 3600)))
+SYNC_SETTLE_SECONDS = float(os.environ.get('SYNC_SETTLE_SECONDS', '1'))
+SYNC_MAX_PAGE_SIZE = 5000
+
+def encode_sync_token(position: Dict[str, Any]) -> str:
+    payload = {
+        key: [value[0].isoformat() if value[0] else None, value[1]] if value else None
+        for key, value in position.items()
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+def decode_sync_token(token: Optional[str]) -> Dict[str, Any]:
+    if not token:
+        return {"u": None, "d": None}
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return {
+            key: [datetime.fromisoformat(payload[key][0]) if payload[key][0] else None, payload[key][1]]
+            if payload.get(key) else None
+            for key in ("u", "d")
+        }
+    except (ValueError, TypeError, KeyError, IndexError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+def keyset_after(field: str, position: Optional[List[Any]]) -> Dict[str, Any]:
+    """Match documents sorting after ``position`` in (field, id) order; missing values sort first."""
+    if not position:
+        return {}
+    value, last_id = position
+    if value is None:
+        return {"$or": [{field: None, "id": {"$gt": last_id}}, {field: {"$ne": None}}]}
+    return {"$or": [{field: value, "id": {"$gt": last_id}}, {field: {"$gt": value}}]}
+
+async def write_tombstones(tombstones: List[Dict[str, Any]]):
+    await db.tombstones.insert_many(tombstones, ordered=False)
+
+tombstone_log = WriteBehindLog("tombstones", write_tombstones)
+
+@on_change("*")
+async def record_tombstones(events: List[ChangeEvent]):
+    deleted_at = datetime.utcnow()
+    tombstones = [
+        {"collection": event.collection, "id": event.id, "deleted_at": deleted_at}
+        for event in events if event.op == "delete"
+    ]
+    if tombstones:
+        await tombstone_log.append(tombstones)
+
+def get_resource_spec(resource: str) -> ResourceSpec:
+    spec = RESOURCES.get(resource)
+    if not spec:
+        raise HTTPException(status_code=404, detail="Resource not found")
+    return spec
+
+# Audit log
+#
+# Every change to a resource collection becomes a compact audit record (the
+# fields that changed, with their before and after values, plus the X-Actor
+# header of the request that made it). Records are queued in memory and
+# written in batches by a background task, so auditing adds no round-trip to
+# the write path; when the queue is full, records are dropped and counted
+# rather than slowing writers down. Records expire after AUDIT_RETENTION_DAYS.
+AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', '500'))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', '0.5'))
+AUDIT_RETENTION_DAYS = int(os.environ.get('AUDIT_RETENTION_DAYS', '365'))
+AUDIT_IGNORED_FIELDS = {"_id", "updated_at"}
+
+audit_actor: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("audit_actor", default=None)
+audit_queue: asyncio.Queue = asyncio.Queue(maxsize=AUDIT_QUEUE_SIZE)
+audit_stats = {"enqueued": 0, "dropped": 0, "written": 0, "failed": 0}
+
+def audit_record(event: ChangeEvent) -> Dict[str, Any]:
+    before, after = event.before or {}, event.after or {}
+    fields = [k for k in {**before, **after} if k not in AUDIT_IGNORED_FIELDS and before.get(k) != after.get(k)]
+    return {
+        "id": str(uuid.uuid4()),
+        "resource": event.collection,
+        "resource_id": event.id,
+        "op": event.op,
+        "actor": audit_actor.get(),
+        "at": datetime.utcnow(),
+        "changes": {k: {"before": before.get(k), "after": after.get(k)} for k in fields},
+    }
+
+@on_change(*(spec.collection for spec in RESOURCES.values()))
+async def enqueue_audit_records(events: List[ChangeEvent]):
+    for event in events:
+        try:
+            audit_queue.put_nowait(audit_record(event))
+            audit_stats["enqueued"] += 1
+        except asyncio.QueueFull:
+            audit_stats["dropped"] += 1
+
+async def insert_audit_records(records: List[Dict[str, Any]]):
+    try:
+        await db.audit_log.insert_many(records, ordered=False)
+        audit_stats["written"] += len(records)
+    except Exception:
+        audit_stats["failed"] += len(records)
+        logger.exception("Could not write %s audit records", len(records))
+
+async def write_audit_records():
+    while True:
+        records = [await audit_queue.get()]
+        # Give concurrent writes a moment to join this batch
+        await asyncio.sleep(AUDIT_FLUSH_INTERVAL)
+        while len(records) < AUDIT_BATCH_SIZE and not audit_queue.empty():
+            records.append(audit_queue.get_nowait())
+        await insert_audit_records(records)
+
+async def drain_audit_records():
+    records = []
+    while not audit_queue.empty():
+        records.append(audit_queue.get_nowait())
+    for start in range(0, len(records), AUDIT_BATCH_SIZE):
+        await insert_audit_records(records[start:start + AUDIT_BATCH_SIZE])
+
+class AuditContextMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            actor = next((value.decode("latin-1") for key, value in scope["headers"] if key == b"x-actor"), None)
+            audit_actor.set(actor)
+        await self.app(scope, receive, send)
+
+# Generic Resource Routes
+@api_router.post("/{resource}/batch-get")
+async def batch_get_resources(resource: str, request: BatchGetRequest):
+    spec = get_resource_spec(resource)
+    if len(request.ids) > BATCH_GET_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_GET_MAX_IDS} ids per request")
+
+    ids = list(dict.fromkeys(request.ids))
+    docs = await db[spec.collection].find({"id": {"$in": ids}}).to_list(len(ids))
+    found = {doc["id"]: doc for doc in docs}
+    return {
+        "items": [spec.model(**found[doc_id]) for doc_id in ids if doc_id in found],
+        "missing": [doc_id for doc_id in ids if doc_id not in found],
+    }
+
+@api_router.get("/{resource}/changes")
+async def get_resource_changes(
+    resource: str,
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=SYNC_MAX_PAGE_SIZE),
+):
+    spec = get_resource_spec(resource)
+    position = decode_sync_token(since)
+    # Writes stamped just before "now" may still be in flight; leaving them
+    # for the next poll keeps the cursor from moving past them
+    settled = datetime.utcnow() - timedelta(seconds=SYNC_SETTLE_SECONDS)
+
+    doc_query = {"$and": [
+        keyset_after("updated_at", position["u"]),
+        {"$or": [{"updated_at": {"$lt": settled}}, {"updated_at": None}]},
+    ]}
+    docs = await db[spec.collection].find(doc_query, {"_id": 0}).sort(
+        [("updated_at", 1), ("id", 1)]
+    ).limit(limit).to_list(limit)
+
+    tombstone_query = {"$and": [
+        {"collection": spec.collection, "deleted_at": {"$lt": settled}},
+        keyset_after("deleted_at", position["d"]),
+    ]}
+    tombstones = await db.tombstones.find(tombstone_query, {"_id": 0}).sort(
+        [("deleted_at", 1), ("id", 1)]
+    ).limit(limit).to_list(limit)
+
+    if docs:
+        position["u"] = [docs[-1].get("updated_at"), docs[-1]["id"]]
+    if tombstones:
+        position["d"] = [tombstones[-1]["deleted_at"], tombstones[-1]["id"]]
+    return {
+        "items": [spec.model(**doc) for doc in docs],
+        "deleted": [tombstone["id"] for tombstone in tombstones],
+        "next_token": encode_sync_token(position),
+        "has_more": len(docs) == limit or len(tombstones) == limit,
+    }
+
 # Category Model Routes
 @api_router.post("/category-models", response_model=CategoryModel)
 async def create_category_model(model_data: CategoryModelCreate):
     model_dict = model_data.dict()
     model_obj = CategoryModel(**model_dict)
     await db.category_models.insert_one(model_obj.dict())
+    await emit_change("category_models", "create", model_obj.id, after=model_obj.dict())
     return model_obj
 
 @api_router.get("/category-models", response_model=List[CategoryModel])
@@ -300,37 +2555,156 @@ async def get_category_model(model_id: str):
 @api_router.put("/category-models/{model_id}", response_model=CategoryModel)
 async def update_category_model(model_id: str, model_data: CategoryModelUpdate):
     update_dict = {k: v for k, v in model_data.dict().items() if v is not None}
+    renames = update_dict.pop("renames", None) or {}
     update_dict["updated_at"] = datetime.utcnow()
-    
-    result = await db.category_models.update_one(
-        {"id": model_id}, 
-        {"$set": update_dict}
+    if renames:
+        if "fields" not in update_dict:
+            raise HTTPException(status_code=400, detail="renames requires the updated fields")
+        new_names = {field["name"] for field in update_dict["fields"]}
+        missing = sorted(new for new in renames.values() if new not in new_names)
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Renamed fields missing from fields: {', '.join(missing)}")
+
+    existing_model = await db.category_models.find_one_and_update(
+        {"id": model_id},
+        {"$set": update_dict, "$inc": {"version": 1}}
     )
-    
-    if result.matched_count == 0:
+
+    if not existing_model:
         raise HTTPException(status_code=404, detail="Category model not found")
-    
-    updated_model = await db.category_models.find_one({"id": model_id})
+
+    updated_model = {**existing_model, **update_dict, "version": existing_model.get("version", 0) + 1}
+    invalidate_custom_data_validator(model_id)
+    await emit_change("category_models", "update", model_id, before=existing_model, after=updated_model)
+
+    if "fields" in update_dict:
+        diff = schema_diff(existing_model.get("fields", []), update_dict["fields"], renames)
+        if any(diff.values()):
+            await enqueue_job("propagate_model_schema", {
+                "model_id": model_id, "version": updated_model["version"], "diff": diff,
+            })
     return CategoryModel(**updated_model)
 
+@api_router.get("/category-models/{model_id}/propagations", response_model=List[Job])
+async def get_model_propagations(model_id: str, limit: int = Query(20, ge=1, le=100)):
+    jobs = await db.jobs.find(
+        {"type": "propagate_model_schema", "params.model_id": model_id}, {"_id": 0}
+    ).sort("created_at", -1).limit(limit).to_list(limit)
+    return [Job(**job) for job in jobs]
+
 @api_router.delete("/category-models/{model_id}")
 async def delete_category_model(model_id: str):
-    result = await db.category_models.delete_one({"id": model_id})
-    if result.deleted_count == 0:
+    model = await db.category_models.find_one_and_delete({"id": model_id})
+    if not model:
         raise HTTPException(status_code=404, detail="Category model not found")
+    invalidate_custom_data_validator(model_id)
+    await emit_change("category_models", "delete", model_id, before=model)
     return {"message": "Category model deleted successfully"}
 
 # Category Routes
 @api_router.post("/categories", response_model=Category)
 async def create_category(category_data: CategoryCreate):
     category_dict = category_data.dict()
+    category_dict["custom_data"] = await validate_custom_data(category_data.model_id, category_data.custom_data)
+    await check_display_type(category_data.display_type_id)
     category_obj = Category(**category_dict)
-    await db.categories.insert_one(category_obj.dict())
+    category_obj.rank = append_rank()
+    category_obj.ancestor_ids = await resolve_ancestor_ids(category_obj.parent_id)
+    try:
+        await insert_document("categories", category_obj.dict())
+    except DuplicateKeyError:
+        raise duplicate_name_error("categories")
+    await shift_tree_counters(category_obj.ancestor_ids, 1, 1)
+    await adjust_usage_count(db.category_models, "usage_count", category_obj.model_id, 1)
+    await emit_change("categories", "create", category_obj.id, after=category_obj.dict())
     return category_obj
 
+@api_router.post("/categories/bulk")
+async def bulk_create_categories(bulk_data: CategoryBulkCreate):
+    if len(bulk_data.categories) > CATEGORY_BULK_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {CATEGORY_BULK_MAX_SIZE} categories per request")
+
+    parent_ids = list({item.parent_id for item in bulk_data.categories if item.parent_id})
+    ancestor_paths: Dict[Optional[str], List[str]] = {None: []}
+    async for parent in db.categories.find({"id": {"$in": parent_ids}}, {"_id": 0, "id": 1, "ancestor_ids": 1}):
+        ancestor_paths[parent["id"]] = parent.get("ancestor_ids", []) + [parent["id"]]
+    type_ids = list({item.display_type_id for item in bulk_data.categories if item.display_type_id})
+    known_type_ids = {doc["id"] async for doc in db.display_types.find({"id": {"$in": type_ids}}, {"_id": 0, "id": 1})}
+    model_ids = list({item.model_id for item in bulk_data.categories if item.model_id})
+    model_versions = {
+        doc["id"]: doc.get("version", 1)
+        async for doc in db.category_models.find({"id": {"$in": model_ids}}, {"_id": 0, "id": 1, "version": 1})
+    }
+
+    documents, positions, errors = [], [], []
+    for index, item in enumerate(bulk_data.categories):
+        if item.parent_id not in ancestor_paths:
+            errors.append({"index": index, "detail": "Parent category not found"})
+            continue
+        if item.display_type_id and item.display_type_id not in known_type_ids:
+            errors.append({"index": index, "detail": "Display type not found"})
+            continue
+        if item.model_id and item.model_id not in model_versions:
+            errors.append({"index": index, "detail": "Category model not found"})
+            continue
+        try:
+            custom_data = await validate_custom_data(item.model_id, item.custom_data, model_versions.get(item.model_id))
+        except HTTPException as exc:
+            errors.append({"index": index, "detail": exc.detail})
+            continue
+        category_obj = Category(**{**item.dict(), "custom_data": custom_data})
+        category_obj.rank = append_rank(index)
+        category_obj.ancestor_ids = ancestor_paths[item.parent_id]
+        documents.append(category_obj.dict())
+        positions.append(index)
+
+    if documents:
+        try:
+            await db.categories.insert_many(documents, ordered=False)
+        except BulkWriteError as exc:
+            failed = {
+                error["index"]: NATURAL_KEYS["categories"].detail if error.get("code") == 11000 else error["errmsg"]
+                for error in exc.details.get("writeErrors", [])
+            }
+            errors.extend({"index": positions[i], "detail": message} for i, message in failed.items())
+            documents = [doc for i, doc in enumerate(documents) if i not in failed]
+
+        child_counts: Dict[str, int] = {}
+        descendant_counts: Dict[str, int] = {}
+        model_usage: Dict[str, int] = {}
+        for doc in documents:
+            if doc["ancestor_ids"]:
+                child_counts[doc["parent_id"]] = child_counts.get(doc["parent_id"], 0) + 1
+            for ancestor_id in doc["ancestor_ids"]:
+                descendant_counts[ancestor_id] = descendant_counts.get(ancestor_id, 0) + 1
+            if doc["model_id"]:
+                model_usage[doc["model_id"]] = model_usage.get(doc["model_id"], 0) + 1
+        now = datetime.utcnow()
+        counter_updates = [
+            UpdateOne({"id": category_id}, {
+                "$inc": {"descendant_count": count, "child_count": child_counts.get(category_id, 0)},
+                "$set": {"updated_at": now},
+            })
+            for category_id, count in descendant_counts.items()
+        ]
+        if counter_updates:
+            await db.categories.bulk_write(counter_updates, ordered=False)
+        if model_usage:
+            await db.category_models.bulk_write([
+                UpdateOne({"id": model_id}, {"$inc": {"usage_count": count}, "$set": {"updated_at": now}})
+                for model_id, count in model_usage.items()
+            ], ordered=False)
+        await emit_changes([ChangeEvent("categories", "create", doc["id"], after=doc) for doc in documents])
+
+    return {
+        "created": len(documents),
+        "ids": [doc["id"] for doc in documents],
+        "errors": sorted(errors, key=lambda error: error["index"]),
+    }
+
 @api_router.get("/categories", response_model=List[Category])
 async def get_categories():
-    categories = await db.categories.find().sort("sort_order", 1).to_list(1000)
+    categories = await db.categories.find().sort([("sort_order", 1), ("rank", 1)]).to_list(1000)
     return [Category(**category) for category in categories]
 
 @api_router.get("/categories/{category_id}", response_model=Category)
@@ -344,31 +2718,167 @@ async def get_category(category_id: str):
 async def update_category(category_id: str, category_data: CategoryUpdate):
     update_dict = {k: v for k, v in category_data.dict().items() if v is not None}
     update_dict["updated_at"] = datetime.utcnow()
-    
-    result = await db.categories.update_one(
-        {"id": category_id}, 
-        {"$set": update_dict}
-    )
-    
-    if result.matched_count == 0:
+
+    existing_category = await db.categories.find_one({"id": category_id})
+    if not existing_category:
         raise HTTPException(status_code=404, detail="Category not found")
-    
-    updated_category = await db.categories.find_one({"id": category_id})
+
+    reparented = "parent_id" in update_dict and update_dict["parent_id"] != existing_category.get("parent_id")
+    if reparented:
+        update_dict["ancestor_ids"] = await resolve_ancestor_ids(update_dict["parent_id"], category_id)
+    if "custom_data" in update_dict or "model_id" in update_dict:
+        update_dict["custom_data"] = await validate_custom_data(
+            update_dict.get("model_id", existing_category.get("model_id")),
+            update_dict.get("custom_data", existing_category.get("custom_data", {}))
+        )
+    if "display_type_id" in update_dict:
+        await check_display_type(update_dict["display_type_id"])
+
+    try:
+        updated_category = await db.categories.find_one_and_update(
+            {"id": category_id},
+            {"$set": update_dict},
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise duplicate_name_error("categories")
+
+    if not updated_category:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    if reparented:
+        await move_subtree(existing_category, update_dict["ancestor_ids"])
+    if "model_id" in update_dict and update_dict["model_id"] != existing_category.get("model_id"):
+        await adjust_usage_count(db.category_models, "usage_count", existing_category.get("model_id"), -1)
+        await adjust_usage_count(db.category_models, "usage_count", update_dict["model_id"], 1)
+
+    await emit_change("categories", "update", category_id, before=existing_category, after=updated_category)
     return Category(**updated_category)
 
+@api_router.post("/categories/{category_id}/move", response_model=Category)
+async def move_category(category_id: str, move_data: CategoryMove):
+    category = await db.categories.find_one({"id": category_id})
+    if not category:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    # Omitting parent_id keeps the category under its current parent; null moves it to the root
+    parent_id = move_data.parent_id if "parent_id" in move_data.model_fields_set else category.get("parent_id")
+    update_dict = await place_between(
+        db.categories,
+        {"parent_id": parent_id},
+        "sort_order",
+        category_id,
+        move_data.after,
+        move_data.before,
+        category.get("sort_order", 0),
+        "Sibling category not found",
+    )
+    reparented = parent_id != category.get("parent_id")
+    if reparented:
+        update_dict["parent_id"] = parent_id
+        update_dict["ancestor_ids"] = await resolve_ancestor_ids(parent_id, category_id)
+    update_dict["updated_at"] = datetime.utcnow()
+
+    try:
+        moved_category = await db.categories.find_one_and_update(
+            {"id": category_id},
+            {"$set": update_dict},
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise duplicate_name_error("categories")
+    if not moved_category:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    if reparented:
+        await move_subtree(category, update_dict["ancestor_ids"])
+    await emit_change("categories", "update", category_id, before=category, after=moved_category)
+    return Category(**moved_category)
+
 @api_router.delete("/categories/{category_id}")
-async def delete_category(category_id: str):
-    result = await db.categories.delete_one({"id": category_id})
-    if result.deleted_count == 0:
+async def delete_category(
+    category_id: str,
+    cascade: Optional[Literal["subtree"]] = None,
+    dry_run: bool = False,
+    background: bool = False,
+):
+    if background:
+        if cascade != "subtree" or dry_run:
+            raise HTTPException(status_code=400, detail="background is only supported with cascade=subtree")
+        return await enqueue_job("cascade_delete", {"category_id": category_id})
+    if cascade == "subtree":
+        summary = await delete_category_subtree(category_id, dry_run=dry_run)
+        if dry_run:
+            return summary
+        return {"message": "Category subtree deleted successfully", **summary}
+    if dry_run:
+        raise HTTPException(status_code=400, detail="dry_run is only supported with cascade=subtree")
+
+    category = await db.categories.find_one_and_delete({"id": category_id})
+    if not category:
         raise HTTPException(status_code=404, detail="Category not found")
+
+    ancestor_ids = category.get("ancestor_ids", [])
+    await shift_tree_counters(ancestor_ids, 1 + category.get("descendant_count", 0), -1)
+    if category.get("descendant_count"):
+        # The children keep their parent_id but are no longer below the old ancestors
+        await db.categories.update_many(
+            {"ancestor_ids": category_id},
+            {"$pullAll": {"ancestor_ids": ancestor_ids + [category_id]}, "$set": {"updated_at": datetime.utcnow()}}
+        )
+    await adjust_usage_count(db.category_models, "usage_count", category.get("model_id"), -1)
+    await emit_change("categories", "delete", category_id, before=category)
     return {"message": "Category deleted successfully"}
 
+@api_router.get("/categories/{category_id}/display")
+async def get_category_display(category_id: str):
+    resolution = await resolve_category_display(category_id)
+    display_type = resolution.display_type
+    return jsonable_encoder({
+        "category_id": category_id,
+        "display_type_id": display_type["id"] if display_type else None,
+        "inherited_from": resolution.inherited_from,
+        "display_type": {
+            key: display_type[key] for key in ("id", "name", "type_category", "responsive", "active")
+        } if display_type else None,
+        "properties": resolution.properties,
+    })
+
+@api_router.get("/categories/{category_id}/view", response_model=CategoryView)
+async def get_category_view(category_id: str):
+    view = await db.category_views.find_one({"id": category_id}, {"_id": 0})
+    if not view:
+        # Categories written before the read model existed are materialized on first read
+        await refresh_category_views([category_id])
+        view = await db.category_views.find_one({"id": category_id}, {"_id": 0})
+        if not view:
+            raise HTTPException(status_code=404, detail="Category not found")
+    return serve_category_view(view)
+
+@api_router.get("/category-views", response_model=CategoryViewPage)
+async def get_category_views(
+    parent_id: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+):
+    query: Dict[str, Any] = {}
+    if parent_id is not None:
+        query["parent_id"] = parent_id
+    if after:
+        query["id"] = {"$gt": after}
+    views = await db.category_views.find(query, {"_id": 0}).sort("id", 1).limit(limit).to_list(limit)
+    return CategoryViewPage(
+        items=[serve_category_view(view) for view in views],
+        next_after=views[-1]["id"] if len(views) == limit else None,
+    )
+
 # Category Visibility Routes
 @api_router.post("/category-visibility", response_model=CategoryVisibility)
 async def create_category_visibility(visibility_data: CategoryVisibilityCreate):
     visibility_dict = visibility_data.dict()
     visibility_obj = CategoryVisibility(**visibility_dict)
     await db.category_visibility.insert_one(visibility_obj.dict())
+    await emit_change("category_visibility", "create", visibility_obj.id, after=visibility_obj.dict())
     return visibility_obj
 
 @api_router.get("/category-visibility", response_model=List[CategoryVisibility])
@@ -386,23 +2896,26 @@ async def get_category_visibility_by_id(visibility_id: str):
 @api_router.put("/category-visibility/{visibility_id}", response_model=CategoryVisibility)
 async def update_category_visibility(visibility_id: str, visibility_data: CategoryVisibilityUpdate):
     update_dict = {k: v for k, v in visibility_data.dict().items() if v is not None}
-    
-    result = await db.category_visibility.update_one(
-        {"id": visibility_id}, 
+    update_dict["updated_at"] = datetime.utcnow()
+
+    existing_visibility = await db.category_visibility.find_one_and_update(
+        {"id": visibility_id},
         {"$set": update_dict}
     )
-    
-    if result.matched_count == 0:
+
+    if not existing_visibility:
         raise HTTPException(status_code=404, detail="Category visibility setting not found")
-    
-    updated_visibility = await db.category_visibility.find_one({"id": visibility_id})
+
+    updated_visibility = {**existing_visibility, **update_dict}
+    await emit_change("category_visibility", "update", visibility_id, before=existing_visibility, after=updated_visibility)
     return CategoryVisibility(**updated_visibility)
 
 @api_router.delete("/category-visibility/{visibility_id}")
 async def delete_category_visibility(visibility_id: str):
-    result = await db.category_visibility.delete_one({"id": visibility_id})
-    if result.deleted_count == 0:
+    visibility = await db.category_visibility.find_one_and_delete({"id": visibility_id})
+    if not visibility:
         raise HTTPException(status_code=404, detail="Category visibility setting not found")
+    await emit_change("category_visibility", "delete", visibility_id, before=visibility)
     return {"message": "Category visibility setting deleted successfully"}
 
 # Visibility Types Routes
@@ -410,7 +2923,11 @@ async def delete_category_visibility(visibility_id: str):
 async def create_visibility_type(type_data: VisibilityTypeCreate):
     type_dict = type_data.dict()
     type_obj = VisibilityType(**type_dict)
-    await db.visibility_types.insert_one(type_obj.dict())
+    try:
+        await db.visibility_types.insert_one(type_obj.dict())
+    except DuplicateKeyError:
+        raise duplicate_name_error("visibility_types")
+    await emit_change("visibility_types", "create", type_obj.id, after=type_obj.dict())
     return type_obj
 
 @api_router.get("/visibility-types", response_model=List[VisibilityType])
@@ -430,37 +2947,261 @@ async def update_visibility_type(type_id: str, type_data: VisibilityTypeUpdate):
     update_dict = {k: v for k, v in type_data.dict().items() if v is not None}
     update_dict["updated_at"] = datetime.utcnow()
     
-    result = await db.visibility_types.update_one(
-        {"id": type_id}, 
-        {"$set": update_dict}
-    )
-    
-    if result.matched_count == 0:
+    try:
+        existing_type = await db.visibility_types.find_one_and_update(
+            {"id": type_id},
+            {"$set": update_dict}
+        )
+    except DuplicateKeyError:
+        raise duplicate_name_error("visibility_types")
+
+    if not existing_type:
         raise HTTPException(status_code=404, detail="Visibility type not found")
-    
-    updated_type = await db.visibility_types.find_one({"id": type_id})
+
+    updated_type = {**existing_type, **update_dict}
+    await emit_change("visibility_types", "update", type_id, before=existing_type, after=updated_type)
     return VisibilityType(**updated_type)
 
 @api_router.delete("/visibility-types/{type_id}")
 async def delete_visibility_type(type_id: str):
-    result = await db.visibility_types.delete_one({"id": type_id})
-    if result.deleted_count == 0:
+    deleted_type = await db.visibility_types.find_one_and_delete({"id": type_id})
+    if not deleted_type:
         raise HTTPException(status_code=404, detail="Visibility type not found")
+    await emit_change("visibility_types", "delete", type_id, before=deleted_type)
     return {"message": "Visibility type deleted successfully"}
 
+# Pricing catalog
+#
+# All pricing models are held in memory, kept current by the change listener
+# for this worker's own writes and revalidated against MongoDB every
+# PRICING_CACHE_REVALIDATE_SECONDS (one aggregation) so other workers' writes
+# are picked up too. Quotes are computed over columnar NumPy arrays built from
+# the catalog on first use after a change. Features are interned in a
+# dictionary (feature -> bit) and every plan keeps a bitset of its features
+# next to an inverted index of the plans per feature; both are updated per
+# changed plan instead of being rebuilt.
+PRICING_CACHE_REVALIDATE_SECONDS = float(os.environ.get('PRICING_CACHE_REVALIDATE_SECONDS', '5'))
+PRICING_QUOTE_MAX = int(os.environ.get('PRICING_QUOTE_MAX', '100000'))
+# Units of each currency per unit of a common base currency
+EXCHANGE_RATES: Dict[str, float] = json.loads(os.environ.get('EXCHANGE_RATES', '{"USD": 1.0}'))
+MONTHS_PER_INTERVAL = {"daily": 12 / 365, "weekly": 12 / 52, "monthly": 1.0, "quarterly": 3.0, "yearly": 12.0}
+
+class PricingQuoteRequest(BaseModel):
+    plan_ids: Optional[List[str]] = None  # defaults to every active plan; repeats are quoted again
+    currencies: List[str] = ["USD"]
+
+@dataclass
+class PricingArrays:
+    ids: List[str]
+    index: Dict[str, int]
+    price: np.ndarray  # list price in the plan's own currency, NaN when unpriced
+    source_rate: np.ndarray  # exchange rate of the plan's currency, NaN when unknown
+    months: np.ndarray  # months covered by one billing interval, NaN for one-time plans
+
+class PricingCatalog:
+    def __init__(self):
+        self.plans: Dict[str, Dict[str, Any]] = {}
+        self.feature_bits: Dict[str, int] = {}
+        self.features: List[str] = []
+        self.plan_features: Dict[str, int] = {}
+        self.feature_plans: Dict[int, Set[str]] = {}
+        self.matrix: Optional[Dict[str, Any]] = None
+        self.loaded = False
+        self.checked_at = 0.0
+        self.fingerprint: Optional[Dict[str, Any]] = None
+        self.arrays: Optional[PricingArrays] = None
+        self.lock = asyncio.Lock()
+
+    async def ensure_fresh(self):
+        if self.loaded and time.monotonic() - self.checked_at < PRICING_CACHE_REVALIDATE_SECONDS:
+            return
+        async with self.lock:
+            if self.loaded and time.monotonic() - self.checked_at < PRICING_CACHE_REVALIDATE_SECONDS:
+                return
+            summary = await db.pricing_models.aggregate([
+                {"$group": {"_id": None, "count": {"$sum": 1}, "latest": {"$max": "$updated_at"}}},
+            ]).to_list(1)
+            fingerprint = summary[0] if summary else {}
+            if not self.loaded or fingerprint != self.fingerprint:
+                self.reset(await db.pricing_models.find({}, {"_id": 0}).to_list(None))
+                self.fingerprint = fingerprint
+            self.loaded = True
+            self.checked_at = time.monotonic()
+
+    def reset(self, docs: List[Dict[str, Any]]):
+        self.plans = {}
+        self.feature_bits, self.features = {}, []
+        self.plan_features, self.feature_plans = {}, {}
+        for doc in docs:
+            self.put(doc)
+        self.arrays = self.matrix = None
+
+    def apply(self, event: ChangeEvent):
+        if event.op == "delete":
+            self.remove(event.id)
+        else:
+            self.put({k: v for k, v in event.after.items() if k != "_id"})
+        self.arrays = self.matrix = None
+        # Keeps ensure_fresh from reloading everything for a change this worker already applied;
+        # a change made elsewhere still leaves the stored fingerprint different
+        self.fingerprint = self.local_fingerprint()
+
+    def local_fingerprint(self) -> Dict[str, Any]:
+        """The fingerprint ensure_fresh would read if the collection matched the cached plans."""
+        if not self.plans:
+            return {}
+        stamps = [plan["updated_at"] for plan in self.plans.values() if isinstance(plan.get("updated_at"), datetime)]
+        latest = max(stamps) if stamps else None
+        if latest:
+            # MongoDB stores datetimes with millisecond precision
+            latest = latest.replace(microsecond=latest.microsecond // 1000 * 1000)
+        return {"_id": None, "count": len(self.plans), "latest": latest}
+
+    def put(self, plan: Dict[str, Any]):
+        self.remove(plan["id"])
+        self.plans[plan["id"]] = plan
+        bits = 0
+        for feature in plan.get("features") or []:
+            if feature not in self.feature_bits:
+                self.feature_bits[feature] = len(self.features)
+                self.features.append(feature)
+            bit = self.feature_bits[feature]
+            bits |= 1 << bit
+            self.feature_plans.setdefault(bit, set()).add(plan["id"])
+        self.plan_features[plan["id"]] = bits
+
+    def remove(self, plan_id: str):
+        self.plans.pop(plan_id, None)
+        bits = self.plan_features.pop(plan_id, 0)
+        while bits:
+            low = bits & -bits
+            self.feature_plans[low.bit_length() - 1].discard(plan_id)
+            bits ^= low
+
+    def with_features(self, features: List[str]) -> List[Dict[str, Any]]:
+        """Plans that include every one of ``features``."""
+        if any(feature not in self.feature_bits for feature in features):
+            return []
+        bits = [self.feature_bits[feature] for feature in features]
+        mask = sum(1 << bit for bit in set(bits))
+        # Start from the smallest posting list and confirm the rest with the bitsets
+        candidates = min((self.feature_plans[bit] for bit in bits), key=len)
+        return [self.plans[plan_id] for plan_id in candidates if self.plan_features[plan_id] & mask == mask]
+
+    def get_matrix(self) -> Dict[str, Any]:
+        if self.matrix is None:
+            plans = sorted(
+                self.plans.values(),
+                key=lambda plan: (plan.get("price") is None, plan.get("price") or 0, plan["name"])
+            )
+            used = sorted(bit for bit, plan_ids in self.feature_plans.items() if plan_ids)
+            self.matrix = {
+                "features": [self.features[bit] for bit in used],
+                "plans": [
+                    {k: plan.get(k) for k in ("id", "name", "price", "currency", "interval", "active")}
+                    for plan in plans
+                ],
+                # One row per feature, one column per plan
+                "matrix": [
+                    [bool(self.plan_features[plan["id"]] >> bit & 1) for plan in plans]
+                    for bit in used
+                ],
+            }
+        return self.matrix
+
+    def get_arrays(self) -> PricingArrays:
+        if self.arrays is None:
+            active = [plan for plan in self.plans.values() if plan.get("active", True)]
+            self.arrays = PricingArrays(
+                ids=[plan["id"] for plan in active],
+                index={plan["id"]: row for row, plan in enumerate(active)},
+                price=np.array([plan.get("price") if plan.get("price") is not None else np.nan for plan in active], dtype=float),
+                source_rate=np.array([EXCHANGE_RATES.get(plan.get("currency") or "USD", np.nan) for plan in active], dtype=float),
+                months=np.array([MONTHS_PER_INTERVAL.get(plan.get("interval") or "", np.nan) for plan in active], dtype=float),
+            )
+        return self.arrays
+
+pricing_catalog = PricingCatalog()
+
+@on_change("pricing_models")
+async def update_pricing_catalog(events: List[ChangeEvent]):
+    if pricing_catalog.loaded:
+        for event in events:
+            pricing_catalog.apply(event)
+
+def nullable(values: np.ndarray) -> List[Optional[float]]:
+    """Array to list with NaN as None, for JSON."""
+    result = values.astype(object)
+    result[np.isnan(values)] = None
+    return result.tolist()
+
 # Pricing Models Routes
+@api_router.post("/pricing-models/quote")
+async def quote_pricing_models(request: PricingQuoteRequest):
+    unknown = [currency for currency in request.currencies if currency not in EXCHANGE_RATES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"No exchange rate configured for {', '.join(unknown)}")
+
+    await pricing_catalog.ensure_fresh()
+    arrays = pricing_catalog.get_arrays()
+    if request.plan_ids is None:
+        plan_ids, missing = arrays.ids, []
+    else:
+        plan_ids = [plan_id for plan_id in request.plan_ids if plan_id in arrays.index]
+        missing = [plan_id for plan_id in request.plan_ids if plan_id not in arrays.index]
+    if len(plan_ids) * len(request.currencies) > PRICING_QUOTE_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {PRICING_QUOTE_MAX} quotes per request")
+
+    rows = np.fromiter((arrays.index[plan_id] for plan_id in plan_ids), dtype=np.intp, count=len(plan_ids))
+    targets = np.array([EXCHANGE_RATES[currency] for currency in request.currencies], dtype=float)
+    # Per plan in base currency, then one column per requested currency
+    base_price = arrays.price[rows] / arrays.source_rate[rows]
+    base_monthly = base_price / arrays.months[rows]
+    price = np.round(np.outer(base_price, targets), 2).ravel()
+    monthly = np.round(np.outer(base_monthly, targets), 2).ravel()
+    yearly = np.round(np.outer(base_monthly * 12, targets), 2).ravel()
+
+    currencies = request.currencies * len(plan_ids)
+    quote_ids = [plan_id for plan_id in plan_ids for _ in request.currencies]
+    quotes = [
+        {"plan_id": plan_id, "currency": currency, "price": p, "monthly": m, "yearly": y}
+        for plan_id, currency, p, m, y in zip(quote_ids, currencies, nullable(price), nullable(monthly), nullable(yearly))
+    ]
+    # Plain floats and strings only, so skip the generic response encoder
+    return JSONResponse({"quotes": quotes, "missing": missing})
+
 @api_router.post("/pricing-models", response_model=PricingModel)
 async def create_pricing_model(model_data: PricingModelCreate):
     model_dict = model_data.dict()
     model_obj = PricingModel(**model_dict)
     await db.pricing_models.insert_one(model_obj.dict())
+    await emit_change("pricing_models", "create", model_obj.id, after=model_obj.dict())
     return model_obj
 
 @api_router.get("/pricing-models", response_model=List[PricingModel])
-async def get_pricing_models():
+async def get_pricing_models(has_feature: Optional[List[str]] = Query(None)):
+    if has_feature:
+        await pricing_catalog.ensure_fresh()
+        models = sorted(pricing_catalog.with_features(has_feature), key=lambda model: model["created_at"], reverse=True)
+        return [PricingModel(**model) for model in models]
     models = await db.pricing_models.find().sort("created_at", -1).to_list(1000)
     return [PricingModel(**model) for model in models]
 
+@api_router.get("/pricing-models/matrix")
+async def get_pricing_matrix(include_inactive: bool = False):
+    await pricing_catalog.ensure_fresh()
+    matrix = pricing_catalog.get_matrix()
+    if include_inactive:
+        return matrix
+    active = [column for column, plan in enumerate(matrix["plans"]) if plan["active"] is not False]
+    rows = [[row[column] for column in active] for row in matrix["matrix"]]
+    used = [index for index, row in enumerate(rows) if any(row)]
+    return {
+        "features": [matrix["features"][index] for index in used],
+        "plans": [matrix["plans"][column] for column in active],
+        "matrix": [rows[index] for index in used],
+    }
+
 @api_router.get("/pricing-models/{model_id}", response_model=PricingModel)
 async def get_pricing_model(model_id: str):
     model = await db.pricing_models.find_one({"id": model_id})
@@ -473,22 +3214,24 @@ async def update_pricing_model(model_id: str, model_data: PricingModelUpdate):
     update_dict = {k: v for k, v in model_data.dict().items() if v is not None}
     update_dict["updated_at"] = datetime.utcnow()
     
-    result = await db.pricing_models.update_one(
-        {"id": model_id}, 
+    existing_model = await db.pricing_models.find_one_and_update(
+        {"id": model_id},
         {"$set": update_dict}
     )
-    
-    if result.matched_count == 0:
+
+    if not existing_model:
         raise HTTPException(status_code=404, detail="Pricing model not found")
-    
-    updated_model = await db.pricing_models.find_one({"id": model_id})
+
+    updated_model = {**existing_model, **update_dict}
+    await emit_change("pricing_models", "update", model_id, before=existing_model, after=updated_model)
     return PricingModel(**updated_model)
 
 @api_router.delete("/pricing-models/{model_id}")
 async def delete_pricing_model(model_id: str):
-    result = await db.pricing_models.delete_one({"id": model_id})
-    if result.deleted_count == 0:
+    deleted_model = await db.pricing_models.find_one_and_delete({"id": model_id})
+    if not deleted_model:
         raise HTTPException(status_code=404, detail="Pricing model not found")
+    await emit_change("pricing_models", "delete", model_id, before=deleted_model)
     return {"message": "Pricing model deleted successfully"}
 
 # Display Types Routes
@@ -497,6 +3240,7 @@ async def create_display_type(type_data: DisplayTypeCreate):
     type_dict = type_data.dict()
     type_obj = DisplayType(**type_dict)
     await db.display_types.insert_one(type_obj.dict())
+    await emit_change("display_types", "create", type_obj.id, after=type_obj.dict())
     return type_obj
 
 @api_router.get("/display-types", response_model=List[DisplayType])
@@ -516,35 +3260,38 @@ async def update_display_type(type_id: str, type_data: DisplayTypeUpdate):
     update_dict = {k: v for k, v in type_data.dict().items() if v is not None}
     update_dict["updated_at"] = datetime.utcnow()
     
-    result = await db.display_types.update_one(
-        {"id": type_id}, 
+    existing_type = await db.display_types.find_one_and_update(
+        {"id": type_id},
         {"$set": update_dict}
     )
-    
-    if result.matched_count == 0:
+
+    if not existing_type:
         raise HTTPException(status_code=404, detail="Display type not found")
-    
-    updated_type = await db.display_types.find_one({"id": type_id})
+
+    updated_type = {**existing_type, **update_dict}
+    await emit_change("display_types", "update", type_id, before=existing_type, after=updated_type)
     return DisplayType(**updated_type)
 
 @api_router.delete("/display-types/{type_id}")
 async def delete_display_type(type_id: str):
-    result = await db.display_types.delete_one({"id": type_id})
-    if result.deleted_count == 0:
+    deleted_type = await db.display_types.find_one_and_delete({"id": type_id})
+    if not deleted_type:
         raise HTTPException(status_code=404, detail="Display type not found")
+    await emit_change("display_types", "delete", type_id, before=deleted_type)
     return {"message": "Display type deleted successfully"}
 
 # Social Handles Routes
 @api_router.post("/social-handles", response_model=SocialHandle)
 async def create_social_handle(handle_data: SocialHandleCreate):
-    # Check for duplicates by name
-    existing_handle = await db.social_handles.find_one({"name": handle_data.name})
-    if existing_handle:
-        raise HTTPException(status_code=400, detail="Social handle with this name already exists")
-    
     handle_dict = handle_data.dict()
+    if handle_dict.get("icon_image"):
+        handle_dict.update(await icon_fields(handle_dict["icon_image"]))
     handle_obj = SocialHandle(**handle_dict)
-    await db.social_handles.insert_one(handle_obj.dict())
+    try:
+        await db.social_handles.insert_one(handle_obj.dict())
+    except DuplicateKeyError:
+        raise duplicate_name_error("social_handles")
+    await emit_change("social_handles", "create", handle_obj.id, after=handle_obj.dict())
     return handle_obj
 
 @api_router.get("/social-handles", response_model=List[SocialHandle])
@@ -561,49 +3308,162 @@ async def get_social_handle(handle_id: str):
 
 @api_router.put("/social-handles/{handle_id}", response_model=SocialHandle)
 async def update_social_handle(handle_id: str, handle_data: SocialHandleUpdate):
-    # Check for duplicates by name if name is being updated
-    if handle_data.name:
-        existing_handle = await db.social_handles.find_one({
-            "name": handle_data.name,
-            "id": {"$ne": handle_id}
-        })
-        if existing_handle:
-            raise HTTPException(status_code=400, detail="Social handle with this name already exists")
-    
     update_dict = {k: v for k, v in handle_data.dict().items() if v is not None}
     update_dict["updated_at"] = datetime.utcnow()
+    if "icon_image" in update_dict:
+        update_dict.update(await icon_fields(update_dict["icon_image"]))
     
-    result = await db.social_handles.update_one(
-        {"id": handle_id}, 
-        {"$set": update_dict}
-    )
-    
-    if result.matched_count == 0:
+    try:
+        existing_handle = await db.social_handles.find_one_and_update(
+            {"id": handle_id},
+            {"$set": update_dict}
+        )
+    except DuplicateKeyError:
+        raise duplicate_name_error("social_handles")
+
+    if not existing_handle:
         raise HTTPException(status_code=404, detail="Social handle not found")
-    
-    updated_handle = await db.social_handles.find_one({"id": handle_id})
+
+    updated_handle = {**existing_handle, **update_dict}
+    await emit_change("social_handles", "update", handle_id, before=existing_handle, after=updated_handle)
     return SocialHandle(**updated_handle)
 
 @api_router.delete("/social-handles/{handle_id}")
 async def delete_social_handle(handle_id: str):
-    result = await db.social_handles.delete_one({"id": handle_id})
-    if result.deleted_count == 0:
+    deleted_handle = await db.social_handles.find_one_and_delete({"id": handle_id})
+    if not deleted_handle:
         raise HTTPException(status_code=404, detail="Social handle not found")
+    await emit_change("social_handles", "delete", handle_id, before=deleted_handle)
     return {"message": "Social handle deleted successfully"}
 
+# Icon Routes
+@api_router.get("/icons/{icon_id}")
+async def get_icon(icon_id: str):
+    icon = await db.icons.find_one({"id": icon_id})
+    if not icon:
+        raise HTTPException(status_code=404, detail="Icon not found")
+    # Icons are content-addressed, so a given URL never changes
+    return Response(
+        content=bytes(icon["data"]),
+        media_type=icon["content_type"],
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+# Business field forms
+#
+# GET /api/business-fields/form returns templates grouped by category and
+# ordered by (order, rank), each with its oldest ``instance_limit`` instances
+# embedded (``instance_count`` says how many there are in total). One
+# aggregation joins the capped instances through the (template_field_id,
+# created_at) index and is streamed template by template, then grouped here:
+# grouping in MongoDB would put a whole category in one document, which
+# large categories push past the 16MB BSON limit. Results are cached per
+# category until a template in that category, or an instance of one of its
+# templates, changes (or BUSINESS_FIELD_FORM_CACHE_TTL passes, which bounds
+# staleness from other workers' writes).
+BUSINESS_FIELD_FORM_CACHE_TTL = float(os.environ.get('BUSINESS_FIELD_FORM_CACHE_TTL', '30'))
+BUSINESS_FIELD_FORM_INSTANCE_LIMIT = int(os.environ.get('BUSINESS_FIELD_FORM_INSTANCE_LIMIT', '100'))
+BUSINESS_FIELD_FORM_MAX_INSTANCE_LIMIT = 1000
+
+@dataclass
+class CachedForm:
+    expires: float
+    template_ids: Set[str]
+    result: List[Dict[str, Any]]
+
+business_field_forms: Dict[tuple, CachedForm] = {}
+# Bumped on every invalidation so a form built across a write is not cached
+business_field_form_generation = 0
+
+async def build_business_field_form(category: Optional[str], active_only: bool, instance_limit: int) -> CachedForm:
+    match: Dict[str, Any] = {}
+    instance_match: Dict[str, Any] = {"$expr": {"$eq": ["$template_field_id", "$$template_id"]}}
+    if category:
+        match["category"] = category
+    if active_only:
+        match["active"] = True
+        instance_match["active"] = {"$ne": False}
+    cursor = db.business_fields.aggregate([
+        {"$match": match},
+        {"$sort": {"category": 1, "order": 1, "rank": 1}},
+        {"$lookup": {
+            "from": "business_field_instances",
+            "let": {"template_id": "$id"},
+            "pipeline": [
+                {"$match": instance_match},
+                {"$sort": {"created_at": 1}},
+                {"$limit": instance_limit},
+                {"$project": {"_id": 0}},
+            ],
+            "as": "instances",
+        }} if instance_limit else {"$addFields": {"instances": []}},
+        {"$project": {"_id": 0}},
+    ])
+
+    template_ids = set()
+    result: List[Dict[str, Any]] = []
+    async for field in cursor:
+        template_ids.add(field["id"])
+        instances = field.pop("instances")
+        if not result or result[-1]["category"] != field.get("category"):
+            result.append({"category": field.get("category"), "fields": []})
+        result[-1]["fields"].append({
+            **BusinessField(**field).dict(),
+            "instances": [BusinessFieldInstance(**instance).dict() for instance in instances],
+        })
+    return CachedForm(time.monotonic() + BUSINESS_FIELD_FORM_CACHE_TTL, template_ids, jsonable_encoder(result))
+
+@on_change("business_fields", "business_field_instances")
+async def invalidate_business_field_forms(events: List[ChangeEvent]):
+    global business_field_form_generation
+    business_field_form_generation += 1
+    categories, template_ids = set(), set()
+    for event in events:
+        for doc in (event.before, event.after):
+            if not doc:
+                continue
+            if event.collection == "business_fields":
+                categories.add(doc.get("category"))
+            else:
+                template_ids.add(doc.get("template_field_id"))
+    for key in list(business_field_forms):
+        category = key[0]
+        if category is None or category in categories or business_field_forms[key].template_ids & template_ids:
+            business_field_forms.pop(key, None)
+
 # Business Fields Routes
 @api_router.post("/business-fields", response_model=BusinessField)
 async def create_business_field(field_data: BusinessFieldCreate):
     field_dict = field_data.dict()
     field_obj = BusinessField(**field_dict)
-    await db.business_fields.insert_one(field_obj.dict())
+    field_obj.rank = append_rank()
+    try:
+        await db.business_fields.insert_one(field_obj.dict())
+    except DuplicateKeyError:
+        raise duplicate_name_error("business_fields")
+    await emit_change("business_fields", "create", field_obj.id, after=field_obj.dict())
     return field_obj
 
 @api_router.get("/business-fields", response_model=List[BusinessField])
 async def get_business_fields():
-    fields = await db.business_fields.find().sort("order", 1).to_list(1000)
+    fields = await db.business_fields.find().sort([("order", 1), ("rank", 1)]).to_list(1000)
     return [BusinessField(**field) for field in fields]
 
+@api_router.get("/business-fields/form")
+async def get_business_field_form(
+    category: Optional[str] = None,
+    active_only: bool = False,
+    instance_limit: int = Query(BUSINESS_FIELD_FORM_INSTANCE_LIMIT, ge=0, le=BUSINESS_FIELD_FORM_MAX_INSTANCE_LIMIT),
+):
+    key = (category, active_only, instance_limit)
+    cached = business_field_forms.get(key)
+    if not cached or cached.expires < time.monotonic():
+        generation = business_field_form_generation
+        cached = await build_business_field_form(category, active_only, instance_limit)
+        if generation == business_field_form_generation:
+            business_field_forms[key] = cached
+    return {"categories": cached.result}
+
 @api_router.get("/business-fields/{field_id}", response_model=BusinessField)
 async def get_business_field(field_id: str):
     field = await db.business_fields.find_one({"id": field_id})
@@ -616,37 +3476,85 @@ async def update_business_field(field_id: str, field_data: BusinessFieldUpdate):
     update_dict = {k: v for k, v in field_data.dict().items() if v is not None}
     update_dict["updated_at"] = datetime.utcnow()
     
-    result = await db.business_fields.update_one(
-        {"id": field_id}, 
-        {"$set": update_dict}
-    )
-    
-    if result.matched_count == 0:
+    try:
+        existing_field = await db.business_fields.find_one_and_update(
+            {"id": field_id},
+            {"$set": update_dict}
+        )
+    except DuplicateKeyError:
+        raise duplicate_name_error("business_fields")
+
+    if not existing_field:
         raise HTTPException(status_code=404, detail="Business field not found")
-    
-    updated_field = await db.business_fields.find_one({"id": field_id})
+
+    updated_field = {**existing_field, **update_dict}
+    await emit_change("business_fields", "update", field_id, before=existing_field, after=updated_field)
     return BusinessField(**updated_field)
 
+@api_router.post("/business-fields/{field_id}/move", response_model=BusinessField)
+async def move_business_field(field_id: str, move_data: BusinessFieldMove):
+    field = await db.business_fields.find_one({"id": field_id})
+    if not field:
+        raise HTTPException(status_code=404, detail="Business field not found")
+
+    category = move_data.category or field.get("category", "general")
+    update_dict = await place_between(
+        db.business_fields,
+        {"category": category},
+        "order",
+        field_id,
+        move_data.after,
+        move_data.before,
+        field.get("order", 0),
+        "Sibling business field not found",
+    )
+    update_dict["category"] = category
+    update_dict["updated_at"] = datetime.utcnow()
+
+    try:
+        moved_field = await db.business_fields.find_one_and_update(
+            {"id": field_id},
+            {"$set": update_dict},
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise duplicate_name_error("business_fields")
+    if not moved_field:
+        raise HTTPException(status_code=404, detail="Business field not found")
+    await emit_change("business_fields", "update", field_id, before=field, after=moved_field)
+    return BusinessField(**moved_field)
+
 @api_router.delete("/business-fields/{field_id}")
 async def delete_business_field(field_id: str):
-    result = await db.business_fields.delete_one({"id": field_id})
-    if result.deleted_count == 0:
+    deleted_field = await db.business_fields.find_one_and_delete({"id": field_id})
+    if not deleted_field:
         raise HTTPException(status_code=404, detail="Business field not found")
+    await emit_change("business_fields", "delete", field_id, before=deleted_field)
     return {"message": "Business field deleted successfully"}
 
 # Business Field Instances Routes (Actual Business Fields Data)
 @api_router.post("/business-field-instances", response_model=BusinessFieldInstance)
 async def create_business_field_instance(instance_data: BusinessFieldInstanceCreate):
-    # Verify the template field exists
-    template_field = await db.business_fields.find_one({"id": instance_data.template_field_id})
+    # Verify the template field exists; it is only counted once the instance is stored
+    template_field = await db.business_fields.find_one({"id": instance_data.template_field_id}, {"_id": 0})
     if not template_field:
         raise HTTPException(status_code=404, detail="Template field not found")
-    
+    check_field_value(template_field, instance_data.value)
+
     instance_dict = instance_data.dict()
     instance_obj = BusinessFieldInstance(**instance_dict)
-    await db.business_field_instances.insert_one(instance_obj.dict())
+    await insert_document("business_field_instances", instance_obj.dict())
+    await adjust_usage_count(db.business_fields, "instance_count", template_field["id"], 1)
+    await emit_change("business_field_instances", "create", instance_obj.id, after=instance_obj.dict())
     return instance_obj
 
+@api_router.post("/business-field-instances/validate")
+async def validate_business_field_instances(template_field_id: Optional[str] = None, background: bool = False):
+    if background:
+        # Violations are reported as the job's failures
+        return await enqueue_job("validate_business_field_instances", {"template_field_id": template_field_id})
+    return StreamingResponse(scan_field_values(template_field_id), media_type="application/x-ndjson")
+
 @api_router.get("/business-field-instances", response_model=List[BusinessFieldInstance])
 async def get_business_field_instances():
     instances = await db.business_field_instances.find().sort("created_at", -1).to_list(1000)
@@ -663,25 +3571,756 @@ async def get_business_field_instance(instance_id: str):
 async def update_business_field_instance(instance_id: str, instance_data: BusinessFieldInstanceUpdate):
     update_dict = {k: v for k, v in instance_data.dict().items() if v is not None}
     update_dict["updated_at"] = datetime.utcnow()
-    
-    result = await db.business_field_instances.update_one(
-        {"id": instance_id}, 
-        {"$set": update_dict}
+
+    existing_instance = await db.business_field_instances.find_one({"id": instance_id})
+    if not existing_instance:
+        raise HTTPException(status_code=404, detail="Business field instance not found")
+
+    new_template_id = update_dict.get("template_field_id")
+    retemplated = new_template_id is not None and new_template_id != existing_instance["template_field_id"]
+    if retemplated or "value" in update_dict:
+        template_id = new_template_id if retemplated else existing_instance["template_field_id"]
+        template_field = await db.business_fields.find_one({"id": template_id}, {"_id": 0})
+        if retemplated and not template_field:
+            raise HTTPException(status_code=404, detail="Template field not found")
+        if template_field:
+            check_field_value(template_field, update_dict.get("value", existing_instance.get("value")))
+
+    updated_instance = await db.business_field_instances.find_one_and_update(
+        {"id": instance_id},
+        {"$set": update_dict},
+        return_document=ReturnDocument.AFTER
     )
-    
-    if result.matched_count == 0:
+
+    if not updated_instance:
         raise HTTPException(status_code=404, detail="Business field instance not found")
-    
-    updated_instance = await db.business_field_instances.find_one({"id": instance_id})
+
+    if retemplated:
+        await adjust_usage_count(db.business_fields, "instance_count", new_template_id, 1)
+        await adjust_usage_count(db.business_fields, "instance_count", existing_instance["template_field_id"], -1)
+
+    await emit_change("business_field_instances", "update", instance_id, before=existing_instance, after=updated_instance)
     return BusinessFieldInstance(**updated_instance)
 
 @api_router.delete("/business-field-instances/{instance_id}")
 async def delete_business_field_instance(instance_id: str):
-    result = await db.business_field_instances.delete_one({"id": instance_id})
-    if result.deleted_count == 0:
+    instance = await db.business_field_instances.find_one_and_delete({"id": instance_id})
+    if not instance:
         raise HTTPException(status_code=404, detail="Business field instance not found")
+    await adjust_usage_count(db.business_fields, "instance_count", instance.get("template_field_id"), -1)
+    await emit_change("business_field_instances", "delete", instance_id, before=instance)
     return {"message": "Business field instance deleted successfully"}
 
+# Change Feed Routes
+#
+# GET /api/events streams compact change events as server-sent events. Every
+# worker appends the writes it handles to the capped change_events
+# collection through a write-behind log, and every worker tails it with a
+# tailable cursor, so a subscriber sees the writes of all workers whichever
+# one it is connected to (capped collections and tailable cursors work on a
+# standalone mongod as well). Entries carry a sequence number reserved per
+# batch from the sequences collection; it is the event's revision and what a
+# re-created cursor resumes from. Since workers reserve before they insert,
+# entries can land slightly out of sequence order: the tailer remembers what
+# it already published above the first gap and gives up on a gap after
+# CHANGE_EVENTS_GAP_SECONDS. Each event is serialized once per worker and
+# fanned out to the subscribers' bounded queues; a client that falls too far
+# behind gets a final "resync" event and should reload instead of silently
+# missing changes.
+EVENTS_CLIENT_BUFFER = int(os.environ.get('EVENTS_CLIENT_BUFFER', '1000'))
+EVENTS_HEARTBEAT_SECONDS = float(os.environ.get('EVENTS_HEARTBEAT_SECONDS', '15'))
+CHANGE_EVENTS_CAPPED_BYTES = int(os.environ.get('CHANGE_EVENTS_CAPPED_BYTES', str(64 * 1024 * 1024)))
+CHANGE_EVENTS_GAP_SECONDS = float(os.environ.get('CHANGE_EVENTS_GAP_SECONDS', '5'))
+
+class EventSubscriber:
+    def __init__(self, collections: Optional[set]):
+        self.collections = collections
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=EVENTS_CLIENT_BUFFER)
+        self.overflowed = False
+
+class ChangeFeed:
+    def __init__(self):
+        self.subscribers: set = set()
+
+    def subscribe(self, collections: Optional[set]) -> EventSubscriber:
+        subscriber = EventSubscriber(collections)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: EventSubscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish(self, entry: Dict[str, Any]):
+        if not self.subscribers:
+            return
+        revision = str(entry["seq"])
+        data = json.dumps(jsonable_encoder({
+            "collection": entry["collection"],
+            "op": entry["op"],
+            "id": entry["id"],
+            "fields": entry.get("fields"),
+            "revision": revision,
+        }))
+        for subscriber in self.subscribers:
+            if subscriber.overflowed or (subscriber.collections and entry["collection"] not in subscriber.collections):
+                continue
+            try:
+                subscriber.queue.put_nowait((revision, data))
+            except asyncio.QueueFull:
+                subscriber.overflowed = True
+
+change_feed = ChangeFeed()
+
+async def ensure_change_event_log():
+    try:
+        await db.create_collection("change_events", capped=True, size=CHANGE_EVENTS_CAPPED_BYTES)
+    except CollectionInvalid:
+        pass  # Already there
+
+async def reserve_sequence(name: str, count: int) -> int:
+    """Reserve ``count`` consecutive numbers of the named sequence and return the first."""
+    while True:
+        try:
+            counter = await db.sequences.find_one_and_update(
+                {"id": name}, {"$inc": {"value": count}}, upsert=True, return_document=ReturnDocument.AFTER
+            )
+            return counter["value"] - count + 1
+        except DuplicateKeyError:
+            continue  # Another worker created the counter first
+
+async def write_change_events(entries: List[Dict[str, Any]]):
+    first = await reserve_sequence("change_events", len(entries))
+    await db.change_events.insert_many(
+        [{**entry, "seq": first + offset} for offset, entry in enumerate(entries)], ordered=True
+    )
+
+change_event_log = WriteBehindLog("change_events", write_change_events)
+
+@on_change("*")
+async def publish_to_change_feed(events: List[ChangeEvent]):
+    await change_event_log.append([
+        jsonable_encoder({"collection": event.collection, "op": event.op, "id": event.id, "fields": event.changed_fields()})
+        for event in events
+    ])
+
+def settle_change_sequence(delivered: int, ahead: Dict[int, float]) -> int:
+    """Advance past every sequence published in order, and past gaps older than CHANGE_EVENTS_GAP_SECONDS."""
+    while ahead:
+        if delivered + 1 in ahead:
+            delivered += 1
+            ahead.pop(delivered)
+            continue
+        oldest = min(ahead)
+        if time.monotonic() - ahead[oldest] < CHANGE_EVENTS_GAP_SECONDS:
+            break
+        # The writer of the missing entries failed or is far behind; stop waiting for them
+        delivered = oldest - 1
+    return delivered
+
+async def tail_change_events():
+    """Feed this worker's subscribers from change_events, starting after the newest entry."""
+    newest = await db.change_events.find_one({}, {"seq": 1}, sort=[("$natural", -1)])
+    delivered = newest.get("seq", 0) if newest else 0
+    # Published entries above the first gap, with when they arrived
+    ahead: Dict[int, float] = {}
+    while True:
+        try:
+            cursor = db.change_events.find({"seq": {"$gt": delivered}}, cursor_type=CursorType.TAILABLE_AWAIT)
+            async for entry in cursor:
+                seq = entry["seq"]
+                if seq <= delivered or seq in ahead:
+                    continue
+                change_feed.publish(entry)
+                ahead[seq] = time.monotonic()
+                delivered = settle_change_sequence(delivered, ahead)
+        except PyMongoError:
+            logger.exception("Tailing change_events failed")
+        delivered = settle_change_sequence(delivered, ahead)
+        # The cursor dies while the collection is empty or after an error
+        await asyncio.sleep(0.5)
+
+async def stream_change_events(request: Request, subscriber: EventSubscriber):
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            if subscriber.overflowed and subscriber.queue.empty():
+                yield "event: resync\ndata: {}\n\n"
+                return
+            try:
+                revision, data = await asyncio.wait_for(subscriber.queue.get(), EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {revision}\nevent: change\ndata: {data}\n\n"
+    finally:
+        change_feed.unsubscribe(subscriber)
+
+@api_router.get("/events")
+async def get_change_events(request: Request, collections: Optional[str] = None):
+    selected = None
+    if collections:
+        selected = {name.strip() for name in collections.split(",") if name.strip()}
+        known = {spec.collection for spec in RESOURCES.values()}
+        unknown = selected - known
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown collections: {', '.join(sorted(unknown))}")
+    subscriber = change_feed.subscribe(selected)
+    return StreamingResponse(
+        stream_change_events(request, subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Dashboard Routes
+#
+# Summary cards are computed with one $facet aggregation per collection, all
+# collections in parallel, and cached for a few seconds (or until a write).
+DASHBOARD_CACHE_TTL = float(os.environ.get('DASHBOARD_CACHE_TTL', '5'))
+
+def count_by(field: str) -> List[Dict[str, Any]]:
+    return [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}]
+
+def count_where(condition: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"$match": condition}, {"$count": "count"}]
+
+DASHBOARD_FACETS: Dict[str, Dict[str, List[Dict[str, Any]]]] = {
+    "category_models": {},
+    "categories": {
+        "by_visibility_status": count_by("visibility_status"),
+        "roots": count_where({"parent_id": None}),
+        "with_model": count_where({"model_id": {"$ne": None}}),
+    },
+    "category_visibility": {
+        "by_visibility_status": count_by("visibility_status"),
+    },
+    "visibility_types": {
+        "by_active": count_by("active"),
+    },
+    "pricing_models": {
+        "by_active": count_by("active"),
+        "by_interval": count_by("interval"),
+        "by_currency": count_by("currency"),
+    },
+    "display_types": {
+        "by_active": count_by("active"),
+        "by_type_category": count_by("type_category"),
+        "responsive": count_where({"responsive": True}),
+    },
+    "social_handles": {
+        "by_active": count_by("active"),
+        "with_icon": count_where({"icon_image": {"$nin": [None, ""]}}),
+    },
+    "business_fields": {
+        "by_active": count_by("active"),
+        "by_type": count_by("type"),
+        "by_category": count_by("category"),
+        "required": count_where({"required": True}),
+    },
+    "business_field_instances": {
+        "by_active": count_by("active"),
+    },
+}
+
+_dashboard_cache: Dict[str, Any] = {"expires": 0.0, "summary": None}
+_dashboard_lock = asyncio.Lock()
+
+def facet_key(value: Any) -> str:
+    if value is None:
+        return "none"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+async def summarize_collection(name: str, facets: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    result = await db[name].aggregate([
+        {"$facet": {"total": [{"$count": "count"}], **facets}}
+    ]).to_list(1)
+    buckets = result[0] if result else {}
+    summary: Dict[str, Any] = {"total": 0}
+    for key, rows in buckets.items():
+        pipeline = facets.get(key, [{"$count": "count"}])
+        if "$count" in pipeline[-1]:
+            summary[key] = rows[0]["count"] if rows else 0
+        else:
+            summary[key] = {facet_key(row["_id"]): row["count"] for row in rows}
+    return summary
+
+async def compute_dashboard_summary() -> Dict[str, Any]:
+    names = list(DASHBOARD_FACETS)
+    summaries = await asyncio.gather(*(summarize_collection(name, DASHBOARD_FACETS[name]) for name in names))
+    return {"collections": dict(zip(names, summaries)), "generated_at": datetime.utcnow()}
+
+@on_change("*")
+async def invalidate_dashboard_summary(events: List[ChangeEvent]):
+    _dashboard_cache["expires"] = 0.0
+
+@api_router.get("/dashboard/summary")
+async def get_dashboard_summary():
+    if _dashboard_cache["summary"] is None or time.monotonic() >= _dashboard_cache["expires"]:
+        async with _dashboard_lock:
+            # Concurrent misses wait for the first one instead of recomputing
+            if _dashboard_cache["summary"] is None or time.monotonic() >= _dashboard_cache["expires"]:
+                _dashboard_cache["summary"] = await compute_dashboard_summary()
+                _dashboard_cache["expires"] = time.monotonic() + DASHBOARD_CACHE_TTL
+    return _dashboard_cache["summary"]
+
+# Composite Batch Routes
+#
+# POST /api/batch runs independent sub-requests against the regular routes
+# concurrently inside this process: each one is dispatched straight into the
+# ASGI app, so it gets the same validation and handlers as a real request
+# without another network round-trip.
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', '20'))
+# Nested batches and never-ending streams cannot be collected into one response
+BATCH_EXCLUDED_PATHS = {"/api/batch", "/api/events"}
+BATCH_SKIPPED_HEADERS = {b"content-length", b"content-type", b"transfer-encoding", b"host"}
+
+class SubRequest(BaseModel):
+    id: Optional[str] = None  # Echoed back to correlate responses
+    method: Literal["GET", "POST", "PUT", "DELETE"] = "GET"
+    path: str  # e.g. "/categories" or "/api/categories?limit=10"
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    requests: List[SubRequest]
+
+async def dispatch_subrequest(app, sub: SubRequest, headers: List[tuple]) -> Dict[str, Any]:
+    path, _, query_string = sub.path.partition("?")
+    if not path.startswith("/"):
+        path = "/" + path
+    if not path.startswith("/api/"):
+        path = "/api" + path
+    if path.rstrip("/") in BATCH_EXCLUDED_PATHS:
+        return {"id": sub.id, "status": 400, "body": {"detail": "This route cannot be used inside a batch"}}
+
+    body = json.dumps(sub.body).encode() if sub.body is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": sub.method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string.encode(),
+        "headers": headers + [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": None,
+        "server": None,
+        "extensions": {"batch_subrequest": {}},
+    }
+    response: Dict[str, Any] = {"status": 500, "headers": [], "body": b""}
+    finished = asyncio.Event()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = message.get("headers", [])
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+            if not message.get("more_body"):
+                finished.set()
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", sub.method, sub.path)
+        response["status"] = 500
+        response["body"] = b'{"detail": "Internal Server Error"}'
+    finally:
+        finished.set()
+
+    content_type = dict(response["headers"]).get(b"content-type", b"")
+    payload: Any = response["body"].decode("utf-8", errors="replace")
+    if content_type.startswith(b"application/json") and response["body"]:
+        payload = json.loads(response["body"])
+    return {"id": sub.id, "status": response["status"], "body": payload}
+
+@api_router.post("/batch")
+async def run_batch(batch: BatchRequest, request: Request):
+    if len(batch.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_REQUESTS} sub-requests per batch")
+    headers = [(key, value) for key, value in request.scope["headers"] if key not in BATCH_SKIPPED_HEADERS]
+    results = await asyncio.gather(*(dispatch_subrequest(request.app, sub, headers) for sub in batch.requests))
+    return {"responses": results}
+
+# Request profiling
+#
+# A request is profiled when it carries ``X-Profile: <PROFILING_TOKEN>`` or is
+# picked by PROFILING_SAMPLE_RATE. A sampler thread then records the request
+# task's stack every PROFILING_INTERVAL_MS: the live stack while the task runs
+# on the event loop (handler code, Pydantic, response encoding), or its chain
+# of suspended awaits while it waits (MongoDB round-trips show up as
+# ``<await Future>`` leaves). Samples are kept as folded stacks, the input
+# format of flamegraph.pl and speedscope, for PROFILE_RETENTION_SECONDS.
+# Requests without the header pay one dict lookup when sampling is off.
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN', '')
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_INTERVAL_MS = float(os.environ.get('PROFILING_INTERVAL_MS', '1'))
+PROFILE_RETENTION_SECONDS = int(os.environ.get('PROFILE_RETENTION_SECONDS', str(24 * 3600)))
+PROFILE_MAX_STACK_DEPTH = 128
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+def awaiting_stack(coro) -> List[str]:
+    """Labels for the chain of awaits a suspended coroutine is parked in, outermost first."""
+    labels = []
+    while coro is not None and len(labels) < PROFILE_MAX_STACK_DEPTH:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "ag_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            labels.append(f"<await {type(coro).__name__}>")
+            break
+        labels.append(frame_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "ag_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return labels
+
+class RequestProfiler:
+    def __init__(self, task: asyncio.Task, interval: float):
+        self.coro = task.get_coro()
+        self.thread_id = threading.get_ident()
+        self.interval = interval
+        self.counts: Dict[str, int] = {}
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            stack = self._sample()
+            if stack:
+                key = ";".join(stack)
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _sample(self) -> List[str]:
+        if not self.coro.cr_running:
+            return awaiting_stack(self.coro)
+        frame = sys._current_frames().get(self.thread_id)
+        labels = []
+        while frame is not None and len(labels) < PROFILE_MAX_STACK_DEPTH:
+            labels.append(frame_label(frame))
+            if frame is self.coro.cr_frame:
+                break
+            frame = frame.f_back
+        return labels[::-1]
+
+def profile_requested(scope) -> bool:
+    if PROFILING_TOKEN:
+        for key, value in scope["headers"]:
+            if key == b"x-profile":
+                return hmac.compare_digest(value.decode("latin-1"), PROFILING_TOKEN)
+    return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+def require_profiling_token(request: Request):
+    supplied = request.headers.get("x-profile", "")
+    if not PROFILING_TOKEN or not hmac.compare_digest(supplied, PROFILING_TOKEN):
+        raise HTTPException(status_code=403, detail="A valid X-Profile token is required")
+
+profile_writes: Set[asyncio.Task] = set()
+
+async def store_profile(profile: Dict[str, Any]):
+    try:
+        await db.profiles.insert_one(profile)
+    except Exception:
+        logger.exception("Could not store request profile %s", profile["id"])
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = str(uuid.uuid4())
+        status = {"code": None}
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        profiler = RequestProfiler(asyncio.current_task(), PROFILING_INTERVAL_MS / 1000)
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            task = asyncio.create_task(store_profile({
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query_string": scope.get("query_string", b"").decode("latin-1"),
+                "status_code": status["code"],
+                "created_at": started_at,
+                "duration_ms": 1000 * (time.perf_counter() - started),
+                "interval_ms": PROFILING_INTERVAL_MS,
+                "samples": sum(profiler.counts.values()),
+                "stacks": [{"stack": stack, "count": count} for stack, count in profiler.counts.items()],
+            }))
+            profile_writes.add(task)
+            task.add_done_callback(profile_writes.discard)
+
+# Admission control
+#
+# Every API request is admitted against the budget of its route class: cheap
+# item reads, list/aggregation reads, writes and long-running streamed scans
+# each get their own concurrency limit and a bounded wait queue. The class of
+# every route template is computed once per app, indexed by method and
+# segment count, so a request only compares against a handful of templates. When a queue is full, or a request has
+# waited ADMISSION_QUEUE_TIMEOUT_SECONDS for a slot, it is turned away at once
+# with 503 and Retry-After instead of piling up behind MongoDB.
+ADMISSION_CONTROL_ENABLED = os.environ.get('ADMISSION_CONTROL_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT_SECONDS', '2'))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.environ.get('ADMISSION_RETRY_AFTER_SECONDS', '1'))
+# Long-lived streams would pin a slot, and batch sub-requests are admitted one by one
+ADMISSION_EXEMPT_PATHS = {"/api/health", "/api/metrics", "/api/events", "/api/batch"}
+
+class AdmissionBudget:
+    def __init__(self, name: str, concurrency: int, queue_size: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self) -> bool:
+        if self.semaphore.locked():
+            if self.waiting >= self.queue_size:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), ADMISSION_QUEUE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                return False
+            finally:
+                self.waiting -= 1
+        else:
+            await self.semaphore.acquire()
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self.semaphore.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+admission_budgets: Dict[str, AdmissionBudget] = {
+    "item": AdmissionBudget(
+        "item",
+        int(os.environ.get('ADMISSION_ITEM_CONCURRENCY', '256')),
+        int(os.environ.get('ADMISSION_ITEM_QUEUE', '1024')),
+    ),
+    "list": AdmissionBudget(
+        "list",
+        int(os.environ.get('ADMISSION_LIST_CONCURRENCY', '32')),
+        int(os.environ.get('ADMISSION_LIST_QUEUE', '128')),
+    ),
+    "write": AdmissionBudget(
+        "write",
+        int(os.environ.get('ADMISSION_WRITE_CONCURRENCY', '64')),
+        int(os.environ.get('ADMISSION_WRITE_QUEUE', '256')),
+    ),
+    # Streamed scans hold their slot for the whole scan; keep them off the write budget
+    "stream": AdmissionBudget(
+        "stream",
+        int(os.environ.get('ADMISSION_STREAM_CONCURRENCY', '4')),
+        int(os.environ.get('ADMISSION_STREAM_QUEUE', '8')),
+    ),
+}
+
+def classify_route(method: str, path: str) -> str:
+    """Route class for a matched route template such as ``/api/categories/{category_id}``."""
+    if path.endswith("/batch-get"):
+        return "list"
+    if path == "/api/business-field-instances/validate":
+        return "stream"
+    if method not in ("GET", "HEAD"):
+        return "write"
+    if "{" in path.replace("{resource}", ""):
+        return "item"
+    return "list"
+
+RouteTable = Dict[Tuple[str, int], List[Tuple[Tuple[Optional[str], ...], str]]]
+
+def build_route_table(routes) -> RouteTable:
+    """(method, segment count) -> [(template segments with None for parameters, route class)], in routing order."""
+    table: RouteTable = {}
+    for route in routes:
+        path, methods = getattr(route, "path", None), getattr(route, "methods", None)
+        if not path or not methods:
+            continue
+        segments = tuple(None if segment.startswith("{") else segment for segment in path.strip("/").split("/"))
+        for method in methods:
+            table.setdefault((method, len(segments)), []).append((segments, classify_route(method, path)))
+    return table
+
+def route_class(scope) -> str:
+    state = scope["app"].state
+    table = getattr(state, "route_table", None)
+    if table is None:
+        table = state.route_table = build_route_table(scope["app"].router.routes)
+    parts = scope["path"].strip("/").split("/")
+    for segments, route_kind in table.get((scope["method"], len(parts)), []):
+        if all(segment is None or segment == part for segment, part in zip(segments, parts)):
+            return route_kind
+    return "item"
+
+class AdmissionControlMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not ADMISSION_CONTROL_ENABLED
+            or scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or not scope["path"].startswith("/api/")
+            or scope["path"].rstrip("/") in ADMISSION_EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        budget = admission_budgets[route_class(scope)]
+        if not await budget.acquire():
+            response = JSONResponse(
+                {"detail": "Server is busy, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            budget.release()
+
+# Job Routes
+@api_router.post("/jobs", response_model=Job)
+async def create_job(job_data: JobCreate):
+    return await enqueue_job(job_data.type, job_data.params, job_data.max_attempts)
+
+@api_router.get("/jobs", response_model=List[Job])
+async def get_jobs(
+    type: Optional[str] = None,
+    status: Optional[JobStatus] = None,
+    limit: int = Query(50, ge=1, le=500),
+):
+    query: Dict[str, Any] = {}
+    if type:
+        query["type"] = type
+    if status:
+        query["status"] = status.value
+    jobs = await db.jobs.find(query, {"_id": 0}).sort("created_at", -1).limit(limit).to_list(limit)
+    return [Job(**job) for job in jobs]
+
+@api_router.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str):
+    job = await db.jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return Job(**job)
+
+@api_router.post("/jobs/{job_id}/cancel", response_model=Job)
+async def cancel_job(job_id: str):
+    now = datetime.utcnow()
+    job = await db.jobs.find_one_and_update(
+        {"id": job_id, "status": JobStatus.QUEUED.value},
+        {"$set": {"status": JobStatus.CANCELLED.value, "finished_at": now, "updated_at": now}},
+        {"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not job:
+        # A running job stops at its next heartbeat or progress report
+        job = await db.jobs.find_one_and_update(
+            {"id": job_id, "status": JobStatus.RUNNING.value},
+            {"$set": {"cancel_requested": True, "updated_at": now}},
+            {"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+    if not job:
+        if not await db.jobs.find_one({"id": job_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(status_code=400, detail="Job has already finished")
+    return Job(**job)
+
+@api_router.post("/jobs/{job_id}/retry", response_model=Job)
+async def retry_job(job_id: str):
+    now = datetime.utcnow()
+    job = await db.jobs.find_one_and_update(
+        {"id": job_id, "status": {"$in": [JobStatus.FAILED.value, JobStatus.CANCELLED.value]}},
+        {"$set": {
+            "status": JobStatus.QUEUED.value, "attempts": 0, "run_after": now, "cancel_requested": False,
+            "error": None, "finished_at": None, "updated_at": now,
+        }},
+        {"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not job:
+        if not await db.jobs.find_one({"id": job_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(status_code=400, detail="Only failed or cancelled jobs can be retried")
+    jobs_wakeup.set()
+    return Job(**job)
+
+# Audit Routes
+@api_router.get("/audit")
+async def get_audit_log(
+    resource: str,
+    id: Optional[str] = None,
+    before: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+):
+    spec = get_resource_spec(resource)
+    query: Dict[str, Any] = {"resource": spec.collection}
+    if id:
+        query["resource_id"] = id
+    if before:
+        query["at"] = {"$lt": before}
+    return await db.audit_log.find(query, {"_id": 0}).sort("at", -1).limit(limit).to_list(limit)
+
 # Utility Routes
 @api_router.get("/")
 async def root():
@@ -691,16 +4330,56 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow()}
 
-# Include the router in the main app
-app.include_router(api_router)
+@api_router.get("/metrics")
+async def get_metrics():
+    return {
+        "write_coalescing": {
+            "enabled": WRITE_COALESCING_ENABLED,
+            "collections": {name: coalescer.metrics() for name, coalescer in write_coalescers.items()},
+        },
+        "admission": {
+            "enabled": ADMISSION_CONTROL_ENABLED,
+            "budgets": {name: budget.metrics() for name, budget in admission_budgets.items()},
+        },
+        "audit": {**audit_stats, "queue_depth": audit_queue.qsize()},
+        "write_behind": {name: log.metrics() for name, log in write_behind_logs.items()},
+        "jobs": {"running": dict(running_jobs)},
+    }
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@api_router.get("/debug/profiles")
+async def list_profiles(request: Request, path: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+    require_profiling_token(request)
+    query = {"path": path} if path else {}
+    return await db.profiles.find(query, {"_id": 0, "stacks": 0}).sort("created_at", -1).limit(limit).to_list(limit)
+
+@api_router.get("/debug/profiles/{profile_id}")
+async def get_profile(request: Request, profile_id: str, format: Literal["json", "folded"] = "json"):
+    require_profiling_token(request)
+    profile = await db.profiles.find_one({"id": profile_id}, {"_id": 0})
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    folded = "\n".join(f"{entry['stack']} {entry['count']}" for entry in profile.pop("stacks"))
+    if format == "folded":
+        return PlainTextResponse(folded)
+    return {**profile, "folded": folded}
+
+@api_router.get("/maintenance/migrations")
+async def get_migrations():
+    return await migration_status()
+
+@api_router.post("/maintenance/migrations/run")
+async def trigger_migrations():
+    if not migration_lock.locked():
+        background_tasks.append(asyncio.create_task(run_migrations()))
+    return {"migrations": await migration_status()}
+
+@api_router.post("/maintenance/reconcile-counters")
+async def trigger_counter_reconciliation():
+    return {"repaired": await reconcile_counters()}
+
+@api_router.post("/maintenance/rebuild-category-views")
+async def trigger_category_view_rebuild():
+    return {"rebuilt": await rebuild_category_views()}
 
 # Configure logging
 logging.basicConfig(
@@ -709,6 +4388,164 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+async def ensure_indexes():
+    for collection in (
+        db.category_models, db.categories, db.category_visibility, db.visibility_types,
+        db.pricing_models, db.display_types, db.social_handles, db.business_fields,
+        db.business_field_instances,
+    ):
+        await collection.create_index("id", unique=True)
+    await db.categories.create_index([("parent_id", 1), ("sort_order", 1), ("rank", 1)])
+    await db.categories.create_index("ancestor_ids")
+    await db.categories.create_index([("model_id", 1), ("id", 1)])
+    for spec in RESOURCES.values():
+        await db[spec.collection].create_index([("updated_at", 1), ("id", 1)])
+    await db.tombstones.create_index("deleted_at", expireAfterSeconds=TOMBSTONE_TTL_SECONDS)
+    await db.tombstones.create_index([("collection", 1), ("deleted_at", 1), ("id", 1)])
+    await db.profiles.create_index("id", unique=True)
+    await db.profiles.create_index("created_at", expireAfterSeconds=PROFILE_RETENTION_SECONDS)
+    await db.category_visibility.create_index("category_id")
+    await db.category_views.create_index("id", unique=True)
+    await db.category_views.create_index([("parent_id", 1), ("id", 1)])
+    await db.category_views.create_index("ancestor_ids")
+    await db.category_views.create_index("model_id")
+    await db.category_views.create_index("visibility_windows.id")
+    await db.business_fields.create_index([("category", 1), ("order", 1), ("rank", 1)])
+    await db.business_field_instances.create_index([("template_field_id", 1), ("created_at", 1)])
+
+    await db.leases.create_index("id", unique=True)
+    await db.sequences.create_index("id", unique=True)
+    await db.icons.create_index("id", unique=True)
+    await db.migrations.create_index("id", unique=True)
+    await db.jobs.create_index("id", unique=True)
+    await db.jobs.create_index([("type", 1), ("status", 1), ("created_at", 1)])
+    await db.jobs.create_index([("type", 1), ("params.model_id", 1), ("created_at", -1)])
+    await db.jobs.create_index("finished_at", expireAfterSeconds=JOB_RETENTION_DAYS * 24 * 3600)
+    await db.audit_log.create_index([("resource", 1), ("resource_id", 1), ("at", -1)])
+    await db.audit_log.create_index([("resource", 1), ("at", -1)])
+    await db.audit_log.create_index("at", expireAfterSeconds=AUDIT_RETENTION_DAYS * 24 * 3600)
+    await ensure_natural_key_indexes()
+
+async def ensure_natural_key_indexes():
+    collation = natural_key_collation()
+    for collection, key in NATURAL_KEYS.items():
+        try:
+            await db[collection].create_index(
+                [(field, 1) for field in key.fields], name="natural_key", unique=True, collation=collation
+            )
+        except OperationFailure as exc:
+            # Duplicates the old code accepted (the unique-name migrations rename them),
+            # or the index exists with other options and has to be dropped by hand
+            conflicts = await db[collection].aggregate([
+                {"$group": {"_id": {field: f"${field}" for field in key.fields}, "count": {"$sum": 1}}},
+                {"$match": {"count": {"$gt": 1}}},
+                {"$limit": 20},
+            ], collation=collation).to_list(20)
+            logger.error(
+                "Could not create the unique natural key index on %s: %s; duplicated keys include %s",
+                collection, exc, [conflict["_id"] for conflict in conflicts]
+            )
+
+async def acquire_lease(name: str, seconds: float) -> bool:
+    """Claim or renew ``name`` for ``seconds`` unless another process holds an unexpired lease on it."""
+    now = datetime.utcnow()
+    holder = lease_holder()
+    try:
+        await db.leases.find_one_and_update(
+            {"id": name, "$or": [{"expires_at": {"$lt": now}}, {"holder": holder}]},
+            {"$set": {"expires_at": now + timedelta(seconds=seconds), "holder": holder}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+async def connect_db(settings: Settings):
+    """Open this process's MongoDB client and wait until the server answers."""
+    global client, db
+    client = AsyncIOMotorClient(settings.mongo_url, serverSelectionTimeoutMS=5000)
+    db = client[settings.db_name]
+    deadline = time.monotonic() + settings.startup_timeout
+    while True:
+        try:
+            await client.admin.command("ping")
+            return
+        except PyMongoError:
+            if time.monotonic() >= deadline:
+                raise
+            logger.warning("MongoDB is not reachable yet, retrying")
+            await asyncio.sleep(1)
+
+async def prepare_database(settings: Settings):
+    """Create indexes once, ahead of the workers, for launchers that run several."""
+    await connect_db(settings)
+    try:
+        await ensure_indexes()
+    finally:
+        client.close()
+
+background_tasks: List[asyncio.Task] = []
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    settings = settings or Settings.from_env()
+    # Create the main app without a prefix
+    app = FastAPI()
+    app.state.settings = settings
+
+    # Include the router in the main app
+    app.include_router(api_router)
+
+    app.add_middleware(AuditContextMiddleware)
+    app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(AdmissionControlMiddleware)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.on_event("startup")
+    async def startup_tasks():
+        await connect_db(settings)
+        # Before the first write, which would otherwise create it uncapped
+        await ensure_change_event_log()
+        if settings.ensure_indexes:
+            try:
+                await ensure_indexes()
+            except OperationFailure:
+                logger.exception("Could not create indexes")
+        if COUNTER_RECONCILE_INTERVAL > 0:
+            background_tasks.append(asyncio.create_task(reconcile_counters_periodically()))
+        if MIGRATIONS_AUTO_RUN:
+            background_tasks.append(asyncio.create_task(run_migrations()))
+        background_tasks.append(asyncio.create_task(write_audit_records()))
+        for log in write_behind_logs.values():
+            background_tasks.append(asyncio.create_task(log.run()))
+        background_tasks.append(asyncio.create_task(run_job_worker()))
+        background_tasks.append(asyncio.create_task(tail_change_events()))
+        background_tasks.append(asyncio.create_task(refresh_views_in_background()))
+        background_tasks.append(asyncio.create_task(backfill_category_views()))
+
+    @app.on_event("shutdown")
+    async def shutdown_db_client():
+        for task in background_tasks + list(job_tasks):
+            task.cancel()
+        # Let cancelled jobs hand themselves back to the queue
+        await asyncio.gather(*job_tasks, return_exceptions=True)
+        if _process_pool is not None:
+            _process_pool.shutdown(cancel_futures=True)
+        for coalescer in write_coalescers.values():
+            await coalescer.drain()
+        try:
+            await flush_view_refresh()
+        except Exception:
+            pass  # Logged; the views are refreshed by the next write or rebuild
+        await drain_audit_records()
+        for log in write_behind_logs.values():
+            await log.drain()
+        client.close()
+
+    return app
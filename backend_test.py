@@ -1,11 +1,14 @@
 import requests
+import base64
 import json
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import os
 import sys
 import time
 import uuid
+from pymongo import MongoClient
 
 # Get the backend URL from the frontend .env file
 with open('/app/frontend/.env', 'r') as f:
@@ -24,6 +27,15 @@ API_URL = f"{BACKEND_URL}/api"
 
 print(f"Using API URL: {API_URL}")
 
+def open_database():
+    """Direct database access, for documents in shapes the API no longer writes."""
+    settings = {}
+    with open('/app/backend/.env', 'r') as f:
+        for line in f:
+            key, _, value = line.strip().partition('=')
+            settings[key] = value.strip('"\'')
+    return MongoClient(settings['MONGO_URL'])[settings['DB_NAME']]
+
 class CategoryManagementSystemTest(unittest.TestCase):
     """Test suite for the Category Management System API."""
 
@@ -364,7 +376,9 @@ class CategoryManagementSystemTest(unittest.TestCase):
         # Delete a visibility setting (will be done in tearDown)
         # We'll test explicit deletion for one visibility setting
         # Create another category for this test
-        response = requests.post(f"{API_URL}/categories", json=self.category_data)
+        another_category = self.category_data.copy()
+        another_category["name"] = "Electronics Accessories"
+        response = requests.post(f"{API_URL}/categories", json=another_category)
         self.assertEqual(response.status_code, 200)
         another_category_id = response.json()["id"]
         self.created_categories.append(another_category_id)
@@ -522,6 +536,713 @@ class CategoryManagementSystemTest(unittest.TestCase):
         self.assertEqual(retrieved_category["parent_id"], parent_id)
         print("Verified parent-child relationship")
 
+    def test_06_category_tree_counters(self):
+        """Test that child, descendant and usage counters follow the write paths."""
+        print("\n=== Testing Category Tree Counters ===")
+
+        response = requests.post(f"{API_URL}/category-models", json={"name": "Counter Model"})
+        self.assertEqual(response.status_code, 200)
+        model_id = response.json()["id"]
+        self.created_models.append(model_id)
+
+        response = requests.post(f"{API_URL}/categories", json={"name": "Counter Root"})
+        self.assertEqual(response.status_code, 200)
+        root_id = response.json()["id"]
+        self.created_categories.append(root_id)
+
+        response = requests.post(f"{API_URL}/categories", json={"name": "Counter Child", "parent_id": root_id})
+        self.assertEqual(response.status_code, 200)
+        child = response.json()
+        self.created_categories.append(child["id"])
+        self.assertEqual(child["ancestor_ids"], [root_id])
+
+        response = requests.post(f"{API_URL}/categories", json={
+            "name": "Counter Grandchild",
+            "parent_id": child["id"],
+            "model_id": model_id
+        })
+        self.assertEqual(response.status_code, 200)
+        grandchild_id = response.json()["id"]
+        self.created_categories.append(grandchild_id)
+
+        root = requests.get(f"{API_URL}/categories/{root_id}").json()
+        self.assertEqual(root["child_count"], 1)
+        self.assertEqual(root["descendant_count"], 2)
+        model = requests.get(f"{API_URL}/category-models/{model_id}").json()
+        self.assertEqual(model["usage_count"], 1)
+        print("Verified counters after creating a three level tree")
+
+        # Moving a node under its own descendant must be rejected
+        response = requests.put(f"{API_URL}/categories/{root_id}", json={"parent_id": grandchild_id})
+        self.assertEqual(response.status_code, 400)
+
+        # Re-parent the grandchild directly under the root
+        response = requests.put(f"{API_URL}/categories/{grandchild_id}", json={"parent_id": root_id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["ancestor_ids"], [root_id])
+        root = requests.get(f"{API_URL}/categories/{root_id}").json()
+        self.assertEqual(root["child_count"], 2)
+        self.assertEqual(root["descendant_count"], 2)
+        child = requests.get(f"{API_URL}/categories/{child['id']}").json()
+        self.assertEqual(child["child_count"], 0)
+        print("Verified counters after re-parenting")
+
+        response = requests.delete(f"{API_URL}/categories/{grandchild_id}")
+        self.assertEqual(response.status_code, 200)
+        model = requests.get(f"{API_URL}/category-models/{model_id}").json()
+        self.assertEqual(model["usage_count"], 0)
+        root = requests.get(f"{API_URL}/categories/{root_id}").json()
+        self.assertEqual(root["descendant_count"], 1)
+        print("Verified counters after deletion")
+
+    def test_07_cascade_delete_subtree(self):
+        """Test cascade deletion of a category subtree and its visibility settings."""
+        print("\n=== Testing Cascade Subtree Deletion ===")
+
+        response = requests.post(f"{API_URL}/categories", json={"name": "Cascade Root"})
+        self.assertEqual(response.status_code, 200)
+        root_id = response.json()["id"]
+        response = requests.post(f"{API_URL}/categories", json={"name": "Cascade Child", "parent_id": root_id})
+        self.assertEqual(response.status_code, 200)
+        child_id = response.json()["id"]
+
+        visibility_data = self.visibility_data.copy()
+        visibility_data["category_id"] = child_id
+        response = requests.post(f"{API_URL}/category-visibility", json=visibility_data)
+        self.assertEqual(response.status_code, 200)
+        visibility_id = response.json()["id"]
+
+        response = requests.delete(f"{API_URL}/categories/{root_id}?cascade=subtree&dry_run=true")
+        self.assertEqual(response.status_code, 200)
+        summary = response.json()
+        self.assertTrue(summary["dry_run"])
+        self.assertEqual(summary["categories"], 2)
+        self.assertEqual(summary["category_visibility"], 1)
+        self.assertEqual(requests.get(f"{API_URL}/categories/{child_id}").status_code, 200)
+        print("Verified dry run leaves the subtree untouched")
+
+        response = requests.delete(f"{API_URL}/categories/{root_id}?cascade=subtree")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["categories"], 2)
+        self.assertEqual(requests.get(f"{API_URL}/categories/{child_id}").status_code, 404)
+        self.assertEqual(requests.get(f"{API_URL}/category-visibility/{visibility_id}").status_code, 404)
+        print("Verified subtree and visibility settings were deleted")
+
+    def test_08_category_move(self):
+        """Test reordering siblings and re-parenting through the move endpoint."""
+        print("\n=== Testing Category Move ===")
+
+        response = requests.post(f"{API_URL}/categories", json={"name": "Move Parent"})
+        self.assertEqual(response.status_code, 200)
+        parent_id = response.json()["id"]
+        self.created_categories.append(parent_id)
+
+        sibling_ids = []
+        for i in range(3):
+            response = requests.post(f"{API_URL}/categories", json={"name": f"Move Sibling {i}", "parent_id": parent_id})
+            self.assertEqual(response.status_code, 200)
+            sibling_ids.append(response.json()["id"])
+        self.created_categories.extend(sibling_ids)
+
+        # Move the last sibling to the front
+        response = requests.post(f"{API_URL}/categories/{sibling_ids[2]}/move", json={
+            "parent_id": parent_id,
+            "before": sibling_ids[0]
+        })
+        self.assertEqual(response.status_code, 200)
+
+        categories = requests.get(f"{API_URL}/categories").json()
+        ordered = [c["id"] for c in categories if c["parent_id"] == parent_id]
+        self.assertEqual(ordered, [sibling_ids[2], sibling_ids[0], sibling_ids[1]])
+        print("Verified sibling order after moving to the front")
+
+        # A category created after a move still goes to the end
+        response = requests.post(f"{API_URL}/categories/{sibling_ids[0]}/move", json={"parent_id": parent_id})
+        self.assertEqual(response.status_code, 200)
+        response = requests.post(f"{API_URL}/categories", json={"name": "Move Sibling 3", "parent_id": parent_id})
+        self.assertEqual(response.status_code, 200)
+        self.created_categories.append(response.json()["id"])
+        categories = requests.get(f"{API_URL}/categories").json()
+        ordered = [c["id"] for c in categories if c["parent_id"] == parent_id]
+        self.assertEqual(ordered, [sibling_ids[2], sibling_ids[1], sibling_ids[0], response.json()["id"]])
+
+        # Move the middle sibling to the root
+        response = requests.post(f"{API_URL}/categories/{sibling_ids[0]}/move", json={"parent_id": None})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()["parent_id"])
+        self.assertEqual(response.json()["ancestor_ids"], [])
+        parent = requests.get(f"{API_URL}/categories/{parent_id}").json()
+        self.assertEqual(parent["child_count"], 2)
+        print("Verified re-parenting through the move endpoint")
+
+    def test_09_custom_data_validation(self):
+        """Test custom_data validation against the category model on single and bulk creates."""
+        print("\n=== Testing Custom Data Validation ===")
+
+        response = requests.post(f"{API_URL}/category-models", json=self.category_model_data)
+        self.assertEqual(response.status_code, 200)
+        model_id = response.json()["id"]
+        self.created_models.append(model_id)
+
+        # Strings are coerced and missing fields take their default
+        response = requests.post(f"{API_URL}/categories", json={
+            "name": "Validated Category",
+            "model_id": model_id,
+            "custom_data": {"price_range": "$10-$20", "release_date": "2024-02-01"}
+        })
+        self.assertEqual(response.status_code, 200)
+        self.created_categories.append(response.json()["id"])
+        self.assertIs(response.json()["custom_data"]["in_stock"], True)
+        print("Verified defaults are applied")
+
+        response = requests.post(f"{API_URL}/categories", json={
+            "name": "Invalid Category",
+            "model_id": model_id,
+            "custom_data": {"in_stock": "maybe"}
+        })
+        self.assertEqual(response.status_code, 400)
+        print("Verified invalid custom_data is rejected")
+
+        response = requests.post(f"{API_URL}/categories/bulk", json={"categories": [
+            {"name": "Bulk Valid", "model_id": model_id, "custom_data": {"price_range": "$1"}},
+            {"name": "Bulk Invalid", "model_id": model_id, "custom_data": {}}
+        ]})
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.created_categories.extend(result["ids"])
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(result["errors"][0]["index"], 1)
+        print("Verified bulk create reports per-row validation errors")
+
+    def test_10_category_read_model(self):
+        """Test the denormalized category view and its incremental maintenance."""
+        print("\n=== Testing Category Read Model ===")
+
+        response = requests.post(f"{API_URL}/category-models", json={"name": "View Model"})
+        self.assertEqual(response.status_code, 200)
+        model_id = response.json()["id"]
+        self.created_models.append(model_id)
+
+        response = requests.post(f"{API_URL}/categories", json={"name": "View Root"})
+        self.assertEqual(response.status_code, 200)
+        root_id = response.json()["id"]
+        self.created_categories.append(root_id)
+        response = requests.post(f"{API_URL}/categories", json={
+            "name": "View Child",
+            "parent_id": root_id,
+            "model_id": model_id
+        })
+        self.assertEqual(response.status_code, 200)
+        child_id = response.json()["id"]
+        self.created_categories.append(child_id)
+
+        response = requests.post(f"{API_URL}/category-visibility", json={
+            "category_id": child_id,
+            "visibility_status": "hidden",
+            "start_date": (datetime.utcnow() - timedelta(days=1)).isoformat()
+        })
+        self.assertEqual(response.status_code, 200)
+        self.created_visibilities.append(response.json()["id"])
+        # Views are refreshed in the background shortly after a write
+        time.sleep(0.5)
+
+        response = requests.get(f"{API_URL}/categories/{child_id}/view")
+        self.assertEqual(response.status_code, 200)
+        view = response.json()
+        self.assertEqual(view["model"]["name"], "View Model")
+        self.assertEqual(view["breadcrumb"], [{"id": root_id, "name": "View Root"}])
+        self.assertEqual(view["effective_status"], "hidden")
+        print("Verified joined category view")
+
+        # Renaming the parent refreshes the child's breadcrumb
+        response = requests.put(f"{API_URL}/categories/{root_id}", json={"name": "Renamed Root"})
+        self.assertEqual(response.status_code, 200)
+        time.sleep(0.5)
+        view = requests.get(f"{API_URL}/categories/{child_id}/view").json()
+        self.assertEqual(view["breadcrumb"][0]["name"], "Renamed Root")
+        print("Verified breadcrumb refresh after renaming the parent")
+
+        response = requests.get(f"{API_URL}/category-views", params={"parent_id": root_id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in response.json()["items"]], [child_id])
+        print("Verified paginated view listing")
+
+    def test_11_dashboard_summary(self):
+        """Test the aggregated dashboard summary."""
+        print("\n=== Testing Dashboard Summary ===")
+
+        response = requests.get(f"{API_URL}/dashboard/summary")
+        self.assertEqual(response.status_code, 200)
+        before = response.json()["collections"]["categories"]["total"]
+
+        response = requests.post(f"{API_URL}/categories", json={"name": "Summary Category", "visibility_status": "hidden"})
+        self.assertEqual(response.status_code, 200)
+        self.created_categories.append(response.json()["id"])
+
+        response = requests.get(f"{API_URL}/dashboard/summary")
+        self.assertEqual(response.status_code, 200)
+        categories = response.json()["collections"]["categories"]
+        self.assertEqual(categories["total"], before + 1)
+        self.assertGreaterEqual(categories["by_visibility_status"]["hidden"], 1)
+        print("Verified summary counts reflect new writes")
+
+    def test_12_batch_get(self):
+        """Test resolving several ids in one request."""
+        print("\n=== Testing Batch Get ===")
+
+        ids = []
+        for i in range(3):
+            response = requests.post(f"{API_URL}/categories", json={"name": f"Batch Category {i}"})
+            self.assertEqual(response.status_code, 200)
+            ids.append(response.json()["id"])
+        self.created_categories.extend(ids)
+
+        missing_id = str(uuid.uuid4())
+        requested = [ids[2], missing_id, ids[0]]
+        response = requests.post(f"{API_URL}/categories/batch-get", json={"ids": requested})
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual([item["id"] for item in result["items"]], [ids[2], ids[0]])
+        self.assertEqual(result["missing"], [missing_id])
+        print("Verified order is preserved and missing ids are reported")
+
+        response = requests.post(f"{API_URL}/unknown-resource/batch-get", json={"ids": ids})
+        self.assertEqual(response.status_code, 404)
+
+    def test_13_composite_batch(self):
+        """Test running several independent sub-requests in one round-trip."""
+        print("\n=== Testing Composite Batch ===")
+
+        response = requests.post(f"{API_URL}/batch", json={"requests": [
+            {"id": "visibility", "path": "/category-visibility"},
+            {"id": "categories", "path": "/categories"},
+            {"id": "types", "path": "/visibility-types"},
+            {"id": "missing", "path": f"/categories/{uuid.uuid4()}"}
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = {result["id"]: result for result in response.json()["responses"]}
+        self.assertEqual(results["visibility"]["status"], 200)
+        self.assertIsInstance(results["categories"]["body"], list)
+        self.assertEqual(results["types"]["status"], 200)
+        self.assertEqual(results["missing"]["status"], 404)
+        print("Verified each sub-request reports its own status")
+
+        response = requests.post(f"{API_URL}/batch", json={"requests": [{"path": "/health"}] * 100})
+        self.assertEqual(response.status_code, 400)
+        print("Verified the sub-request limit")
+
+    def test_14_change_events(self):
+        """Test that writes are pushed to server-sent event subscribers."""
+        print("\n=== Testing Change Events ===")
+
+        stream = requests.get(f"{API_URL}/events", params={"collections": "categories"}, stream=True, timeout=10)
+        self.assertEqual(stream.status_code, 200)
+        self.assertTrue(stream.headers["content-type"].startswith("text/event-stream"))
+
+        response = requests.post(f"{API_URL}/categories", json={"name": "Event Category"})
+        self.assertEqual(response.status_code, 200)
+        category_id = response.json()["id"]
+        self.created_categories.append(category_id)
+
+        event = None
+        for line in stream.iter_lines(decode_unicode=True):
+            if line.startswith("data:") and category_id in line:
+                event = json.loads(line[len("data:"):])
+                break
+        stream.close()
+        self.assertIsNotNone(event)
+        self.assertEqual(event["collection"], "categories")
+        self.assertEqual(event["op"], "create")
+        self.assertEqual(event["fields"]["name"], "Event Category")
+        print("Verified create event was streamed")
+
+        response = requests.get(f"{API_URL}/events", params={"collections": "not_a_collection"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_15_delta_sync(self):
+        """Test incremental sync of updated and deleted documents."""
+        print("\n=== Testing Delta Sync ===")
+
+        # Drain the feed so the token points past everything that exists
+        token = None
+        while True:
+            response = requests.get(f"{API_URL}/categories/changes", params={"since": token})
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            token = page["next_token"]
+            if not page["has_more"]:
+                break
+
+        response = requests.post(f"{API_URL}/categories", json={"name": "Sync Category"})
+        self.assertEqual(response.status_code, 200)
+        category_id = response.json()["id"]
+        response = requests.post(f"{API_URL}/categories", json={"name": "Sync Deleted Category"})
+        self.assertEqual(response.status_code, 200)
+        deleted_id = response.json()["id"]
+        requests.delete(f"{API_URL}/categories/{deleted_id}")
+        self.created_categories.append(category_id)
+        time.sleep(1.5)
+
+        response = requests.get(f"{API_URL}/categories/changes", params={"since": token})
+        self.assertEqual(response.status_code, 200)
+        page = response.json()
+        self.assertIn(category_id, [item["id"] for item in page["items"]])
+        self.assertIn(deleted_id, page["deleted"])
+        print("Verified changes since the last token were returned")
+
+        response = requests.get(f"{API_URL}/categories/changes", params={"since": page["next_token"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(category_id, [item["id"] for item in response.json()["items"]])
+
+        response = requests.get(f"{API_URL}/categories/changes", params={"since": "not-a-token"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_16_concurrent_creates_and_metrics(self):
+        """Test that concurrent creates each get their own result and metrics are exposed."""
+        print("\n=== Testing Concurrent Creates ===")
+
+        names = [f"Concurrent Category {i}" for i in range(20)]
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            responses = list(pool.map(lambda name: requests.post(f"{API_URL}/categories", json={"name": name}), names))
+        for name, response in zip(names, responses):
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["name"], name)
+            self.created_categories.append(response.json()["id"])
+        print(f"Created {len(names)} categories concurrently")
+
+        response = requests.get(f"{API_URL}/metrics")
+        self.assertEqual(response.status_code, 200)
+        coalescing = response.json()["write_coalescing"]
+        self.assertIn("categories", coalescing["collections"])
+        self.assertIn("mean_added_latency_ms", coalescing["collections"]["categories"])
+        budgets = response.json()["admission"]["budgets"]
+        self.assertEqual(set(budgets), {"item", "list", "write", "stream"})
+        self.assertIn("queue_depth", budgets["list"])
+        self.assertIn("rejected", budgets["list"])
+
+        # Far more streamed scans than the stream budget admits and queues at once
+        stream = budgets["stream"]
+        attempts = 4 * (stream["concurrency"] + stream["queue_size"])
+        with ThreadPoolExecutor(max_workers=attempts) as pool:
+            responses = list(pool.map(
+                lambda _: requests.post(f"{API_URL}/business-field-instances/validate"), range(attempts)
+            ))
+        turned_away = [response for response in responses if response.status_code == 503]
+        for response in responses:
+            self.assertIn(response.status_code, (200, 503))
+        for response in turned_away:
+            self.assertIn("Retry-After", response.headers)
+            self.assertEqual(response.json()["detail"], "Server is busy, retry later")
+        print(f"{len(turned_away)} of {attempts} streamed scans were turned away with 503")
+
+    def test_17_profiles_require_token(self):
+        """Test that stored request profiles are not readable without the profiling token."""
+        print("\n=== Testing Profile Access ===")
+
+        response = requests.get(f"{API_URL}/debug/profiles/{uuid.uuid4()}")
+        self.assertEqual(response.status_code, 403)
+        response = requests.get(f"{API_URL}/debug/profiles", headers={"X-Profile": "not-the-token"})
+        self.assertEqual(response.status_code, 403)
+
+    def test_18_unique_names(self):
+        """Test that natural keys are unique and duplicates are rejected with 400."""
+        print("\n=== Testing Unique Names ===")
+
+        response = requests.post(f"{API_URL}/categories", json={"name": "Unique Parent"})
+        self.assertEqual(response.status_code, 200)
+        parent_id = response.json()["id"]
+        self.created_categories.append(parent_id)
+
+        response = requests.post(f"{API_URL}/categories", json={"name": "Unique Child", "parent_id": parent_id})
+        self.assertEqual(response.status_code, 200)
+        self.created_categories.insert(0, response.json()["id"])
+
+        response = requests.post(f"{API_URL}/categories", json={"name": "Unique Child", "parent_id": parent_id})
+        self.assertEqual(response.status_code, 400)
+        print("Duplicate category name under the same parent was rejected")
+
+        # The same name is fine under another parent
+        response = requests.post(f"{API_URL}/categories", json={"name": "Unique Child"})
+        self.assertEqual(response.status_code, 200)
+        self.created_categories.append(response.json()["id"])
+
+        handle_name = f"Handle {uuid.uuid4()}"
+        response = requests.post(f"{API_URL}/social-handles", json={"name": handle_name})
+        self.assertEqual(response.status_code, 200)
+        handle_id = response.json()["id"]
+        response = requests.post(f"{API_URL}/social-handles", json={"name": handle_name})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["detail"], "Social handle with this name already exists")
+        requests.delete(f"{API_URL}/social-handles/{handle_id}")
+
+    def test_19_icons_and_migrations(self):
+        """Test that icons are stored by reference and migrations report their status."""
+        print("\n=== Testing Icon References and Migrations ===")
+
+        pixel = base64.b64encode(b"GIF89a\x01\x00\x01\x00").decode()
+        response = requests.post(f"{API_URL}/social-handles", json={
+            "name": f"Icon Handle {uuid.uuid4()}",
+            "icon_image": f"data:image/gif;base64,{pixel}",
+        })
+        self.assertEqual(response.status_code, 200)
+        handle = response.json()
+        self.assertEqual(handle["icon_image"], f"/api/icons/{handle['icon_id']}")
+
+        response = requests.get(f"{BACKEND_URL}{handle['icon_image']}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "image/gif")
+        self.assertEqual(response.content, b"GIF89a\x01\x00\x01\x00")
+        requests.delete(f"{API_URL}/social-handles/{handle['id']}")
+        print("Verified icon was stored by reference")
+
+        response = requests.get(f"{API_URL}/maintenance/migrations")
+        self.assertEqual(response.status_code, 200)
+        migrations = response.json()
+        self.assertIn("category_visibility_updated_at", [m["name"] for m in migrations])
+        for migration in migrations:
+            self.assertIn(migration["status"], ["pending", "running", "completed", "failed"])
+
+    def test_20_audit_log(self):
+        """Test that updates are recorded in the audit log with their actor and diff."""
+        print("\n=== Testing Audit Log ===")
+
+        headers = {"X-Actor": "audit-tester"}
+        response = requests.post(f"{API_URL}/categories", json={"name": "Audited Category"}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        category_id = response.json()["id"]
+        self.created_categories.append(category_id)
+        response = requests.put(f"{API_URL}/categories/{category_id}", json={"name": "Audited Category Renamed"}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+        # Records are written in the background
+        records = []
+        for _ in range(20):
+            response = requests.get(f"{API_URL}/audit", params={"resource": "categories", "id": category_id})
+            self.assertEqual(response.status_code, 200)
+            records = response.json()
+            if len(records) >= 2:
+                break
+            time.sleep(0.25)
+        self.assertEqual([record["op"] for record in records], ["update", "create"])
+        self.assertEqual(records[0]["actor"], "audit-tester")
+        self.assertEqual(records[0]["changes"]["name"], {
+            "before": "Audited Category", "after": "Audited Category Renamed",
+        })
+        print("Verified audit records for create and update")
+
+        response = requests.get(f"{API_URL}/audit", params={"resource": "not-a-resource"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_21_pricing_quotes(self):
+        """Test normalized price quotes across pricing models."""
+        print("\n=== Testing Pricing Quotes ===")
+
+        response = requests.post(f"{API_URL}/pricing-models", json={
+            "name": "Quoted Yearly Plan", "price": 120, "currency": "USD", "interval": "yearly",
+        })
+        self.assertEqual(response.status_code, 200)
+        plan_id = response.json()["id"]
+
+        response = requests.post(f"{API_URL}/pricing-models/quote", json={"plan_ids": [plan_id], "currencies": ["USD"]})
+        self.assertEqual(response.status_code, 200)
+        quotes = response.json()["quotes"]
+        self.assertEqual(len(quotes), 1)
+        self.assertEqual(quotes[0]["monthly"], 10.0)
+        self.assertEqual(quotes[0]["yearly"], 120.0)
+        print("Verified yearly plan was normalized to a monthly price")
+
+        # The cached arrays follow pricing changes
+        requests.put(f"{API_URL}/pricing-models/{plan_id}", json={"price": 240})
+        response = requests.post(f"{API_URL}/pricing-models/quote", json={"plan_ids": [plan_id], "currencies": ["USD"]})
+        self.assertEqual(response.json()["quotes"][0]["monthly"], 20.0)
+
+        response = requests.post(f"{API_URL}/pricing-models/quote", json={"currencies": ["XYZ"]})
+        self.assertEqual(response.status_code, 400)
+        requests.delete(f"{API_URL}/pricing-models/{plan_id}")
+
+    def test_22_pricing_features(self):
+        """Test the feature matrix and filtering pricing models by feature."""
+        print("\n=== Testing Pricing Features ===")
+
+        feature = f"feature-{uuid.uuid4()}"
+        response = requests.post(f"{API_URL}/pricing-models", json={"name": "Feature Basic", "price": 5, "features": ["support"]})
+        self.assertEqual(response.status_code, 200)
+        basic_id = response.json()["id"]
+        response = requests.post(f"{API_URL}/pricing-models", json={"name": "Feature Pro", "price": 50, "features": ["support", feature]})
+        self.assertEqual(response.status_code, 200)
+        pro_id = response.json()["id"]
+
+        response = requests.get(f"{API_URL}/pricing-models", params={"has_feature": feature})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([model["id"] for model in response.json()], [pro_id])
+
+        response = requests.get(f"{API_URL}/pricing-models/matrix")
+        self.assertEqual(response.status_code, 200)
+        matrix = response.json()
+        row = matrix["matrix"][matrix["features"].index(feature)]
+        columns = {plan["id"]: index for index, plan in enumerate(matrix["plans"])}
+        self.assertTrue(row[columns[pro_id]])
+        self.assertFalse(row[columns[basic_id]])
+        print("Verified feature matrix and feature filter")
+
+        # Removing the feature from the plan updates the index
+        requests.put(f"{API_URL}/pricing-models/{pro_id}", json={"features": ["support"]})
+        response = requests.get(f"{API_URL}/pricing-models", params={"has_feature": feature})
+        self.assertEqual(response.json(), [])
+
+        requests.delete(f"{API_URL}/pricing-models/{basic_id}")
+        requests.delete(f"{API_URL}/pricing-models/{pro_id}")
+
+    def test_23_category_display_inheritance(self):
+        """Test display configuration inherited down the category tree."""
+        print("\n=== Testing Category Display Resolution ===")
+
+        response = requests.post(f"{API_URL}/display-types", json={
+            "name": f"Grid {uuid.uuid4().hex[:8]}", "type_category": "grid",
+            "properties": {"columns": 4, "card": {"image": True, "price": True}},
+        })
+        self.assertEqual(response.status_code, 200)
+        type_id = response.json()["id"]
+
+        response = requests.post(f"{API_URL}/categories", json={
+            "name": f"Display Root {uuid.uuid4().hex[:8]}", "display_type_id": type_id,
+            "display_overrides": {"columns": 3},
+        })
+        self.assertEqual(response.status_code, 200)
+        root_id = response.json()["id"]
+        response = requests.post(f"{API_URL}/categories", json={
+            "name": "Display Child", "parent_id": root_id,
+            "display_overrides": {"card": {"price": None}},
+        })
+        self.assertEqual(response.status_code, 200)
+        child_id = response.json()["id"]
+
+        response = requests.get(f"{API_URL}/categories/{child_id}/display")
+        self.assertEqual(response.status_code, 200)
+        display = response.json()
+        self.assertEqual(display["display_type_id"], type_id)
+        self.assertEqual(display["inherited_from"], root_id)
+        self.assertEqual(display["properties"], {"columns": 3, "card": {"image": True}})
+
+        # Changing the ancestor or the display type is reflected in the subtree
+        requests.put(f"{API_URL}/categories/{root_id}", json={"display_overrides": {"columns": 2}})
+        response = requests.get(f"{API_URL}/categories/{child_id}/display")
+        self.assertEqual(response.json()["properties"]["columns"], 2)
+        requests.put(f"{API_URL}/display-types/{type_id}", json={"properties": {"columns": 4, "card": {"image": False}}})
+        response = requests.get(f"{API_URL}/categories/{child_id}/display")
+        self.assertEqual(response.json()["properties"], {"columns": 2, "card": {"image": False}})
+
+        response = requests.post(f"{API_URL}/categories", json={"name": "Bad Display", "display_type_id": str(uuid.uuid4())})
+        self.assertEqual(response.status_code, 404)
+        print("Verified inherited display configuration")
+
+        requests.delete(f"{API_URL}/categories/{root_id}", params={"cascade": "subtree"})
+        requests.delete(f"{API_URL}/display-types/{type_id}")
+
+    def test_24_model_schema_propagation(self):
+        """Test that category model changes are propagated to existing categories."""
+        print("\n=== Testing Category Model Schema Propagation ===")
+
+        response = requests.post(f"{API_URL}/category-models", json={
+            "name": f"Propagated {uuid.uuid4().hex[:8]}",
+            "fields": [{"name": "size", "type": "text"}, {"name": "stock", "type": "text"}],
+        })
+        self.assertEqual(response.status_code, 200)
+        model_id = response.json()["id"]
+        category_ids = []
+        for stock in ["3", "many"]:
+            response = requests.post(f"{API_URL}/categories", json={
+                "name": f"Propagated {uuid.uuid4().hex[:8]}", "model_id": model_id,
+                "custom_data": {"size": "L", "stock": stock},
+            })
+            self.assertEqual(response.status_code, 200)
+            category_ids.append(response.json()["id"])
+
+        response = requests.put(f"{API_URL}/category-models/{model_id}", json={
+            "fields": [
+                {"name": "dimensions", "type": "text"},
+                {"name": "stock", "type": "number"},
+                {"name": "color", "type": "text", "required": True, "default_value": "red"},
+            ],
+            "renames": {"size": "dimensions"},
+        })
+        self.assertEqual(response.status_code, 200)
+
+        for _ in range(50):
+            propagation = requests.get(f"{API_URL}/category-models/{model_id}/propagations").json()[0]
+            if propagation["status"] in ("completed", "failed"):
+                break
+            time.sleep(0.1)
+        self.assertEqual(propagation["status"], "completed")
+        self.assertEqual(propagation["progress"]["processed"], 2)
+        self.assertEqual(propagation["progress"]["failed"], 1)
+        self.assertEqual(propagation["failures"][0]["category_id"], category_ids[1])
+
+        custom_data = requests.get(f"{API_URL}/categories/{category_ids[0]}").json()["custom_data"]
+        self.assertEqual(custom_data, {"dimensions": "L", "stock": 3, "color": "red"})
+        print("Verified renames, coercions and defaults were propagated")
+
+        for category_id in category_ids:
+            requests.delete(f"{API_URL}/categories/{category_id}")
+        requests.delete(f"{API_URL}/category-models/{model_id}")
+
+    def test_25_background_jobs(self):
+        """Test running a cascade delete as a background job."""
+        print("\n=== Testing Background Jobs ===")
+
+        response = requests.post(f"{API_URL}/categories", json={"name": f"Job Root {uuid.uuid4().hex[:8]}"})
+        self.assertEqual(response.status_code, 200)
+        root_id = response.json()["id"]
+        response = requests.post(f"{API_URL}/categories", json={"name": "Job Child", "parent_id": root_id})
+        self.assertEqual(response.status_code, 200)
+        child_id = response.json()["id"]
+
+        response = requests.delete(f"{API_URL}/categories/{root_id}", params={"cascade": "subtree", "background": "true"})
+        self.assertEqual(response.status_code, 200)
+        job = response.json()
+        self.assertEqual(job["type"], "cascade_delete")
+        for _ in range(50):
+            job = requests.get(f"{API_URL}/jobs/{job['id']}").json()
+            if job["status"] in ("completed", "failed"):
+                break
+            time.sleep(0.1)
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual(job["result"]["categories"], 2)
+        self.assertEqual(requests.get(f"{API_URL}/categories/{child_id}").status_code, 404)
+
+        # Finished jobs can be neither cancelled nor retried
+        self.assertEqual(requests.post(f"{API_URL}/jobs/{job['id']}/cancel").status_code, 400)
+        self.assertEqual(requests.post(f"{API_URL}/jobs/{job['id']}/retry").status_code, 400)
+        response = requests.post(f"{API_URL}/jobs", json={"type": "no_such_job"})
+        self.assertEqual(response.status_code, 400)
+        print("Verified cascade delete job")
+
+    def test_26_move_between_legacy_siblings(self):
+        """Test moving a category between siblings whose rank keys are missing or tied."""
+        print("\n=== Testing Moves Between Legacy Siblings ===")
+
+        database = open_database()
+        for label, legacy_shape in [("unranked", {"$unset": {"rank": ""}}), ("tied", {"$set": {"rank": "1"}})]:
+            response = requests.post(f"{API_URL}/categories", json={"name": f"Legacy Parent {uuid.uuid4().hex[:8]}"})
+            self.assertEqual(response.status_code, 200)
+            parent_id = response.json()["id"]
+            sibling_ids = []
+            for i in range(3):
+                response = requests.post(f"{API_URL}/categories", json={"name": f"Legacy Sibling {i}", "parent_id": parent_id})
+                self.assertEqual(response.status_code, 200)
+                sibling_ids.append(response.json()["id"])
+            self.created_categories.extend(sibling_ids + [parent_id])
+            database.categories.update_many({"parent_id": parent_id}, legacy_shape)
+
+            response = requests.post(f"{API_URL}/categories/{sibling_ids[2]}/move", json={
+                "parent_id": parent_id, "after": sibling_ids[0], "before": sibling_ids[1],
+            })
+            self.assertEqual(response.status_code, 200)
+            categories = requests.get(f"{API_URL}/categories").json()
+            ordered = [c["id"] for c in categories if c["parent_id"] == parent_id]
+            self.assertEqual(ordered, [sibling_ids[0], sibling_ids[2], sibling_ids[1]])
+            print(f"Verified a move between {label} siblings lands between its anchors")
+
 
 # Business Fields API Tests
 class BusinessFieldsAPITest(unittest.TestCase):
@@ -831,6 +1552,89 @@ class BusinessFieldsAPITest(unittest.TestCase):
         self.assertTrue(response.json()["active"])
         print(f"Reactivated field with ID: {field_id}")
 
+    def test_08_business_field_value_validation(self):
+        """Test that instance values are validated against their template."""
+        print("\n=== Testing Business Field Value Validation ===")
+
+        response = requests.post(f"{API_URL}/business-fields", json={
+            "name": f"Employees {uuid.uuid4()}", "type": "number", "required": True,
+            "validation": {"min": 1, "max": 100000},
+        })
+        self.assertEqual(response.status_code, 200)
+        template_id = response.json()["id"]
+
+        response = requests.post(f"{API_URL}/business-field-instances", json={
+            "name": "Employee count", "template_field_id": template_id, "value": "not a number",
+        })
+        self.assertEqual(response.status_code, 400)
+        response = requests.post(f"{API_URL}/business-field-instances", json={
+            "name": "Employee count", "template_field_id": template_id, "value": "250",
+        })
+        self.assertEqual(response.status_code, 200)
+        instance_id = response.json()["id"]
+
+        response = requests.put(f"{API_URL}/business-field-instances/{instance_id}", json={"value": "0"})
+        self.assertEqual(response.status_code, 400)
+        print("Invalid values were rejected on create and update")
+
+        # Tighten the template so the stored value becomes a violation
+        requests.put(f"{API_URL}/business-fields/{template_id}", json={"validation": {"min": 1, "max": 100}})
+        response = requests.post(f"{API_URL}/business-field-instances/validate", params={"template_field_id": template_id})
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in response.text.splitlines() if line]
+        self.assertEqual(lines[-1]["summary"]["scanned"], 1)
+        self.assertEqual(lines[-1]["summary"]["violations"], 1)
+        self.assertEqual(lines[0]["id"], instance_id)
+
+        requests.delete(f"{API_URL}/business-field-instances/{instance_id}")
+        requests.delete(f"{API_URL}/business-fields/{template_id}")
+
+    def test_09_business_field_form(self):
+        """Test the grouped business field form with embedded instances."""
+        print("\n=== Testing Business Field Form ===")
+
+        category = f"form_{uuid.uuid4().hex[:8]}"
+        template_ids = []
+        for order, name in [(2, "Second"), (1, "First")]:
+            response = requests.post(f"{API_URL}/business-fields", json={"name": name, "category": category, "order": order})
+            self.assertEqual(response.status_code, 200)
+            template_ids.append(response.json()["id"])
+
+        response = requests.get(f"{API_URL}/business-fields/form", params={"category": category})
+        self.assertEqual(response.status_code, 200)
+        groups = response.json()["categories"]
+        self.assertEqual(len(groups), 1)
+        self.assertEqual([field["name"] for field in groups[0]["fields"]], ["First", "Second"])
+        self.assertEqual(groups[0]["fields"][0]["instances"], [])
+
+        # A new instance invalidates the cached form for its category
+        response = requests.post(f"{API_URL}/business-field-instances", json={
+            "name": "First value", "template_field_id": template_ids[1], "value": "hello",
+        })
+        self.assertEqual(response.status_code, 200)
+        instance_id = response.json()["id"]
+        response = requests.get(f"{API_URL}/business-fields/form", params={"category": category})
+        first = response.json()["categories"][0]["fields"][0]
+        self.assertEqual([instance["id"] for instance in first["instances"]], [instance_id])
+        print("Verified grouped form with embedded instances")
+
+        # Embedded instances are capped per template; instance_count keeps the total
+        response = requests.post(f"{API_URL}/business-field-instances", json={
+            "name": "First value again", "template_field_id": template_ids[1], "value": "again",
+        })
+        self.assertEqual(response.status_code, 200)
+        second_instance_id = response.json()["id"]
+        response = requests.get(f"{API_URL}/business-fields/form", params={"category": category, "instance_limit": 1})
+        self.assertEqual(response.status_code, 200)
+        first = response.json()["categories"][0]["fields"][0]
+        self.assertEqual([instance["id"] for instance in first["instances"]], [instance_id])
+        self.assertEqual(first["instance_count"], 2)
+
+        requests.delete(f"{API_URL}/business-field-instances/{second_instance_id}")
+        requests.delete(f"{API_URL}/business-field-instances/{instance_id}")
+        for template_id in template_ids:
+            requests.delete(f"{API_URL}/business-fields/{template_id}")
+
 
 if __name__ == "__main__":
     # Run the tests
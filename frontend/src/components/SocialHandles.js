@@ -16,6 +16,9 @@ const SocialHandles = ({ API, onBack }) => {
   });
   const [imagePreview, setImagePreview] = useState('');
 
+  // Stored icons come back as /api/icons/<id>, relative to the backend rather than this page
+  const iconSrc = (image) => (image && image.startsWith('/api/') ? `${API}${image.slice(4)}` : image);
+
   useEffect(() => {
     fetchSocialHandles();
   }, []);
@@ -128,7 +131,7 @@ const SocialHandles = ({ API, onBack }) => {
       followers: handle.followers || 0,
       active: handle.active
     });
-    setImagePreview(handle.icon_image || '');
+    setImagePreview(iconSrc(handle.icon_image) || '');
     setShowModal(true);
   };
 
@@ -281,7 +284,7 @@ const SocialHandles = ({ API, onBack }) => {
                   <td className="table-cell">
                     {handle.icon_image ? (
                       <img 
-                        src={handle.icon_image} 
+                        src={iconSrc(handle.icon_image)} 
                         alt={handle.name}
                         className="w-8 h-8 rounded-full object-cover"
                       />